@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+from backend.api.metrics import metrics
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_DEPTH_BUCKETS = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from any thread for up to max_wait_ms and runs them as one batch on a worker thread.
+    process_batch receives the list of items and must return one result per item, in order.
+    """
+    def __init__(self, process_batch:Callable[[List[Any]], List[Any]], max_batch_size:int = 32, max_wait_ms:float = 5.0, name:str = 'batcher'):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run,name=name,daemon=True)
+        self._thread.start()
+
+    def submit(self, item:Any) -> Future:
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        future = Future()
+        self._queue.put((item,future))
+        metrics.observe(f'{self.name}.queue_depth',self._queue.qsize(),QUEUE_DEPTH_BUCKETS)
+        return future
+
+    def submit_many(self, items:List[Any]) -> List[Future]:
+        return [self.submit(item) for item in items]
+
+    def _collect(self, first) -> List:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                self._stopping = True
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            batch = self._collect(entry)
+            # Requests that gave up while waiting are dropped before the forward pass
+            batch = [(item,future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                metrics.observe(f'{self.name}.batch_size',len(batch),BATCH_SIZE_BUCKETS)
+                started = time.perf_counter()
+                try:
+                    results = self.process_batch([item for item, _ in batch])
+                    for (_, future), result in zip(batch,results):
+                        future.set_result(result)
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                metrics.observe(f'{self.name}.batch_seconds',time.perf_counter() - started)
+            if self._stopping:
+                break
+
+        # Anything still queued after close() would otherwise wait forever
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None and entry[1].set_running_or_notify_cancel():
+                entry[1].set_exception(RuntimeError(f"{self.name} is closed"))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,126 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
+import tiktoken
+from chunking_evaluation import BaseChunker
+
+CHUNKING_STRATEGIES = ['token', 'sentence', 'character']
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+class ChunkingEngine(BaseChunker):
+    """
+    Single-pass replacement for SentenceChunker / CharacterChunker / TokenChunker.
+    Each document is tokenised once; the token character offsets are used both to cut token windows
+    and to check sentence groups against max_tokens, so no chunk is ever re-encoded.
+    iter_chunks accepts any iterable of (doc_id, text) and can fan documents out over a process pool.
+    """
+    def __init__(self, strategy:str = 'token', chunk_size:int = 256, overlap:int = 0, encoding:str = 'cl100k_base', max_tokens:int = 8191, workers:int = 0):
+        if strategy not in CHUNKING_STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy '{strategy}', expected one of {CHUNKING_STRATEGIES}")
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self.strategy = strategy
+        self.chunk_size = chunk_size  # tokens, sentences or characters depending on the strategy
+        self.overlap = overlap
+        self.encoding_name = encoding
+        self.max_tokens = max_tokens
+        self.workers = workers
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        # tiktoken caches encodings per process, so this stays cheap inside pool workers
+        return tiktoken.get_encoding(self.encoding_name)
+
+    def token_offsets(self, text:str) -> List[int]:
+        """
+        Character offset where every token of text starts.
+        """
+        tokens = self.encoding.encode(text,disallowed_special=())
+        return self.encoding.decode_with_offsets(tokens)[1]
+
+    @staticmethod
+    def _span(text:str, offsets:List[int], start:int, end:int) -> str:
+        return text[offsets[start]:offsets[end] if end < len(offsets) else len(text)]
+
+    def _token_windows(self, text:str, offsets:List[int], size:int, step:int, first:int = 0, last:int|None = None) -> Iterator[str]:
+        last = len(offsets) if last is None else last
+        for start in range(first,last,step):
+            yield self._span(text,offsets,start,min(start + size,last))
+            if start + size >= last:
+                break
+
+    def _sentences(self, text:str) -> Iterator[Tuple[int,int]]:
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(text):
+            yield start, boundary.start()
+            start = boundary.end()
+        if start < len(text):
+            yield start, len(text)
+
+    def _sentence_chunks(self, text:str) -> Iterator[str]:
+        offsets = self.token_offsets(text)
+        sentences = list(self._sentences(text))
+        step = self.chunk_size - self.overlap
+        for i in range(0,len(sentences),step):
+            group = sentences[i:i + self.chunk_size]
+            begin, end = group[0][0], group[-1][1]
+            # Tokens carry their leading whitespace, so the sentence may start inside the first token
+            first_token, last_token = max(bisect_right(offsets,begin) - 1,0), bisect_left(offsets,end)
+            if last_token - first_token > self.max_tokens:
+                # SentenceChunker raised here; splitting keeps the rest of the document usable
+                yield from self._token_windows(text,offsets,self.max_tokens,self.max_tokens,first_token,last_token)
+            else:
+                chunk = text[begin:end]
+                if chunk.strip():
+                    yield chunk
+            if i + self.chunk_size >= len(sentences):
+                break
+
+    def _character_chunks(self, text:str) -> Iterator[str]:
+        step = self.chunk_size - self.overlap
+        for start in range(0,len(text),step):
+            yield text[start:start + self.chunk_size]
+            if start + self.chunk_size >= len(text):
+                break
+
+    def iter_text(self, text:str) -> Iterator[str]:
+        if not text:
+            return
+        if self.strategy == 'token':
+            yield from self._token_windows(text,self.token_offsets(text),self.chunk_size,self.chunk_size - self.overlap)
+        elif self.strategy == 'sentence':
+            yield from self._sentence_chunks(text)
+        else:
+            yield from self._character_chunks(text)
+
+    def split_text(self, text:str) -> List[str]:
+        return list(self.iter_text(text))
+
+    def iter_chunks(self, documents:Iterable[Tuple[str,str]]) -> Iterator[Tuple[str,int,str]]:
+        """
+        Yields (doc_id, chunk_number, chunk) in input order. Documents are pulled lazily, at most
+        4 per worker are in flight, so a generator over a large corpus is never materialised.
+        """
+        if not self.workers:
+            for doc_id, text in documents:
+                for i, chunk in enumerate(self.iter_text(text)):
+                    yield doc_id, i, chunk
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = deque()
+            for doc_id, text in documents:
+                in_flight.append((doc_id,pool.submit(self.split_text,text)))
+                if len(in_flight) >= self.workers * 4:
+                    yield from self._drain(in_flight.popleft())
+            while in_flight:
+                yield from self._drain(in_flight.popleft())
+
+    @staticmethod
+    def _drain(entry) -> Iterator[Tuple[str,int,str]]:
+        doc_id, future = entry
+        for i, chunk in enumerate(future.result()):
+            yield doc_id, i, chunk
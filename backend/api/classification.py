@@ -0,0 +1,159 @@
+import re
+import threading
+from typing import Dict, List, Literal
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel, Field
+
+CATEGORY_INDEXES = {
+    'GDPR': ["gdpr_index_recall_retriever","gdpr_index_precision_retriever"],
+    'Greek Penal Code': ["gpc_index_recall_retriever","gpc_index_precision_retriever"],
+    'Specific Legal Cases': ["law_cases_index_recall_retriever","law_cases_index_precision_retriever"],
+    'Phishing Scenarios': ["phishing_retriever"],
+}
+
+Category = Literal["Phishing Scenarios","Specific Legal Cases","GDPR","Greek Penal Code"]
+
+
+def categories_to_indexes(categories:List[str]) -> List[str]:
+    indexes = []
+    for category in categories:
+        indexes += CATEGORY_INDEXES.get(category,[])
+    return indexes
+
+
+def indexes_to_categories(indexes:List[str]|None) -> List[str]:
+    if not indexes:
+        return []
+    return [category for category, category_indexes in CATEGORY_INDEXES.items() if set(category_indexes) & set(indexes)]
+
+
+MULTI_LEVEL_CLASSIFICATION_PROMPT = """
+    You are a legal assistant. Your task is to classify each of the following user queries into one or more of the following legal categories:
+
+    1) Phishing Scenarios
+    2) Specific Legal Cases
+    3) GDPR
+    4) Greek Penal Code
+
+    Classify every query independently, based on its subject and context. Return a list of relevant categories for each query.
+
+    Examples:
+
+    User Query: What is Phishing?
+    Categories: ["Phishing Scenarios"]
+
+    User Query: What is GDPR?
+    Categories: ["GDPR"]
+
+    User Query: How can phishing be punished in Greek Legislation?
+    Categories: ["Greek Penal Code"]
+
+    User Query: What is Phishing and give me an example of such case
+    Categories: ["Phishing Scenarios", "Specific Legal Cases"]
+
+    Now classify these queries:
+
+    Original query: "{query}"
+    First variation: "{first_variation}"
+    Second variation: "{second_variation}"
+"""
+
+
+class MultiLevelClassification(BaseModel):
+    original_query: List[Category] = Field(description="Categories of the original query")
+    first_variation: List[Category] = Field(description="Categories of the first variation")
+    second_variation: List[Category] = Field(description="Categories of the second variation")
+
+    def as_levels(self) -> List[List[str]]:
+        return [list(self.original_query),list(self.first_variation),list(self.second_variation)]
+
+
+# Short descriptions of each category; their embeddings are averaged into the category centroids
+CATEGORY_SEEDS = {
+    'Phishing Scenarios': [
+        "What is phishing?",
+        "I received a suspicious email asking for my bank password",
+        "Examples of phishing, smishing and vishing attacks",
+        "How do fraudsters trick people into revealing credentials?",
+    ],
+    'Specific Legal Cases': [
+        "Give me an example of a court decision",
+        "Was the defendant found guilty in a similar case?",
+        "Greek court rulings on online fraud",
+        "What was the outcome of the case about unauthorized access?",
+    ],
+    'GDPR': [
+        "What is GDPR?",
+        "What are my rights over my personal data?",
+        "When must a data breach be notified to the supervisory authority?",
+        "Obligations of a data controller and processor",
+    ],
+    'Greek Penal Code': [
+        "How is phishing punished in Greek legislation?",
+        "Which article of the Greek Penal Code covers computer fraud?",
+        "What is the penalty for illegal access to an information system?",
+        "Criminal offences in Greek law for cybercrime",
+    ],
+}
+
+CATEGORY_KEYWORDS = {
+    'Phishing Scenarios': r"\b(phishing|smishing|vishing|spoof\w*|scam\w*)\b",
+    'Specific Legal Cases': r"\b(court|decision|ruling|case|cases|verdict|defendant)\b",
+    'GDPR': r"\b(gdpr|personal data|data subject|data controller|data processor|data protection)\b",
+    'Greek Penal Code': r"\b(penal code|punish\w*|penalt\w*|imprisonment|criminal|article\s+\d+[a-z]?)\b",
+}
+
+
+class LocalQueryClassifier:
+    """
+    Keyword and embedding-centroid router that classifies queries without calling an LLM.
+    """
+    def __init__(self, embedding:Embeddings, seeds:Dict[str,List[str]]|None = None, min_similarity:float = 0.3, margin:float = 0.05, keyword_boost:float = 0.1):
+        self.embedding = embedding
+        self.seeds = seeds or CATEGORY_SEEDS
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.keyword_boost = keyword_boost
+        self.categories = list(self.seeds.keys())
+        self.keyword_patterns = {category:re.compile(pattern,re.IGNORECASE) for category, pattern in CATEGORY_KEYWORDS.items()}
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors:np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors,axis=-1,keepdims=True)
+        return vectors / np.clip(norms,1e-12,None)
+
+    def fit(self, examples:Dict[str,List[str]]|None = None):
+        examples = examples or self.seeds
+        centroids = []
+        for category in self.categories:
+            vectors = self._normalize(np.asarray(self.embedding.embed_documents(examples[category]),dtype=np.float32))
+            centroids.append(vectors.mean(axis=0))
+        self._centroids = self._normalize(np.stack(centroids))
+        return self
+
+    def scores(self, queries:List[str]) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self.fit()
+        vectors = self._normalize(np.asarray(self.embedding.embed_documents(queries),dtype=np.float32))
+        scores = vectors @ self._centroids.T
+        for row, query in enumerate(queries):
+            for column, category in enumerate(self.categories):
+                pattern = self.keyword_patterns.get(category)
+                if pattern is not None and pattern.search(query):
+                    scores[row,column] += self.keyword_boost
+        return scores
+
+    def classify(self, queries:List[str]) -> List[List[str]]:
+        results = []
+        for row in self.scores(queries):
+            best = float(row.max())
+            if best < self.min_similarity:
+                results.append([])
+                continue
+            results.append([self.categories[i] for i in np.argsort(-row) if row[i] >= best - self.margin])
+        return results
@@ -0,0 +1,66 @@
+import hashlib
+import re
+from typing import Dict, Iterable, List, Tuple
+import tiktoken
+
+CONTEXT_MODES = ['summary', 'extractive']
+
+
+def content_digest(content:str) -> str:
+    # Whitespace differences between chunkers should not keep two copies of the same passage
+    return hashlib.sha1(' '.join(content.split()).encode('utf-8')).hexdigest()
+
+
+def dedupe(chunks:Iterable[List]) -> Tuple[List[List], int]:
+    """
+    [content, metadata, score] chunks without repeated content, first occurrence kept with the best score.
+    Extra trailing fields (such as the level a chunk came from) are kept from the first occurrence.
+    Returns the unique chunks and how many duplicates were dropped.
+    """
+    unique: Dict[str, List] = {}
+    duplicates = 0
+    for content, metadata, score, *extra in chunks:
+        digest = content_digest(content)
+        if digest in unique:
+            duplicates += 1
+            unique[digest][2] = max(unique[digest][2],score)
+            continue
+        unique[digest] = [content,metadata,score,*extra]
+    return list(unique.values()), duplicates
+
+
+def pack(chunks:List[List], budget:int, encoding:tiktoken.Encoding) -> Tuple[str, int]:
+    """
+    Greedy packing by score: numbered "content (score) metadata" lines, as many as fit in `budget` tokens.
+    A chunk that does not fit is skipped so shorter, lower-scored ones can still use the remaining room.
+    """
+    lines = []
+    used = 0
+    for content, metadata, score in sorted(chunks,key=lambda chunk: chunk[2],reverse=True):
+        line = f'{len(lines)}) {content} (score:{score}) metadata:{metadata}'
+        tokens = len(encoding.encode(line,disallowed_special=()))
+        if used + tokens > budget:
+            continue
+        lines.append(line)
+        used += tokens
+    return '\n'.join(lines), used
+
+
+def search_chunks(results:List[Dict]) -> List[List]:
+    # The url and title are the citation the answer can point to
+    return [[result['content'],{'title': result.get('title',''), 'url': result.get('url','')},result.get('score',0.0)] for result in results]
+
+
+def _shingles(text:str, size:int = 3) -> set:
+    words = re.findall(r"\w+",text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1,1))} if words else set()
+
+
+def novel_share(text:str, reference:str) -> float:
+    """
+    Share of the word trigrams of `text` that do not appear in `reference`: 0.0 when it repeats the reference, 1.0 when it is all new.
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return 0.0
+    return len(shingles - _shingles(reference)) / len(shingles)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from typing import Dict, List
+import numpy as np
+from llama_index.core import StorageContext
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from langchain_core.embeddings import Embeddings
+from backend.api.lexical_index import BM25Index, reciprocal_rank_fusion
+from backend.api.metadata_filter import MetadataBitmaps, extract_references
+from backend.api.metrics import metrics
+
+
+def _normalize(matrix:np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix,axis=-1,keepdims=True)
+    return matrix / np.where(norms == 0,1,norms)
+
+
+class DenseIndex:
+    """
+    Cosine-similarity index over a (nodes x dims) matrix with optional Matryoshka truncation.
+    With truncate_dim the search runs on the first truncate_dim dimensions only. With two_stage as well,
+    the truncated search picks top_k * shortlist_factor candidates which are re-scored with the full vectors.
+    """
+    def __init__(self, ids:List[str], texts:List[str], metadata:List[Dict], vectors:np.ndarray, truncate_dim:int|None = None, two_stage:bool = False, shortlist_factor:int = 4):
+        self.ids = ids
+        self.texts = texts
+        self.metadata = metadata
+        self.dims = vectors.shape[1]
+        self.truncate_dim = truncate_dim if truncate_dim and truncate_dim < self.dims else None
+        self.two_stage = bool(self.truncate_dim) and two_stage
+        self.shortlist_factor = shortlist_factor
+
+        vectors = np.asarray(vectors,dtype=np.float32)
+        # Full vectors are only kept when something still needs them
+        self.full = _normalize(vectors) if not self.truncate_dim or self.two_stage else None
+        self.coarse = _normalize(vectors[:,:self.truncate_dim]) if self.truncate_dim else self.full
+        self.lexical: BM25Index|None = None
+        self.filters: MetadataBitmaps|None = None
+
+    def build_lexical(self):
+        # The llama_index stores carry no inverted index, so hybrid mode builds one in memory at load
+        self.lexical = BM25Index.build(self.texts)
+
+    def build_filters(self):
+        self.filters = MetadataBitmaps.build(self.metadata)
+
+    def filter_mask(self, query_keys:set) -> np.ndarray|None:
+        return self.filters.mask(query_keys) if self.filters and query_keys else None
+
+    @classmethod
+    def from_llama_index(cls, persist_dir:str, **kwargs) -> 'DenseIndex':
+        """
+        Reads the nodes and embeddings of a persisted llama_index SimpleVectorStore index.
+        """
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+        embedding_dict = storage_context.vector_store.to_dict()['embedding_dict']
+        ids, texts, metadata, vectors = [], [], [], []
+        for node_id, node in storage_context.docstore.docs.items():
+            if node_id not in embedding_dict:
+                continue
+            ids.append(node_id)
+            texts.append(node.get_content())
+            metadata.append(node.metadata)
+            vectors.append(embedding_dict[node_id])
+        return cls(ids,texts,metadata,np.asarray(vectors,dtype=np.float32),**kwargs)
+
+    def search(self, query_vector:List[float], top_k:int, mask:np.ndarray|None = None) -> List[tuple[int,float]]:
+        query = np.asarray(query_vector,dtype=np.float32)
+        if mask is not None:
+            # Pre-filtered rows are few, so they are scored directly at the best width available
+            rows = np.flatnonzero(mask)
+            if self.full is not None:
+                scores = self.full[rows] @ _normalize(query)
+            else:
+                scores = self.coarse[rows] @ _normalize(query[:self.truncate_dim])
+            best = np.argsort(-scores)[:top_k]
+            return [(int(rows[i]),float(scores[i])) for i in best]
+
+        coarse_query = _normalize(query[:self.truncate_dim] if self.truncate_dim else query)
+        scores = self.coarse @ coarse_query
+
+        shortlist = top_k * self.shortlist_factor if self.two_stage else top_k
+        shortlist = min(shortlist,len(scores))
+        candidates = np.argpartition(-scores,shortlist - 1)[:shortlist] if shortlist < len(scores) else np.arange(len(scores))
+
+        if self.two_stage:
+            scores = np.full(len(self.ids),-np.inf,dtype=np.float32)
+            scores[candidates] = self.full[candidates] @ _normalize(query)
+
+        best = candidates[np.argsort(-scores[candidates])][:top_k]
+        return [(int(i),float(scores[i])) for i in best]
+
+    def lexical_search(self, query:str, top_k:int, mask:np.ndarray|None = None) -> List[tuple[int,float]]:
+        return self.lexical.search(query,top_k,mask) if self.lexical else []
+
+    def node(self, i:int) -> tuple[str,str,Dict]:
+        return self.ids[i], self.texts[i], self.metadata[i]
+
+    def memory_mb(self) -> float:
+        matrices = {id(m): m for m in (self.full,self.coarse) if m is not None}
+        return sum(m.nbytes for m in matrices.values()) / (1024 * 1024)
+
+    def report(self, probes:int = 20, top_k:int = 10) -> Dict[str, object]:
+        # Probe with stored vectors so the latency does not depend on the embedding model
+        matrix = self.full if self.full is not None else self.coarse
+        sample = matrix[np.random.default_rng(0).choice(len(self.ids),min(probes,len(self.ids)),replace=False)]
+        start = time.perf_counter()
+        for vector in sample:
+            self.search(vector,top_k)
+        return {
+            'nodes': len(self.ids),
+            'dims': self.dims,
+            'search_dims': self.truncate_dim or self.dims,
+            'two_stage': self.two_stage,
+            'vectors_mb': round(self.memory_mb(),1),
+            'search_ms': round((time.perf_counter() - start) / max(len(sample),1) * 1000,3),
+        }
+
+
+class DenseRetriever:
+    """
+    Drop-in for the VectorIndexRetriever calls the pipeline makes (retrieve / aretrieve with a str or a QueryBundle).
+    Works with any index exposing search(vector, top_k) -> [(key, score)] and node(key) -> (id, text, metadata).
+    With hybrid, the dense and BM25 (index.lexical_search) candidate lists are merged by reciprocal rank fusion,
+    and the returned scores are the fused RRF scores. With metadata_filter, article / law references in the query
+    narrow the rows through index.filter_mask before any scoring. When fewer than similarity_top_k rows pass the
+    filter, the remaining slots are filled from the unfiltered search.
+    """
+    def __init__(self, index, embedding:Embeddings, similarity_top_k:int = 10, hybrid:bool = False, candidates:int = 20, rrf_k:int = 60, metadata_filter:bool = False):
+        self.index = index
+        self.embedding = embedding
+        self.similarity_top_k = similarity_top_k
+        self.hybrid = hybrid
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.metadata_filter = metadata_filter
+
+    def search(self, bundle:QueryBundle) -> List[tuple[object,float]]:
+        vector = bundle.embedding if bundle.embedding is not None else self.embedding.embed_query(bundle.query_str)
+        mask = self.index.filter_mask(extract_references(bundle.query_str)) if self.metadata_filter else None
+        if mask is None:
+            return self._search(bundle,vector,None)
+        metrics.inc('retrieval.prefiltered')
+        results = self._search(bundle,vector,mask)
+        if len(results) >= self.similarity_top_k:
+            return results
+        # Too few rows cite the reference, keep them first and widen to the whole index for the rest
+        metrics.inc('retrieval.prefilter_widened')
+        seen = {key for key, _ in results}
+        widened = [(key,score) for key, score in self._search(bundle,vector,None) if key not in seen]
+        return results + widened[:self.similarity_top_k - len(results)]
+
+    def _search(self, bundle:QueryBundle, vector, mask) -> List[tuple[object,float]]:
+        if not self.hybrid:
+            return self.index.search(vector,self.similarity_top_k,mask)
+        candidates = max(self.candidates,self.similarity_top_k)
+        dense = self.index.search(vector,candidates,mask)
+        lexical = self.index.lexical_search(bundle.query_str,candidates,mask)
+        return reciprocal_rank_fusion([dense,lexical],self.similarity_top_k,self.rrf_k)
+
+    def retrieve(self, query:str|QueryBundle) -> List[NodeWithScore]:
+        bundle = QueryBundle(query_str=query) if isinstance(query,str) else query
+        nodes = []
+        for key, score in self.search(bundle):
+            node_id, text, metadata = self.index.node(key)
+            nodes.append(NodeWithScore(node=TextNode(id_=node_id,text=text,metadata=metadata),score=score))
+        return nodes
+
+    async def aretrieve(self, query:str|QueryBundle) -> List[NodeWithScore]:
+        return await asyncio.to_thread(self.retrieve,query)
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Response, HTTPException, Cookie, Request
 import json
+import asyncio
 from backend.api.models import UserFeedback,UserOpenData,VerifCode,UserCredentials, ConversationCreationDetails, UserData ,NewMessage, Message, UpdateConversationDetails
 from backend.database.core.funcs import update_conv,set_feedback,resend_ver_code,check_verification_code, check_create_user_instance ,login_user, update_token, get_user_messages, get_conversations, create_conversation, create_message
 from backend.api.utils import create_access_token, verify_token
 from fastapi.responses import StreamingResponse
 from langchain.prompts import PromptTemplate 
-from langchain_openai import ChatOpenAI
 from backend.database.config.config import settings
+from backend.api.metrics import metrics
+from backend.api.llm_cache import compiled_chain
+from backend.api.stream_events import sse, progress_event, token_event, done_event, error_event
 
 router = APIRouter()
 
@@ -132,10 +135,7 @@ def get_user(token: str = Cookie(None)):
     except HTTPException as e:
         raise HTTPException(status_code=403, detail=e.detail)        
 
-@router.post('/request')
-async def chat_endpoint(request_data: Message,request:Request):
-
-    prompt = """
+ANSWER_TEMPLATE = """
         You are a highly competent legal assistant designed to provide accurate, well-reasoned, and context-aware answers to legal questions. Your responses should be clear, concise, and grounded in the provided legal context and conversation history.
 
         Your task is to analyze the question posed by the user and generate a helpful answer based on the information available. If necessary, synthesize knowledge from both legal documents and prior conversation to ensure completeness and legal soundness.
@@ -166,31 +166,86 @@ async def chat_endpoint(request_data: Message,request:Request):
 
         Generate your answer below in {language}:
     """
+ANSWER_PROMPT = PromptTemplate(input_variables=['query','summarized_context','conversation_history','search_results','language'],template=ANSWER_TEMPLATE)
 
-    prompt = PromptTemplate(input_variables=['query','summarized_context','conversation_history','search_results','language'],template=prompt)
-    model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,temperature=0.7,streaming=True)
-    agent_chain = prompt | model
-
+@router.post('/request')
+async def chat_endpoint(request_data: Message,request:Request):
     pipeline = request.app.state.pipeline
+    if pipeline is None:
+        if settings.INIT_MODE != 'runtime':
+            raise HTTPException(status_code=503, detail=f"The answer pipeline is disabled (INIT_MODE={settings.INIT_MODE})")
+        raise HTTPException(status_code=503, detail="Service is still starting")
+    # Built once per pipeline and reused, the streaming model shares the pipeline's HTTP connection pool
+    agent_chain = compiled_chain(ANSWER_PROMPT,pipeline.llm.streaming_chat)
     app = request.app.state.app
-    
-    llm_params = pipeline.get_context_from_graph(app,request_data.message)
-
-    llm_params['conversation_history'] = request_data.conversation_history if len(request_data.conversation_history)!=0 else []
+    answer_cache = getattr(request.app.state,'answer_cache',None)
 
     async def generate():
         try:
+            llm_params = None
+            if answer_cache:
+                # Embedding and SQLite access block, keep them off the event loop
+                cache_scope = pipeline.answer_cache_scope(request_data.search_mode)
+                query_embedding = await asyncio.to_thread(answer_cache.embed,request_data.message)
+                llm_params = await asyncio.to_thread(answer_cache.lookup,request_data.message,query_embedding,cache_scope)
+                if llm_params is not None:
+                    llm_params['query'] = request_data.message
+                    yield sse(progress_event('cache_hit',"answer context loaded from cache"))
+
+            if llm_params is None:
+                # The sync graph streams the same progress events from a worker thread
+                stream = pipeline.astream_context_from_graph if pipeline.async_mode else pipeline.astream_context_in_thread
+                async for kind, payload in stream(app,request_data.message,request_data.search_mode):
+                    if kind == 'progress':
+                        yield sse(payload)
+                    else:
+                        llm_params = payload
+                degraded = llm_params.pop('degraded',False)
+                if answer_cache and not degraded:
+                    await asyncio.to_thread(answer_cache.store,request_data.message,llm_params,query_embedding,cache_scope)
+
+            llm_params['conversation_history'] = request_data.conversation_history if len(request_data.conversation_history)!=0 else []
+
             async for chunk in agent_chain.astream(llm_params):
                 content = chunk.content if hasattr(chunk, 'content') else str(chunk)
-                yield f"data: {json.dumps({'response': content, 'status': 200})}\n\n"
+                yield sse(token_event(content))
+            yield sse(done_event())
 
         except Exception as e:
-            # Log error details            
-            # OR raise it, if you don't want partial yield
-            raise HTTPException(status_code=500, detail="Internal Server Error during LLM generation.")
+            # The response has already started, so report the failure as an event instead of an HTTP status
+            print(f"Error in chat_endpoint stream: {e}")
+            yield sse(error_event("Internal Server Error during LLM generation."))
         
     return StreamingResponse(generate(), media_type="text/event-stream")
 
+@router.get('/metrics')
+async def get_metrics(request:Request):
+    snapshot = metrics.snapshot()
+    answer_cache = getattr(request.app.state,'answer_cache',None)
+    if answer_cache:
+        snapshot['answer_cache'] = answer_cache.stats()
+    pipeline = getattr(request.app.state,'pipeline',None)
+    if pipeline:
+        snapshot['llm_cache_hit_ratios'] = pipeline.completion_cache.hit_ratios()
+    requests = metrics.get('search.requests')
+    snapshot['search_used_ratio'] = round(metrics.get('search.used') / requests,4) if requests else 0.0
+    snapshot['search_changed_context_ratio'] = round(metrics.get('search.changed_context') / requests,4) if requests else 0.0
+    return snapshot
+
+@router.get('/health/ready')
+async def health_ready(request:Request,response:Response):
+    # Per component load state and timing; 503 until the pipeline and every eagerly loaded component are up
+    if settings.INIT_MODE != 'runtime':
+        # The pipeline is never loaded in this mode, so there is nothing to wait for
+        return {'ready': True, 'pipeline': 'disabled', 'init_mode': settings.INIT_MODE, 'components': {}}
+    startup = getattr(request.app.state,'startup',None)
+    status = startup.status() if startup else {'ready': True, 'components': {}}
+    status['pipeline'] = 'ready' if getattr(request.app.state,'pipeline',None) is not None else 'loading'
+    status['ready'] = status['ready'] and status['pipeline'] == 'ready'
+    if not status['ready']:
+        response.status_code = 503
+    return status
+
 @router.post('/logout')
 async def logout(response:Response):
     try:
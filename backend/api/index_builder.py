@@ -0,0 +1,233 @@
+"""
+Incremental builder for the mmap index format (see backend/api/mmap_index.py).
+
+Every index directory keeps a build_manifest.json next to index.json:
+
+    {"model", "chunker", "next_shard", "documents": {"<file name>": {"hash", "key", "shard", "chunks"}}}
+
+Only documents whose sha256 changed (or that are new) are chunked and embedded. Shards that held changed or
+removed documents are rewritten from their stored vectors without the stale rows, so nothing else is re-embedded.
+New shards and manifests are written before the old shards are deleted, so an interrupted build leaves the
+previous index readable.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from backend.api.mmap_index import MmapShard, write_shard, write_index_manifest
+from backend.api.model_registry import variant_model_kwargs
+
+BUILD_MANIFEST = 'build_manifest.json'
+
+_worker_model = None
+
+
+def _init_worker(model_path:str, variant:str):
+    global _worker_model
+    _worker_model = SentenceTransformer(model_path,**variant_model_kwargs(model_path,variant))
+
+
+def _embed(texts:List[str]) -> np.ndarray:
+    return _worker_model.encode(texts,batch_size=len(texts),normalize_embeddings=True,convert_to_numpy=True,show_progress_bar=False)
+
+
+def file_hash(path:str) -> str:
+    digest = hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1 << 20),b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_corpus(directory:str) -> Iterator[Tuple[str,str]]:
+    # sorted() holds the listing, scandir only saves the per-file stat (is_file comes from the directory entry)
+    with os.scandir(directory) as entries:
+        for entry in sorted(entries,key=lambda entry: entry.name):
+            if entry.is_file() and entry.name.endswith('.txt'):
+                yield entry.name, entry.path
+
+
+def _write_json(path:str, payload:Dict):
+    tmp = path + '.tmp'
+    with open(tmp,'w',encoding='utf-8') as f:
+        json.dump(payload,f,indent=2,ensure_ascii=False)
+    os.replace(tmp,path)
+
+
+class IndexBuilder:
+    def __init__(self, index_dir:str, prefix:str, model_path:str, chunk_fn:Callable, chunker, chunker_config:Dict, workers:int = 2, batch_size:int = 64, shard_size:int = 50000, dtype:str = 'float32', ann:str = 'hnsw', ann_dims:int|None = None, variant:str = 'fp32'):
+        self.index_dir = index_dir
+        self.prefix = prefix
+        self.model_path = model_path
+        self.chunk_fn = chunk_fn
+        self.chunker = chunker
+        self.chunker_config = chunker_config
+        self.workers = workers
+        self.batch_size = batch_size
+        self.shard_size = shard_size
+        self.shard_options = {'dtype': dtype, 'ann': ann, 'ann_dims': ann_dims}
+        self.variant = variant
+
+    def load_manifest(self) -> Tuple[Dict,List[str]]:
+        """
+        Returns the manifest to build on and the shards a full rebuild has to drop.
+        """
+        path = os.path.join(self.index_dir,BUILD_MANIFEST)
+        manifest = None
+        if os.path.exists(path):
+            with open(path,'r',encoding='utf-8') as f:
+                manifest = json.load(f)
+        if manifest and manifest['model'] == self.model_path and manifest['chunker'] == self.chunker_config:
+            return manifest, []
+
+        # No manifest (fresh or converted index) or a different model / chunker: everything is rebuilt
+        stale_shards = []
+        if os.path.exists(os.path.join(self.index_dir,'index.json')):
+            with open(os.path.join(self.index_dir,'index.json'),'r',encoding='utf-8') as f:
+                stale_shards = json.load(f)['shards']
+        # New shards never reuse a stale shard's directory, so the old index stays intact until the swap
+        next_shard = max([int(shard.rsplit('-',1)[1]) + 1 for shard in stale_shards if shard.rsplit('-',1)[-1].isdigit()],default=0)
+        return {'model': self.model_path, 'chunker': self.chunker_config, 'next_shard': next_shard, 'documents': {}}, stale_shards
+
+    def plan(self, corpus_dir:str, manifest:Dict) -> Tuple[List[Tuple[str,str,str]],List[str]]:
+        changed = []
+        seen = set()
+        for name, path in iter_corpus(corpus_dir):
+            seen.add(name)
+            digest = file_hash(path)
+            if manifest['documents'].get(name,{}).get('hash') != digest:
+                changed.append((name,path,digest))
+        removed = [name for name in manifest['documents'] if name not in seen]
+        return changed, removed
+
+    def _chunks(self, changed:List[Tuple[str,str,str]]) -> Iterator[Tuple[str,str,str,Dict]]:
+        for name, path, digest in changed:
+            with open(path,'r',encoding='utf-8') as f:
+                text = f.read()
+            key = hashlib.sha1(f"{name}:{digest}".encode('utf-8')).hexdigest()[:16]
+            for i, (content, metadata) in enumerate(self.chunk_fn(name,text,self.chunker)):
+                yield name, f"{self.prefix}_{key}_{i}", content, metadata
+
+    def _embed_shards(self, chunks:Iterator[Tuple[str,str,str,Dict]]) -> Iterator[Tuple[List[Tuple[str,str,str,Dict]],np.ndarray]]:
+        """
+        Embeds the chunks and yields them about shard_size rows at a time, so at most one shard of texts and vectors is held in memory.
+        Shards are only cut between documents, since the manifest records a single shard per document.
+        """
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers,mp_context=context,initializer=_init_worker,initargs=(self.model_path,self.variant)) as pool:
+            rows = []
+            pending: List[Future] = []
+            batch = []
+            for row in chunks:
+                if len(rows) >= self.shard_size and row[0] != rows[-1][0]:
+                    if batch:
+                        pending.append(pool.submit(_embed,batch))
+                        batch = []
+                    yield rows, np.concatenate([future.result() for future in pending])
+                    rows, pending = [], []
+                rows.append(row)
+                batch.append(row[2])
+                if len(batch) == self.batch_size:
+                    pending.append(pool.submit(_embed,batch))
+                    batch = []
+            if batch:
+                pending.append(pool.submit(_embed,batch))
+            if rows:
+                yield rows, np.concatenate([future.result() for future in pending])
+
+    def _next_shard(self, manifest:Dict) -> str:
+        shard = f"shard-{manifest['next_shard']:04d}"
+        manifest['next_shard'] += 1
+        return shard
+
+    def _compact(self, manifest:Dict, shard:str, drop_keys:set) -> Tuple[str|None,List[str]]:
+        """
+        Rewrites a shard without the rows of drop_keys, reusing the stored vectors. Returns the new shard and the names of the documents it kept.
+        """
+        old = MmapShard(os.path.join(self.index_dir,shard))
+        keep, kept_ids, kept_texts, kept_metadata = [], [], [], []
+        for position in range(old.count):
+            node_id, text, metadata = old.node(position)
+            if node_id.rsplit('_',1)[0] not in drop_keys:
+                keep.append(position)
+                kept_ids.append(node_id)
+                kept_texts.append(text)
+                kept_metadata.append(metadata)
+        vectors = old.rows(np.asarray(keep,dtype=np.int64)) if keep else None
+        old.close()
+        kept_documents = [name for name, doc in manifest['documents'].items() if doc['shard'] == shard and f"{self.prefix}_{doc['key']}" not in drop_keys]
+        if not keep:
+            return None, kept_documents
+        new_shard = self._next_shard(manifest)
+        write_shard(os.path.join(self.index_dir,new_shard),kept_ids,kept_texts,kept_metadata,vectors,**self.shard_options)
+        return new_shard, kept_documents
+
+    def build(self, corpus_dir:str, dry_run:bool = False) -> Dict[str, object]:
+        start = time.perf_counter()
+        os.makedirs(self.index_dir,exist_ok=True)
+        manifest, stale_shards = self.load_manifest()
+        changed, removed = self.plan(corpus_dir,manifest)
+        summary = {'index_dir': self.index_dir, 'changed': len(changed), 'removed': len(removed), 'full_rebuild': bool(stale_shards), 'chunks_embedded': 0}
+        if dry_run or (not changed and not removed and not stale_shards):
+            return summary
+
+        documents = manifest['documents']
+        drop_keys = {f"{self.prefix}_{documents[name]['key']}" for name, _, _ in changed if name in documents}
+        drop_keys |= {f"{self.prefix}_{documents[name]['key']}" for name in removed}
+        affected = {documents[name]['shard'] for name in documents if documents[name]['shard'] and f"{self.prefix}_{documents[name]['key']}" in drop_keys}
+
+        # Rewrite shards that lost rows, then append the new rows as fresh shards
+        for shard in sorted(affected):
+            new_shard, kept_documents = self._compact(manifest,shard,drop_keys)
+            for name in kept_documents:
+                documents[name]['shard'] = new_shard
+        for name in removed:
+            documents.pop(name)
+
+        digests = {name: digest for name, _, digest in changed}
+        chunk_counts = {}
+        dims = 0
+        for shard_rows, vectors in self._embed_shards(self._chunks(changed)):
+            summary['chunks_embedded'] += len(shard_rows)
+            dims = vectors.shape[1]
+            shard = self._next_shard(manifest)
+            write_shard(
+                os.path.join(self.index_dir,shard),
+                [row[1] for row in shard_rows],
+                [row[2] for row in shard_rows],
+                [row[3] for row in shard_rows],
+                vectors,
+                **self.shard_options,
+            )
+            for name, node_id, _, _ in shard_rows:
+                chunk_counts[name] = chunk_counts.get(name,0) + 1
+                documents[name] = {'hash': digests[name], 'key': node_id.rsplit('_',1)[0][len(self.prefix) + 1:], 'shard': shard, 'chunks': chunk_counts[name]}
+        for name, _, digest in changed:
+            # Documents that produced no chunks are still recorded so they are not re-read every build
+            if name not in chunk_counts:
+                documents[name] = {'hash': digest, 'key': '', 'shard': None, 'chunks': 0}
+
+        shards = sorted({doc['shard'] for doc in documents.values() if doc['shard']})
+        dims = dims or self._dims(shards)
+        write_index_manifest(self.index_dir,self.model_path,dims,shards)
+        _write_json(os.path.join(self.index_dir,BUILD_MANIFEST),manifest)
+
+        for shard in set(stale_shards) | affected:
+            if shard not in shards:
+                shutil.rmtree(os.path.join(self.index_dir,shard),ignore_errors=True)
+
+        summary['shards'] = len(shards)
+        summary['seconds'] = round(time.perf_counter() - start,2)
+        return summary
+
+    def _dims(self, shards:List[str]) -> int:
+        for shard in shards:
+            with open(os.path.join(self.index_dir,shard,'shard.json'),'r',encoding='utf-8') as f:
+                return json.load(f)['dims']
+        return 0
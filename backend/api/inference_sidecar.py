@@ -0,0 +1,297 @@
+"""
+Inference sidecar: one process owns the embedding models, indexes and local reranker, and uvicorn workers
+talk to it over a Unix socket instead of loading their own copies.
+
+Wire format, one request / one response at a time per connection:
+
+    4-byte big-endian length + JSON header       {"op", ...} / {"ok", "result", "error"}
+    optional "array" in the header               {"shape", "dtype", "shm"}
+
+Every connection gets its own shared memory block at the "hello" handshake. Query vectors, embeddings and rerank
+scores are written into that block and only their shape crosses the socket; arrays larger than the block follow
+the header as raw bytes instead. This is not zero-copy: the receiver copies each array out of the block so the
+block can take the next message, and search results (node ids, texts, metadata) are serialized in the JSON header.
+
+Start the sidecar with `python -m backend.sidecar` and set INFERENCE_MODE=sidecar for the API workers.
+"""
+import asyncio
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from backend.api.metrics import metrics
+from backend.api.reranker import LocalReranker
+
+HEADER = struct.Struct('!I')
+
+
+def _recv_exact(sock:socket.socket, size:int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise ConnectionError("inference sidecar connection closed")
+        received += n
+    return buffer
+
+
+def send_message(sock:socket.socket, header:Dict, array:np.ndarray|None = None, shm:SharedMemory|None = None):
+    inline = b''
+    if array is not None:
+        array = np.ascontiguousarray(array)
+        in_shm = shm is not None and array.nbytes <= shm.size
+        if in_shm:
+            np.ndarray(array.shape,dtype=array.dtype,buffer=shm.buf)[...] = array
+        else:
+            inline = array.tobytes()
+        header['array'] = {'shape': list(array.shape), 'dtype': str(array.dtype), 'shm': in_shm}
+    payload = json.dumps(header,ensure_ascii=False).encode('utf-8')
+    sock.sendall(HEADER.pack(len(payload)) + payload + inline)
+
+
+def recv_message(sock:socket.socket, shm:SharedMemory|None = None) -> Tuple[Dict,np.ndarray|None]:
+    """
+    Returns the header and the attached array, if any. The array is a copy, so the shared block can be reused right away.
+    """
+    (size,) = HEADER.unpack(_recv_exact(sock,HEADER.size))
+    header = json.loads(_recv_exact(sock,size).decode('utf-8'))
+    spec = header.pop('array',None)
+    if spec is None:
+        return header, None
+    dtype = np.dtype(spec['dtype'])
+    shape = tuple(spec['shape'])
+    if spec['shm']:
+        return header, np.ndarray(shape,dtype=dtype,buffer=shm.buf).copy()
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    return header, np.frombuffer(_recv_exact(sock,nbytes),dtype=dtype).reshape(shape)
+
+
+class _SidecarHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sidecar: InferenceSidecar = self.server.sidecar
+        shm = None
+        try:
+            while True:
+                try:
+                    request, array = recv_message(self.request,shm)
+                except ConnectionError:
+                    return
+                op = request.pop('op','')
+                if op == 'hello':
+                    if shm is None:
+                        shm = SharedMemory(create=True,size=sidecar.buffer_bytes)
+                    send_message(self.request,{'ok': True, 'result': {**sidecar.describe(), 'shm': shm.name, 'shm_size': shm.size}})
+                    continue
+                start = time.perf_counter()
+                try:
+                    result, result_array = sidecar.dispatch(op,request,array)
+                    send_message(self.request,{'ok': True, 'result': result},result_array,shm)
+                except Exception as e:
+                    metrics.inc(f'sidecar.{op}.errors')
+                    send_message(self.request,{'ok': False, 'error': f"{type(e).__name__}: {e}"})
+                metrics.observe(f'sidecar.{op}_seconds',time.perf_counter() - start)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class InferenceSidecar:
+    """
+    Serves embed / search / rerank for the given retrievers and reranker. Every connection is handled on its own
+    thread, so requests from different API workers meet in the same MicroBatchers and are encoded together.
+    """
+    def __init__(self, socket_path:str, retrievers:Dict[str,object], reranker:LocalReranker|None, registry, buffer_mb:int = 8):
+        self.socket_path = socket_path
+        self.retrievers = retrievers
+        self.reranker = reranker
+        self.registry = registry
+        self.buffer_bytes = buffer_mb * 1024 * 1024
+        self.server = None
+
+    def describe(self) -> Dict[str, object]:
+        return {'indexes': list(self.retrievers), 'reranker': self.reranker is not None, 'pid': os.getpid()}
+
+    def dispatch(self, op:str, request:Dict, array:np.ndarray|None) -> Tuple[object,np.ndarray|None]:
+        if op == 'embed':
+            return None, np.asarray(self.registry.get(request['model']).embed_documents(request['texts']),dtype=np.float32)
+        if op == 'search':
+            embedding = array.tolist() if array is not None else None
+            nodes = self.retrievers[request['index']].retrieve(QueryBundle(query_str=request['query'],embedding=embedding))
+            return [{'id': node.node.node_id, 'text': node.node.get_content(), 'metadata': node.node.metadata, 'score': node.score} for node in nodes], None
+        if op == 'rerank':
+            if self.reranker is None:
+                raise RuntimeError("the sidecar was started without a local reranker")
+            return None, np.asarray(self.reranker.score(request['query'],request['passages']),dtype=np.float32)
+        if op == 'metrics':
+            return metrics.snapshot(), None
+        raise ValueError(f"Unknown sidecar op '{op}'")
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            # A socket left behind by a killed sidecar would make bind fail
+            os.unlink(self.socket_path)
+        self.server = _UnixServer(self.socket_path,_SidecarHandler)
+        self.server.sidecar = self
+        os.chmod(self.socket_path,0o600)
+        print(f"🚀 Inference sidecar listening on {self.socket_path} ({len(self.retrievers)} indexes, reranker {'on' if self.reranker else 'off'})")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+class _Connection:
+    def __init__(self, socket_path:str, timeout:float):
+        self.sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        send_message(self.sock,{'op': 'hello'})
+        header, _ = recv_message(self.sock)
+        self.info = header['result']
+        self.shm = SharedMemory(name=self.info['shm'])
+        # The sidecar owns the block; without this the client's resource tracker would unlink it on exit
+        resource_tracker.unregister(self.shm._name,'shared_memory')
+
+    def close(self):
+        self.shm.close()
+        self.sock.close()
+
+
+class SidecarClient:
+    """
+    Thread-safe client with a small pool of connections, each with its own shared memory block.
+    """
+    def __init__(self, socket_path:str, pool_size:int = 8, timeout:float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(None)
+        self.info: Dict[str, object] = {}
+
+    def wait_ready(self, timeout:float = 120.0) -> Dict[str, object]:
+        """
+        Blocks until the sidecar accepts connections (it may still be loading models) and returns its description.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                connection = _Connection(self.socket_path,self.timeout)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"inference sidecar at {self.socket_path} not ready after {timeout}s")
+                time.sleep(0.5)
+        self.info = connection.info
+        self._pool.get()
+        self._pool.put(connection)
+        print(f"🔌 Connected to inference sidecar (pid {self.info['pid']}, {len(self.info['indexes'])} indexes)")
+        return self.info
+
+    def call(self, op:str, array:np.ndarray|None = None, **request) -> Tuple[object,np.ndarray|None]:
+        connection = self._pool.get()
+        try:
+            if connection is None:
+                connection = _Connection(self.socket_path,self.timeout)
+            send_message(connection.sock,{'op': op, **request},array,connection.shm)
+            header, result_array = recv_message(connection.sock,connection.shm)
+        except (OSError, ConnectionError):
+            # A broken connection is dropped and reopened by the next call
+            if connection is not None:
+                connection.close()
+            connection = None
+            raise
+        finally:
+            self._pool.put(connection)
+        if not header['ok']:
+            raise RuntimeError(f"inference sidecar {op} failed: {header['error']}")
+        return header['result'], result_array
+
+    def embed(self, model:str, texts:List[str]) -> np.ndarray:
+        return self.call('embed',model=model,texts=texts)[1]
+
+    def search(self, index:str, query:str, embedding:List[float]|None = None) -> List[Dict]:
+        array = np.asarray(embedding,dtype=np.float32) if embedding is not None else None
+        return self.call('search',array,index=index,query=query)[0]
+
+    def rerank(self, query:str, passages:List[str]) -> List[float]:
+        return self.call('rerank',query=query,passages=passages)[1].tolist()
+
+    def close(self):
+        while not self._pool.empty():
+            connection = self._pool.get()
+            if connection is not None:
+                connection.close()
+
+
+class RemoteEmbeddings(Embeddings):
+    def __init__(self, client:SidecarClient, model_path:str):
+        self.client = client
+        self.model_path = model_path
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        return self.client.embed(self.model_path,texts).tolist()
+
+    def embed_query(self, text:str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self):
+        pass
+
+
+class RemoteRetriever:
+    """
+    Same retrieve / aretrieve interface as VectorIndexRetriever and DenseRetriever, searched inside the sidecar.
+    """
+    def __init__(self, client:SidecarClient, name:str):
+        self.client = client
+        self.name = name
+
+    def retrieve(self, query:str|QueryBundle) -> List[NodeWithScore]:
+        bundle = query if isinstance(query,QueryBundle) else QueryBundle(query_str=query)
+        results = self.client.search(self.name,bundle.query_str,bundle.embedding)
+        return [NodeWithScore(node=TextNode(id_=r['id'],text=r['text'],metadata=r['metadata']),score=r['score']) for r in results]
+
+    async def aretrieve(self, query:str|QueryBundle) -> List[NodeWithScore]:
+        return await asyncio.to_thread(self.retrieve,query)
+
+
+class RemoteReranker(LocalReranker):
+    """
+    LocalReranker whose scores come from the sidecar, so the pipeline's LocalReranker branches apply unchanged.
+    The sidecar keeps the score cache and the batcher.
+    """
+    def __init__(self, client:SidecarClient, top_n:int = 10):
+        self.client = client
+        self.top_n = top_n
+
+    def score(self, query:str, passages:List[str]) -> List[float]:
+        return self.client.rerank(query,passages) if passages else []
+
+    async def ascore(self, query:str, passages:List[str]) -> List[float]:
+        return await asyncio.to_thread(self.score,query,passages)
+
+    def close(self):
+        pass
@@ -0,0 +1,95 @@
+"""
+BM25 over a CSR inverted index: one int32 array of document ids and one array of term frequencies,
+sliced per term through indptr. Saved as plain .npy files so it opens with mmap next to the vectors.
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+(?:/\w+)?")
+# Greek capitals that look like Latin ones are mixed freely in article numbers ("386Α" vs "386A")
+HOMOGLYPHS = str.maketrans('ΑΒΕΖΗΙΚΜΝΟΡΤΥΧ','ABEZHIKMNOPTYX')
+
+
+def tokenize(text:str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.translate(HOMOGLYPHS).lower())
+
+
+class BM25Index:
+    def __init__(self, vocab:Dict[str,int], indptr:np.ndarray, doc_ids:np.ndarray, tfs:np.ndarray, doc_len:np.ndarray, k1:float = 1.2, b:float = 0.75):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+        document_frequency = np.diff(np.asarray(indptr))
+        self.idf = np.log(1 + (len(doc_len) - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        # Length normalisation does not depend on the query, so it is computed once
+        self.norm = (k1 * (1 - b + b * np.asarray(doc_len) / max(self.avgdl,1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts:List[str], **kwargs) -> 'BM25Index':
+        vocab: Dict[str,int] = {}
+        postings: List[List[Tuple[int,int]]] = []
+        doc_len = np.zeros(len(texts),dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = vocab.setdefault(term,len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id,tf))
+
+        indptr = np.zeros(len(postings) + 1,dtype=np.int64)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+        doc_ids = np.fromiter((doc for p in postings for doc, _ in p),dtype=np.int32,count=int(indptr[-1]))
+        tfs = np.fromiter((tf for p in postings for _, tf in p),dtype=np.float32,count=int(indptr[-1]))
+        return cls(vocab,indptr,doc_ids,tfs,doc_len,**kwargs)
+
+    def save(self, directory:str):
+        os.makedirs(directory,exist_ok=True)
+        for name in ('indptr','doc_ids','tfs','doc_len'):
+            np.save(os.path.join(directory,f'{name}.npy'),getattr(self,name))
+        with open(os.path.join(directory,'vocab.json'),'w',encoding='utf-8') as f:
+            json.dump(self.vocab,f,ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory:str, **kwargs) -> 'BM25Index':
+        with open(os.path.join(directory,'vocab.json'),'r',encoding='utf-8') as f:
+            vocab = json.load(f)
+        arrays = {name: np.load(os.path.join(directory,f'{name}.npy'),mmap_mode='r') for name in ('indptr','doc_ids','tfs','doc_len')}
+        return cls(vocab,**arrays,**kwargs)
+
+    def search(self, query:str, top_k:int, mask:np.ndarray|None = None) -> List[Tuple[int,float]]:
+        scores = np.zeros(len(self.doc_len),dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tfs = self.tfs[start:end]
+            # Each document appears once per term, so plain fancy-index addition is safe
+            scores[docs] += self.idf[term_id] * tfs * (self.k1 + 1) / (tfs + self.norm[docs])
+        if mask is not None:
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        best = matched[np.argsort(-scores[matched])][:top_k]
+        return [(int(i),float(scores[i])) for i in best]
+
+
+def reciprocal_rank_fusion(rankings:List[List[Tuple[object,float]]], top_k:int, k:int = 60) -> List[Tuple[object,float]]:
+    fused: Dict[object,float] = {}
+    for ranking in rankings:
+        for rank, (key, _) in enumerate(ranking):
+            fused[key] = fused.get(key,0.0) + 1 / (k + rank + 1)
+    return sorted(fused.items(),key=lambda item: item[1],reverse=True)[:top_k]
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Type
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.prompts import BasePromptTemplate
+from pydantic import BaseModel
+from backend.api.metrics import metrics
+
+
+class InMemoryLRUBackend:
+    def __init__(self, max_entries:int = 10000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key:str) -> Any|None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key:str, value:Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_chains = InMemoryLRUBackend(256)
+
+
+def compiled_chain(prompt:BasePromptTemplate, model:BaseChatModel, schema:Type[BaseModel]|None = None):
+    """
+    prompt | model (with structured output for schema), built once per (prompt, model, schema) object triple.
+    The entry keeps the prompt and model alive and is checked by identity, so a recycled id() never matches.
+    """
+    key = f"{id(prompt)}:{id(model)}:{schema.__qualname__ if schema else ''}"
+    entry = _chains.get(key)
+    if entry is not None and entry[0] is prompt and entry[1] is model and entry[2] is schema:
+        return entry[3]
+    chain = prompt | (model.with_structured_output(schema) if schema is not None else model)
+    _chains.set(key,(prompt,model,schema,chain))
+    return chain
+
+
+class SQLiteBackend:
+    def __init__(self, path:str, max_entries:int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path,timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key:str) -> Any|None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM completions WHERE key = ?",(key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE completions SET last_access = ? WHERE key = ?",(time.time(),key))
+        return json.loads(row[0])
+
+    def set(self, key:str, value:Any):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO completions (key, value, last_access) VALUES (?, ?, ?)",(key,json.dumps(value),time.time()))
+            conn.execute(
+                "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class CompletionCache:
+    """
+    Exact-match cache of prompt | model completions, keyed by model, temperature, template and input variables.
+    """
+    def __init__(self, backend:InMemoryLRUBackend|SQLiteBackend|None):
+        self.backend = backend
+        self._nodes = set()
+
+    @staticmethod
+    def make_key(model:BaseChatModel, prompt:BasePromptTemplate, variables:Dict[str, Any], schema:Type[BaseModel]|None = None) -> str:
+        payload = json.dumps({
+            'model': getattr(model,'model_name',None) or getattr(model,'model',None),
+            'temperature': getattr(model,'temperature',None),
+            'max_tokens': getattr(model,'max_tokens',None),
+            'template': getattr(prompt,'template',None) or repr(prompt),
+            'variables': variables,
+            'schema': schema.__name__ if schema else None,
+        },sort_keys=True,default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def invoke(self, node:str, prompt:BasePromptTemplate, model:BaseChatModel, variables:Dict[str, Any], schema:Type[BaseModel]|None = None, parse:Callable[[Any], Any]|None = None) -> Any:
+        """
+        Returns the stripped completion text, or a `schema` instance for structured output, passed through `parse` if given.
+        A completion is only stored once `parse` has accepted it, so a malformed answer is never replayed.
+        """
+        if self.backend is None:
+            return self._finish(self._complete(prompt,model,variables,schema),schema,parse)
+
+        self._nodes.add(node)
+        key = self.make_key(model,prompt,variables,schema)
+        cached = self.backend.get(key)
+        if cached is not None:
+            metrics.inc(f'llm_cache.{node}.hits')
+            return self._finish(cached,schema,parse)
+
+        metrics.inc(f'llm_cache.{node}.misses')
+        value = self._complete(prompt,model,variables,schema)
+        result = self._finish(value,schema,parse)
+        self.backend.set(key,value)
+        return result
+
+    async def ainvoke(self, node:str, prompt:BasePromptTemplate, model:BaseChatModel, variables:Dict[str, Any], schema:Type[BaseModel]|None = None, parse:Callable[[Any], Any]|None = None) -> Any:
+        if self.backend is None:
+            return self._finish(await self._acomplete(prompt,model,variables,schema),schema,parse)
+
+        self._nodes.add(node)
+        key = self.make_key(model,prompt,variables,schema)
+        cached = await self._backend_call(self.backend.get,key)
+        if cached is not None:
+            metrics.inc(f'llm_cache.{node}.hits')
+            return self._finish(cached,schema,parse)
+
+        metrics.inc(f'llm_cache.{node}.misses')
+        value = await self._acomplete(prompt,model,variables,schema)
+        result = self._finish(value,schema,parse)
+        await self._backend_call(self.backend.set,key,value)
+        return result
+
+    def batch(self, node:str, prompt:BasePromptTemplate, model:BaseChatModel, variables_list:List[Dict[str, Any]]) -> List[str]:
+        """
+        Stripped completion texts for several inputs of one prompt; the cache misses go out as a single chain.batch call.
+        """
+        keys, results = self._batch_lookup(node,prompt,model,variables_list)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            responses = compiled_chain(prompt,model).batch([variables_list[i] for i in misses])
+            self._batch_store(keys,results,misses,responses)
+        return results
+
+    async def abatch(self, node:str, prompt:BasePromptTemplate, model:BaseChatModel, variables_list:List[Dict[str, Any]]) -> List[str]:
+        keys, results = await self._backend_call(self._batch_lookup,node,prompt,model,variables_list)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            responses = await compiled_chain(prompt,model).abatch([variables_list[i] for i in misses])
+            await self._backend_call(self._batch_store,keys,results,misses,responses)
+        return results
+
+    def _batch_lookup(self, node:str, prompt:BasePromptTemplate, model:BaseChatModel, variables_list:List[Dict[str, Any]]):
+        if self.backend is None:
+            return [None] * len(variables_list), [None] * len(variables_list)
+        self._nodes.add(node)
+        keys = [self.make_key(model,prompt,variables) for variables in variables_list]
+        results = [self.backend.get(key) for key in keys]
+        hits = sum(result is not None for result in results)
+        metrics.inc(f'llm_cache.{node}.hits',hits)
+        metrics.inc(f'llm_cache.{node}.misses',len(keys) - hits)
+        return keys, results
+
+    def _batch_store(self, keys:List[str|None], results:List[str|None], misses:List[int], responses:List[Any]):
+        for i, response in zip(misses,responses):
+            results[i] = str(response.content).strip()
+            if self.backend is not None:
+                self.backend.set(keys[i],results[i])
+
+    async def _backend_call(self, func:Callable, *args) -> Any:
+        # SQLite does blocking file I/O, so it runs off the event loop
+        if isinstance(self.backend,SQLiteBackend):
+            return await asyncio.to_thread(func,*args)
+        return func(*args)
+
+    @staticmethod
+    def _complete(prompt:BasePromptTemplate, model:BaseChatModel, variables:Dict[str, Any], schema:Type[BaseModel]|None) -> Any:
+        if schema is not None:
+            return compiled_chain(prompt,model,schema).invoke(variables).model_dump()
+        return str(compiled_chain(prompt,model).invoke(variables).content).strip()
+
+    @staticmethod
+    async def _acomplete(prompt:BasePromptTemplate, model:BaseChatModel, variables:Dict[str, Any], schema:Type[BaseModel]|None) -> Any:
+        if schema is not None:
+            return (await compiled_chain(prompt,model,schema).ainvoke(variables)).model_dump()
+        return str((await compiled_chain(prompt,model).ainvoke(variables)).content).strip()
+
+    @staticmethod
+    def _finish(value:Any, schema:Type[BaseModel]|None, parse:Callable[[Any], Any]|None) -> Any:
+        result = schema.model_validate(value) if schema is not None else value
+        return parse(result) if parse else result
+
+    def hit_ratios(self) -> Dict[str, float]:
+        return {node:metrics.ratio(f'llm_cache.{node}.hits',f'llm_cache.{node}.misses') for node in sorted(self._nodes)}
+
+
+def build_completion_cache(backend:str, path:str, max_entries:int) -> CompletionCache:
+    if backend == 'memory':
+        return CompletionCache(InMemoryLRUBackend(max_entries))
+    if backend == 'sqlite':
+        return CompletionCache(SQLiteBackend(path,max_entries))
+    if backend == 'off':
+        return CompletionCache(None)
+    raise ValueError(f"Unknown LLM cache backend '{backend}', expected one of ['off', 'memory', 'sqlite']")
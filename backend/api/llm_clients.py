@@ -0,0 +1,34 @@
+import httpx
+from langchain_openai import ChatOpenAI
+
+
+class LLMClients:
+    """
+    Chat models the pipeline and /request share for the life of the worker. Both ride on one pooled httpx client
+    (and one async client), so calls reuse kept-alive TLS connections instead of opening a new one per node.
+    """
+    def __init__(self, model:str, api_key:str, temperature:float = 0.7, max_connections:int = 20, max_keepalive:int = 10, timeout_s:float = 60.0, connect_timeout_s:float = 5.0, max_retries:int = 2, summary_max_tokens:int|None = None):
+        limits = httpx.Limits(max_connections=max_connections,max_keepalive_connections=max_keepalive)
+        timeout = httpx.Timeout(timeout_s,connect=connect_timeout_s)
+        self.http_client = httpx.Client(limits=limits,timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits,timeout=timeout)
+        options = {
+            'model': model,
+            'api_key': api_key,
+            'temperature': temperature,
+            'timeout': timeout_s,
+            'max_retries': max_retries,
+            'http_client': self.http_client,
+            'http_async_client': self.http_async_client,
+        }
+        self.chat = ChatOpenAI(**options)
+        self.streaming_chat = ChatOpenAI(**options,streaming=True)
+        # Context summaries are capped so the answer prompt stays bounded
+        self.summary_chat = ChatOpenAI(**options,max_tokens=summary_max_tokens)
+
+    def close(self):
+        self.http_client.close()
+
+    async def aclose(self):
+        await self.http_async_client.aclose()
+
@@ -1,30 +1,38 @@
 import os 
 from backend.database.config.config import settings
 from llama_index.core import StorageContext
-from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core import load_index_from_storage
-from langchain_huggingface import HuggingFaceEmbeddings
+from backend.api.model_registry import embedding_registry
+from backend.api.llm_cache import CompletionCache, build_completion_cache
+from backend.api.llm_clients import LLMClients
+from backend.api.context_packing import CONTEXT_MODES, dedupe, novel_share, pack, search_chunks
+from backend.api.stream_events import node_progress
+from backend.api.web_search import build_search_backend, StubSearchBackend, TavilySearchBackend
+from backend.api.metrics import metrics
+from backend.api.reranker import LocalReranker
+from backend.api.dense_index import DenseIndex, DenseRetriever
+from backend.api.mmap_index import MmapIndex
+from backend.api.inference_sidecar import SidecarClient, RemoteEmbeddings, RemoteRetriever
+from backend.api.startup import LazyRetriever
+from backend.api.classification import categories_to_indexes, LocalQueryClassifier, MultiLevelClassification, MULTI_LEVEL_CLASSIFICATION_PROMPT
 from sentence_transformers import CrossEncoder
 from llama_index.core.retrievers import VectorIndexRetriever
-from typing import Annotated, List, Dict, TypedDict, Tuple
+from llama_index.core.schema import QueryBundle
+from typing import Annotated, AsyncIterator, Iterator, List, Dict, TypedDict, Tuple
 import cohere, ast
 from cohere.finetuning.finetuning.types.get_finetuned_model_response import GetFinetunedModelResponse
 from langdetect import detect
 from langchain.prompts import PromptTemplate 
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.state import CompiledStateGraph
 from uuid import uuid4
 import operator 
 from openai.cli._errors import OpenAIError
-from langchain.vectorstores import FAISS
 from langchain_core.documents.base import Document as langchainDocument
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
-from langchain_tavily import TavilySearch
 import tiktoken
+import asyncio
+from pydantic import BaseModel, Field
 import re
 from chunking_evaluation import BaseChunker
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -32,12 +40,25 @@ from chunking_evaluation.chunking import (
     FixedTokenChunker,
     RecursiveTokenChunker,
 )
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from functools import lru_cache, partial
+import time
+import logging
+import hashlib
+
+logger = logging.getLogger("uvicorn")
 
 
 def num_tokens(text,encoding):
     return len(encoding.encode(text))
 
+@lru_cache(maxsize=1)
+def context_encoding() -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(settings.OPEN_AI_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
 class SentenceChunker(BaseChunker):
     def __init__(self, sentences_per_chunk, encoding):
         # Initialize the chunker with the number of sentences per chunk
@@ -159,6 +180,75 @@ class ResTokenChunker(BaseChunker):
         return recursive_chunks
 
 
+def phishing_chunks(file:str,text:str,chunker:BaseChunker) -> List[Tuple[str,dict]]:
+    attack_type = file.split('.txt')[0]
+    return [
+        (chunk, {
+            "source": "Phishing Scenarios",
+            "doc_type": "explainer",
+            "title": attack_type,
+            "lang": "en",
+        })
+        for chunk in chunker.split_text(text)
+    ]
+
+def gdpr_chunks(file:str,text:str,chunker:BaseChunker) -> List[Tuple[str,dict]]:
+    title = file.split('.txt')[0]
+    return [
+        (chunk, {
+            "source": "GDPR",
+            "doc_type": "regulation",
+            "title": title,
+            "lang": "en"
+        })
+        for chunk in chunker.split_text(text)
+    ]
+
+def law_case_chunks(file:str,case:str,chunker:BaseChunker,fallback_case_id:str|None = None) -> List[Tuple[str,dict]]:
+    match = re.search(r"Decision number:\s*(.*?)\n", case)
+    # Without a decision number the file name identifies the case, so undated decisions never share an id
+    case_id = match.group(1).strip() if match else fallback_case_id or f"case_{hashlib.sha1(file.encode('utf-8')).hexdigest()[:12]}"
+    court = re.search(r"Court \(Civil/Criminal\):\s*(.*?)\n", case)
+    court_type = court.group(1).strip().lower() if court else "unknown"
+    outcome = re.search(r"Outcome \(innocent, guilty\):\s*(.*?)\n", case)
+    laws = re.findall(r"Law\s+\d+/\d+|Article\s+\d+[A-Z]?(?:\s+of\s+Law\s+\d+/\d+)?", case)
+
+    title = file.split('.txt')[0]
+
+    return [
+        (chunk, {
+            "title":title,
+            "source": "Greek Court Decisions",
+            "doc_type": "case_law",
+            "jurisdiction": "GR",
+            "case_id": case_id,
+            "civil_or_criminal": court_type,
+            "outcome": outcome.group(1).strip() if outcome else "unknown",
+            "relevant_laws": list(set(laws)),
+            "lang": "en"
+        })
+        for chunk in chunker.split_text(case)
+    ]
+
+def cybercrime_chunks(file:str,text:str,chunker:BaseChunker,first_counter:int = 0) -> List[Tuple[str,dict]]:
+    title = file.split('.txt')[0]
+    article_id = re.findall(r"Article\s+(\d+[A-Z]?)", title)
+    law_id = re.findall(r"[ΝΠΚ]\.?\s?\d+/?\d*", title)
+
+    return [
+        (chunk, {
+            "title":title,
+            "source": "Greek Cybercrime Law",
+            "doc_type": "criminal_statute",
+            "law": law_id[0] if law_id else "unknown",
+            # Without an article in the title the chunk counter is used, as before
+            "article_number": article_id[0] if article_id else str(first_counter + i),
+            "lang": "en",
+            "jurisdiction": "GR"
+        })
+        for i, chunk in enumerate(chunker.split_text(text))
+    ]
+
 def parse_phishing(file_directory:str,chunker:BaseChunker):
     files = os.listdir(file_directory)
     chunks = []
@@ -166,23 +256,9 @@ def parse_phishing(file_directory:str,chunker:BaseChunker):
     for file in files:
         with open(file_directory + f'/{file}','r',encoding='utf-8') as f:
             text = f.read()
-        
-        attack_type = file.split('.txt')[0]
-
-        text_chunks = chunker.split_text(text)
-        for chunk in text_chunks:
-            chunks.append(
-                {
-                    "id": f"phishing_{counter}",
-                    "content": chunk,
-                    "metadata": {
-                        "source": "Phishing Scenarios",
-                        "doc_type": "explainer",
-                        "title": attack_type,
-                        "lang": "en",
-                    }
-                }
-            )
+
+        for chunk, metadata in phishing_chunks(file,text,chunker):
+            chunks.append({"id": f"phishing_{counter}", "content": chunk, "metadata": metadata})
             counter+=1
 
     return chunks
@@ -196,23 +272,9 @@ def parse_gdpr(file_directory:str,chunker:BaseChunker):
     for file in files:
         with open(file_directory + f'/{file}','r',encoding='utf-8') as f:
             text = f.read()
-        
-        title = file.split('.txt')[0]
-
-        text_chunks = chunker.split_text(text)
-        for chunk in text_chunks:
-            chunks.append(
-                {
-                    "id": f"gdpr_{counter}",
-                    "content": chunk,
-                    "metadata": {
-                        "source": "GDPR",
-                        "doc_type": "regulation",
-                        "title": title,
-                        "lang": "en"
-                    }
-                }
-            )   
+
+        for chunk, metadata in gdpr_chunks(file,text,chunker):
+            chunks.append({"id": f"gdpr_{counter}", "content": chunk, "metadata": metadata})
             counter+=1
 
     return chunks
@@ -226,32 +288,8 @@ def parse_law_cases(file_directory:str,chunker:BaseChunker):
         with open(file_directory + f'/{file}','r',encoding='utf-8') as f:
             case = f.read()
 
-        match = re.search(r"Decision number:\s*(.*?)\n", case)
-        case_id = match.group(1).strip() if match else f"case_{case_id_}"
-        court = re.search(r"Court \(Civil/Criminal\):\s*(.*?)\n", case)
-        court_type = court.group(1).strip().lower() if court else "unknown"
-        outcome = re.search(r"Outcome \(innocent, guilty\):\s*(.*?)\n", case)
-        laws = re.findall(r"Law\s+\d+/\d+|Article\s+\d+[A-Z]?(\s+of\s+Law\s+\d+/\d+)?", case)
-        
-        title = file.split('.txt')[0]
-
-        text_chunks = chunker.split_text(case)
-        for chunk in text_chunks:
-            chunks.append({
-                "id": f"case_{counter}",
-                "content": chunk,
-                "metadata": {
-                    "title":title,
-                    "source": "Greek Court Decisions",
-                    "doc_type": "case_law",
-                    "jurisdiction": "GR",
-                    "case_id": case_id,
-                    "civil_or_criminal": court_type,
-                    "outcome": outcome.group(1).strip() if outcome else "unknown",
-                    "relevant_laws": list(set(laws)),
-                    "lang": "en"
-                }
-            })
+        for chunk, metadata in law_case_chunks(file,case,chunker,f"case_{case_id_}"):
+            chunks.append({"id": f"case_{counter}", "content": chunk, "metadata": metadata})
             counter+=1
         case_id_ +=1 
 
@@ -264,26 +302,9 @@ def parse_cybercrime(file_directory:str,chunker:BaseChunker):
     for file in files:
         with open(file_directory + f'/{file}','r',encoding='utf-8') as f:
             text = f.read()
-        
-        title = file.split('.txt')[0]
-        article_id = re.findall(r"Article\s+(\d+[A-Z]?)", title)
-        law_id = re.findall(r"[ΝΠΚ]\.?\s?\d+/?\d*", title)
-
-        text_chunks = chunker.split_text(text)
-        for chunk in text_chunks:
-            chunks.append({
-                "id": f"cybercrime_{counter}",
-                "content": chunk,
-                "metadata": {
-                    "title":title,
-                    "source": "Greek Cybercrime Law",
-                    "doc_type": "criminal_statute",
-                    "law": law_id[0] if law_id else "unknown",
-                    "article_number": article_id[0] if article_id else str(counter),
-                    "lang": "en",
-                    "jurisdiction": "GR"
-                }
-            })
+
+        for chunk, metadata in cybercrime_chunks(file,text,chunker,counter):
+            chunks.append({"id": f"cybercrime_{counter}", "content": chunk, "metadata": metadata})
             counter+=1
 
     return chunks
@@ -301,7 +322,8 @@ def parse_cybercrime(file_directory:str,chunker:BaseChunker):
 def load_vector_index(top_k:int,persist_dir:str, embedding):
     storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
     index = load_index_from_storage(storage_context=storage_context,embed_model=embedding)
-    return index.as_retriever(similarity_top_k=top_k,search_type='hybrid')
+    # SimpleVectorStore only does dense search; VECTOR_HYBRID with the dense / mmap backends adds BM25
+    return index.as_retriever(similarity_top_k=top_k)
 
 
 def load_reranker_model():
@@ -309,69 +331,268 @@ def load_reranker_model():
     ft = co.finetuning.get_finetuned_model(settings.COHERE_MODEL_ID)
     return co,ft
 
-def initialize_indexes(top_k:int):
+E5_LARGE_MODEL = './backend/cached_embedding_models/IoannisKat1__multilingual-e5-large-legal-matryoshka'
+MODERNBERT_MODEL = './backend/cached_embedding_models/IoannisKat1__modernbert-embed-base-legal-matryoshka-2'
+BGE_M3_MODEL = './backend/cached_embedding_models/IoannisKat1__bge-m3-legal-matryoshka'
+LEGAL_BERT_MODEL = './backend/cached_embedding_models/IoannisKat1__legal-bert-base-uncased-legal-matryoshka'
 
+# Optional per retriever keys for VECTOR_BACKEND=dense: "truncate_dim" (Matryoshka dims searched) and "two_stage"
+# (re-score the truncated shortlist with full vectors). Missing keys fall back to VECTOR_TRUNCATE_DIM / VECTOR_TWO_STAGE.
+INDEX_CONFIGS = {
     # 🔐 Phishing
-    phishing_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/phishing_index_documents_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__multilingual-e5-large-legal-matryoshka'),
-    )
-
+    "phishing_retriever": {
+        "persist_dir": "./backend/vector_indexes/phishing_index_documents_trained_embedding",
+        "model": E5_LARGE_MODEL,
+    },
     # ⚖️ Law Cases – Recall
-    law_cases_index_recall_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/law_cases_recall_index_documents_recall_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__modernbert-embed-base-legal-matryoshka-2'),
-    )
-
+    "law_cases_index_recall_retriever": {
+        "persist_dir": "./backend/vector_indexes/law_cases_recall_index_documents_recall_trained_embedding",
+        "model": MODERNBERT_MODEL,
+    },
     # ⚖️ Law Cases – Precision
-    law_cases_index_precision_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/law_cases_recall_index_documents_precision_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__bge-m3-legal-matryoshka'),
-    )
-
+    "law_cases_index_precision_retriever": {
+        "persist_dir": "./backend/vector_indexes/law_cases_recall_index_documents_precision_trained_embedding",
+        "model": BGE_M3_MODEL,
+    },
     # 🇬🇷 Greek Penal Code – Recall
-    gpc_index_recall_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/gpc_recall_index_documents_recall_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__legal-bert-base-uncased-legal-matryoshka'),
+    "gpc_index_recall_retriever": {
+        "persist_dir": "./backend/vector_indexes/gpc_recall_index_documents_recall_trained_embedding",
+        "model": LEGAL_BERT_MODEL,
+    },
+    # 🇬🇷 Greek Penal Code – Precision
+    "gpc_index_precision_retriever": {
+        "persist_dir": "./backend/vector_indexes/gpc_recall_index_documents_precision_trained_embedding",
+        "model": MODERNBERT_MODEL,
+    },
+    # 🛡️ GDPR – Recall
+    "gdpr_index_recall_retriever": {
+        "persist_dir": "./backend/vector_indexes/gdpr_recall_index_documents_recall_trained_embedding",
+        "model": MODERNBERT_MODEL,
+    },
+    # 🛡️ GDPR – Precision
+    "gdpr_index_precision_retriever": {
+        "persist_dir": "./backend/vector_indexes/gdpr_precision_index_documents_precision_trained_embedding",
+        "model": E5_LARGE_MODEL,
+    },
+}
+
+def load_local_reranker() -> LocalReranker:
+    return LocalReranker(
+        settings.RERANKER_MODEL_PATH,
+        backend=settings.RERANKER_BACKEND,
+        onnx_file=settings.RERANKER_ONNX_FILE,
+        max_batch_size=settings.RERANKER_MAX_BATCH_SIZE,
+        max_wait_ms=settings.RERANKER_MAX_WAIT_MS,
+        cache_size=settings.RERANKER_CACHE_SIZE,
     )
 
-    # 🇬🇷 Greek Penal Code – Precision
-    gpc_index_precision_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/gpc_recall_index_documents_precision_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__modernbert-embed-base-legal-matryoshka-2'),
+def load_sidecar() -> Tuple[SidecarClient,Dict[str,RemoteRetriever]]:
+    # INFERENCE_MODE=sidecar: this worker loads no models, embeddings / searches / rerank scores come from the sidecar
+    client = SidecarClient(settings.INFERENCE_SOCKET,pool_size=settings.INFERENCE_POOL_SIZE,timeout=settings.INFERENCE_TIMEOUT_S)
+    info = client.wait_ready(settings.INFERENCE_STARTUP_TIMEOUT_S)
+    embedding_registry.use_remote(lambda model_path: RemoteEmbeddings(client,model_path))
+    return client, {name: RemoteRetriever(client,name) for name in info['indexes']}
+
+def load_dense_retriever(top_k:int,config:dict) -> DenseRetriever:
+    index = DenseIndex.from_llama_index(
+        config["persist_dir"],
+        truncate_dim=config.get("truncate_dim",settings.VECTOR_TRUNCATE_DIM),
+        two_stage=config.get("two_stage",settings.VECTOR_TWO_STAGE),
+        shortlist_factor=settings.VECTOR_SHORTLIST_FACTOR,
     )
+    if settings.VECTOR_HYBRID:
+        index.build_lexical()
+    if settings.VECTOR_METADATA_FILTER:
+        index.build_filters()
+    return DenseRetriever(index,embedding_registry.get(config["model"]),top_k,**retriever_options())
 
+def retriever_options() -> dict:
+    return {
+        'hybrid': settings.VECTOR_HYBRID,
+        'candidates': settings.VECTOR_HYBRID_CANDIDATES,
+        'rrf_k': settings.VECTOR_RRF_K,
+        'metadata_filter': settings.VECTOR_METADATA_FILTER,
+    }
 
-    # 🛡️ GDPR – Recall
-    gdpr_index_recall_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/gdpr_recall_index_documents_recall_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__modernbert-embed-base-legal-matryoshka-2'),
+def load_mmap_retriever(top_k:int,name:str,config:dict) -> DenseRetriever:
+    # Built from the llama_index stores with `python -m backend.convert_indexes`
+    index = MmapIndex(
+        os.path.join(settings.VECTOR_MMAP_DIR,name),
+        ef_search=settings.VECTOR_EF_SEARCH,
+        shortlist_factor=settings.VECTOR_SHORTLIST_FACTOR,
     )
-
-    # 🛡️ GDPR – Precision
-    gdpr_index_precision_retriever = load_vector_index(
-        10,
-        "./backend/vector_indexes/gdpr_precision_index_documents_precision_trained_embedding",
-        HuggingFaceEmbeddings(model_name='./backend/cached_embedding_models/IoannisKat1__multilingual-e5-large-legal-matryoshka'),
+    return DenseRetriever(index,embedding_registry.get(config["model"]),top_k,**retriever_options())
+
+def load_retriever(name:str,config:dict,top_k:int):
+    # Indexes that share a model get the same encoder instance from the registry
+    if settings.VECTOR_BACKEND in ('dense','mmap'):
+        retriever = load_dense_retriever(top_k,config) if settings.VECTOR_BACKEND == 'dense' else load_mmap_retriever(top_k,name,config)
+        index_report = retriever.index.report()
+        print(f"🔎 {name}: {index_report['nodes']} nodes, {index_report['search_dims']}/{index_report['dims']} dims{' + rescoring' if index_report['two_stage'] else ''}, {index_report['vectors_mb']} MB vectors, {index_report['search_ms']} ms/search")
+        return retriever
+    return load_vector_index(
+        top_k,
+        config["persist_dir"],
+        embedding_registry.get(config["model"]),
     )
-    
+
+def initialize_indexes(top_k:int):
+    # Index files are read and embedding models loaded side by side; the registry serialises loads of the same model
+    with ThreadPoolExecutor(max_workers=settings.STARTUP_WORKERS,thread_name_prefix='index-load') as executor:
+        futures = {name: executor.submit(load_retriever,name,config,top_k) for name, config in INDEX_CONFIGS.items()}
+        retrievers = {name: future.result() for name, future in futures.items()}
+
+    report = embedding_registry.report()
+    print(f"📊 Loaded {len(report['models'])} embedding models for {len(retrievers)} indexes in {report['total_load_time_s']}s, process RSS {report['rss_mb']} MB")
+    return retrievers
+
+def index_components(top_k:int,lazy:bool = False) -> Dict[str,LazyRetriever]:
+    # With lazy, an index loads on the first query routed to it and does not hold back readiness
     return {
-        "phishing_retriever": phishing_retriever,
-        "law_cases_index_recall_retriever":law_cases_index_recall_retriever,
-        "law_cases_index_precision_retriever":law_cases_index_precision_retriever,
-        "gpc_index_recall_retriever":gpc_index_recall_retriever,
-        "gpc_index_precision_retriever":gpc_index_precision_retriever,
-        "gdpr_index_recall_retriever":gdpr_index_recall_retriever,
-        "gdpr_index_precision_retriever":gdpr_index_precision_retriever,
+        name: LazyRetriever(name,partial(load_retriever,name,config,top_k),retries=settings.STARTUP_RETRIES,backoff_s=settings.STARTUP_RETRY_BACKOFF_S,required=not lazy)
+        for name, config in INDEX_CONFIGS.items()
     }
 
+LANGUAGES = {
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "nl": "Dutch",
+    "ru": "Russian",
+    "ja": "Japanese",
+    "zh-cn": "Chinese (Simplified)",
+    "zh-tw": "Chinese (Traditional)",
+    "ko": "Korean",
+    "ar": "Arabic",
+    "hi": "Hindi",
+    "bn": "Bengali",
+    "tr": "Turkish",
+    "vi": "Vietnamese",
+    "pl": "Polish",
+    "uk": "Ukrainian",
+    "el": "Greek",
+    "ro": "Romanian",
+    "sv": "Swedish",
+    "fi": "Finnish",
+    "no": "Norwegian",
+    "da": "Danish",
+    "hu": "Hungarian",
+    "cs": "Czech",
+    "sk": "Slovak",
+    "ca": "Catalan",
+    "id": "Indonesian",
+    "ms": "Malay",
+    "th": "Thai",
+    "fa": "Persian",
+    "he": "Hebrew"
+}
+
+
+TRANSLATION_PROMPT = """
+    You are a highly competent legal assistant. Your task is to accurately translate the following legal query into English while preserving its original meaning, legal terminology, and nuance.
+
+    Text to translate:
+    {query}
+
+    Provide only the translated version. Do not explain, rephrase, or annotate.
+"""
+
+QUERY_REWRITING_PROMPT = """
+    Rewrite the following user query into 2 semantically similar but linguistically diverse variations.
+
+    Original query:
+    "{query}"
+
+    Instructions:
+    - Maintain the original intent.
+    - Vary the vocabulary and phrasing.
+    - Keep the rewrites concise and clear.
+    - Avoid repeating phrases from the original query verbatim.
+
+    Return your response as a list formatted like:
+    Output: ["First variation", "Second variation"]
+"""
+
+TRANSLATE_AND_REWRITE_PROMPT = """
+    You are a highly competent legal assistant. For the legal query below:
+
+    1. Detect the language it is written in and return its ISO 639-1 code.
+    2. Translate it into English while preserving its original meaning, legal terminology, and nuance. If it is already in English, return it unchanged.
+    3. Rewrite the English query into 2 semantically similar but linguistically diverse variations.
+
+    Query:
+    "{query}"
+
+    Instructions for the variations:
+    - Maintain the original intent.
+    - Vary the vocabulary and phrasing.
+    - Keep the rewrites concise and clear.
+    - Avoid repeating phrases from the original query verbatim.
+"""
+
+CLASSIFICATION_PROMPT = """
+    You are a legal assistant. Your task is to classify a user's query into one or more of the following legal categories:
+
+    1) Phishing Scenarios
+    2) Specific Legal Cases
+    3) GDPR
+    4) Greek Penal Code
+
+    Classify the query based on its subject and context. Always return your output as a list of relevant categories.
+
+    Examples:
+
+    User Query: What is Phishing?
+    Output: ["Phishing Scenarios"]
+
+    User Query: What is GDPR?
+    Output: ["GDPR"]
+
+    User Query: How can phishing be punished in Greek Legislation?
+    Output: ["Greek Penal Code"]
+
+    User Query: What is Phishing and give me an example of such case
+    Output: ["Phishing Scenarios", "Specific Legal Cases"]
+
+    Now classify this query:
+    "{query}"
+"""
+
+CONTEXT_SUMMARY_PROMPT = """
+    You are a highly competent legal assistant designed to provide accurate, well-reasoned, and context-aware answers to legal questions. Your responses should be clear, concise, and grounded in the provided legal context and conversation history.
+
+    I want you to summarize the following context based on the user query. Keep the most relevant information that can help you answer the user query. Keep also related metadata.
+
+    Context:{summarized_context}
+
+    User Query:{query}
+"""
+
+SEARCH_MODES = ['off','parallel','fallback']
+
+SEARCH_SUMMARY_PROMPT = """
+    You are a highly competent legal assistant designed to provide accurate, well-reasoned, and context-aware answers to legal questions. Your responses should be clear, concise, and grounded in the provided legal context and conversation history.
+
+    I want you to summarize the following context based on the user query. Keep the most relevant information that can help you answer the user query. Keep also related metadata in the summarized response.
+
+    Context:{summarized_context}
+
+    User Query:{query}
+"""
+
+
+class TranslatedRewrites(BaseModel):
+    language: str = Field(description="ISO 639-1 code of the language the original query is written in, e.g. 'en', 'el'")
+    english_query: str = Field(description="The query translated into English, or unchanged if it is already in English")
+    variations: List[str] = Field(description="Two semantically similar but linguistically diverse English rewrites of the query")
+
+
 class AgentState(TypedDict):
+    request_id: str
+    search_mode: str
     user_query: str
     language: str
     summarized_context:str
@@ -379,177 +600,323 @@ class AgentState(TypedDict):
     questions: List[str]                    # ✅ Good
     query_classification: Annotated[Dict[str, List[str]], operator.or_]     # ✅ Good
     retrieved_docs: Annotated[Dict[str, List], operator.or_]                # ✅ Good
-    context: Annotated[Dict[str, str], operator.or_] 
+    context: Annotated[Dict[str, str], operator.or_]
+    stats: Annotated[Dict[str, object], operator.or_]
+
+
+def parse_rewrites(response_content:str) -> List[str]:
+    res = response_content.split("Output:")
+    return ast.literal_eval(res[1])
+
+
+def parse_translated_rewrites(response:TranslatedRewrites) -> TranslatedRewrites:
+    if len(response.variations) < 2:
+        raise ValueError("Expected 2 query variations.")
+    return response
+
+
+def parse_categories(response_content:str) -> List[str]:
+    res = response_content.split("Output:")
+    if len(res) > 1:
+        res = res[1]
+    else:
+        res = res[0]
+
+    try:
+        return list(ast.literal_eval(res))
+    except Exception as e:
+        return []
 
 
 class LLM_Pipeline():
-    def __init__(self,index_mapping:dict[str,VectorIndexRetriever],reranker_model:CrossEncoder|GetFinetunedModelResponse,cohere_client:cohere.ClientV2|None = None):
+    def __init__(self,index_mapping:dict[str,VectorIndexRetriever],reranker_model:CrossEncoder|LocalReranker|GetFinetunedModelResponse,cohere_client:cohere.ClientV2|None = None,completion_cache:CompletionCache|None = None,async_cohere_client:cohere.AsyncClientV2|None = None,search_backend:TavilySearchBackend|StubSearchBackend|None = None,llm_clients:LLMClients|None = None):
         self.cohere_client = cohere_client
+        self.async_cohere_client = async_cohere_client or (cohere.AsyncClientV2(settings.COHERE_API_KEY) if cohere_client else None)
+        self.completion_cache = completion_cache or build_completion_cache(settings.LLM_CACHE_BACKEND,settings.LLM_CACHE_PATH,settings.LLM_CACHE_MAX_ENTRIES)
         self.index_mapping = index_mapping
         self.reranker_model = reranker_model
-
-    def retrieving_docs(self,query:str,index_mapping:dict[str,VectorIndexRetriever],indexes:List[VectorIndexRetriever],reranker_model:CrossEncoder|GetFinetunedModelResponse,cohere_client:cohere.client_v2.ClientV2|None):
+        self.index_models = {name:INDEX_CONFIGS[name]["model"] for name in index_mapping if name in INDEX_CONFIGS}
+        self.local_classifier = None
+        self.async_mode = False
+        self.search_backend = search_backend or build_search_backend(settings.SEARCH_BACKEND,settings.TAVILY_API_KEY,settings.SEARCH_STUB_PATH,max_connections=settings.SEARCH_MAX_CONNECTIONS,timeout_s=settings.SEARCH_HTTP_TIMEOUT_S)
+        if settings.CONTEXT_MODE not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode '{settings.CONTEXT_MODE}', expected one of {CONTEXT_MODES}")
+        # One pooled client set and one parsed prompt per node for the life of the pipeline
+        self.llm = llm_clients or LLMClients(
+            settings.OPEN_AI_MODEL,
+            settings.API_KEY,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            timeout_s=settings.LLM_TIMEOUT_S,
+            connect_timeout_s=settings.LLM_CONNECT_TIMEOUT_S,
+            max_retries=settings.LLM_MAX_RETRIES,
+            summary_max_tokens=settings.CONTEXT_SUMMARY_MAX_TOKENS,
+        )
+        self.prompts = {
+            'translation': PromptTemplate(input_variables=['query'],template=TRANSLATION_PROMPT),
+            'query_rewriting': PromptTemplate(input_variables=['query'],template=QUERY_REWRITING_PROMPT),
+            'translate_and_rewrite': PromptTemplate(input_variables=['query'],template=TRANSLATE_AND_REWRITE_PROMPT),
+            'multi_level_classification': PromptTemplate(input_variables=['query','first_variation','second_variation'],template=MULTI_LEVEL_CLASSIFICATION_PROMPT),
+            'classification': PromptTemplate(input_variables=['query'],template=CLASSIFICATION_PROMPT),
+            'context_summary': PromptTemplate(input_variables=['query','summarized_context'],template=CONTEXT_SUMMARY_PROMPT),
+            'search_summary': PromptTemplate(input_variables=['query','summarized_context'],template=SEARCH_SUMMARY_PROMPT),
+        }
+        self.search_executor = ThreadPoolExecutor(max_workers=4,thread_name_prefix='web-search')
+        # Background searches started right after translation, keyed by request id
+        self._search_tasks = {}
+
+    def embed_queries(self,requests:List[Tuple[str,List[str]|None]]) -> Dict[str,Dict[str,List[float]]]:
+        # Work out the distinct (model, text) pairs of a request and encode them in one batch per model
+        texts_by_model = {}
+        for query, indexes in requests:
+            for index in indexes or []:
+                model = self.index_models.get(index)
+                if model is None:
+                    continue
+                texts = texts_by_model.setdefault(model,[])
+                if query not in texts:
+                    texts.append(query)
+
+        def encode(model:str):
+            vectors = embedding_registry.get(model).embed_documents(texts_by_model[model])
+            return model, dict(zip(texts_by_model[model],vectors))
+
+        query_embeddings = {}
+        if not texts_by_model:
+            return query_embeddings
+
+        # Different models have separate locks, so their batches can run side by side
+        with ThreadPoolExecutor(max_workers=len(texts_by_model)) as executor:
+            for model, vectors in executor.map(encode, texts_by_model):
+                query_embeddings[model] = vectors
+        return query_embeddings
+
+    def _query_bundle(self,index_name:str,query:str,query_embeddings:Dict[str,Dict[str,List[float]]]|None) -> QueryBundle|str:
+        embedding = (query_embeddings or {}).get(self.index_models.get(index_name),{}).get(query)
+        if embedding is not None:
+            return QueryBundle(query_str=query,embedding=embedding)
+        return query
+
+    @staticmethod
+    def _to_documents(nodes) -> List[langchainDocument]:
+        return [langchainDocument(page_content=node.text,metadata=node.metadata) for node in nodes]
+
+    def retrieving_docs(self,query:str,index_mapping:dict[str,VectorIndexRetriever],indexes:List[VectorIndexRetriever],reranker_model:CrossEncoder|LocalReranker|GetFinetunedModelResponse,cohere_client:cohere.client_v2.ClientV2|None,query_embeddings:Dict[str,Dict[str,List[float]]]|None = None):
         retrieved_nodes = []
-        for index in indexes:
-            index = index_mapping[index]
-            nodes = index.retrieve(query)
-            retrieved_nodes.append([langchainDocument(page_content=node.text,metadata=node.metadata) for node in nodes])
+        for index_name in indexes:
+            nodes = index_mapping[index_name].retrieve(self._query_bundle(index_name,query,query_embeddings))
+            retrieved_nodes.append(self._to_documents(nodes))
 
             # nodes = index.get_relevant_documents(query)
             # retrieved_nodes.append(nodes)
 
-        if isinstance(reranker_model,CrossEncoder):
-            documents = []
-            for index_nodes in retrieved_nodes:
-                documents += [node for node in index_nodes]
-
-            pairs = [(query, doc.page_content) for doc in documents]
+        if isinstance(reranker_model,LocalReranker):
+            return reranker_model.rerank(query,retrieved_nodes)
 
-            # Step 2: Get scores from the model
-            scores = reranker_model.predict(pairs)  # This returns a list of floats
+        if isinstance(reranker_model,CrossEncoder):
+            return self._cross_encoder_rerank(query,retrieved_nodes,reranker_model)
 
-            # Step 3: Zip scores with documents
-            scored_docs = list(zip(scores, documents))
+        if isinstance(reranker_model,GetFinetunedModelResponse) and cohere_client:
+            documents, documents_texts = self._cohere_documents(retrieved_nodes)
+            response = cohere_client.rerank(
+                query=query,
+                documents=documents_texts,
+                model=reranker_model.finetuned_model.id + "-ft",
+            )
+            return self._cohere_results(documents,response)
 
-            # Step 4: Sort by score descending (like reranker does internally)
-            scored_docs.sort(reverse=True, key=lambda x: x[0])
+    async def aretrieving_docs(self,query:str,indexes:List[str],query_embeddings:Dict[str,Dict[str,List[float]]]|None = None):
+        nodes_per_index = await asyncio.gather(*[
+            self.index_mapping[index_name].aretrieve(self._query_bundle(index_name,query,query_embeddings))
+            for index_name in indexes
+        ])
+        retrieved_nodes = [self._to_documents(nodes) for nodes in nodes_per_index]
 
-            # Step 5: Select top_n
-            top_n = 10
-            reranked_docs = scored_docs[:top_n]
+        if isinstance(self.reranker_model,LocalReranker):
+            return await self.reranker_model.arerank(query,retrieved_nodes)
 
-            return [[node.page_content,node.metadata,float(score)] for score, node in reranked_docs]
+        if isinstance(self.reranker_model,CrossEncoder):
+            return await asyncio.to_thread(self._cross_encoder_rerank,query,retrieved_nodes,self.reranker_model)
 
-        if isinstance(reranker_model,GetFinetunedModelResponse) and cohere_client:
-            documents_texts = []
-            documents = []
-            for index_nodes in retrieved_nodes:
-                for node in index_nodes:
-                    documents_texts.append(node.page_content)
-                    documents.append([node.page_content,node.metadata])
-            
-            response = cohere_client.rerank(
+        if isinstance(self.reranker_model,GetFinetunedModelResponse) and self.async_cohere_client:
+            documents, documents_texts = self._cohere_documents(retrieved_nodes)
+            response = await self.async_cohere_client.rerank(
                 query=query,
                 documents=documents_texts,
-                model=reranker_model.finetuned_model.id + "-ft",
+                model=self.reranker_model.finetuned_model.id + "-ft",
             )
+            return self._cohere_results(documents,response)
 
-            results = response.results
-            doc_indexing = [item.index for item in results]
-            relevance_scores = [item.relevance_score for item in results]
+    @staticmethod
+    def _cross_encoder_rerank(query:str,retrieved_nodes:List[List[langchainDocument]],reranker_model:CrossEncoder):
+        documents = []
+        for index_nodes in retrieved_nodes:
+            documents += [node for node in index_nodes]
 
-            return [[documents[i][0],documents[i][1],relevance_scores[i]] for i in doc_indexing]
+        pairs = [(query, doc.page_content) for doc in documents]
 
+        # Step 2: Get scores from the model
+        scores = reranker_model.predict(pairs)  # This returns a list of floats
 
-    def translation_agent(self,state):
-        dict_lang = {
-            "en": "English",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "pt": "Portuguese",
-            "nl": "Dutch",
-            "ru": "Russian",
-            "ja": "Japanese",
-            "zh-cn": "Chinese (Simplified)",
-            "zh-tw": "Chinese (Traditional)",
-            "ko": "Korean",
-            "ar": "Arabic",
-            "hi": "Hindi",
-            "bn": "Bengali",
-            "tr": "Turkish",
-            "vi": "Vietnamese",
-            "pl": "Polish",
-            "uk": "Ukrainian",
-            "el": "Greek",
-            "ro": "Romanian",
-            "sv": "Swedish",
-            "fi": "Finnish",
-            "no": "Norwegian",
-            "da": "Danish",
-            "hu": "Hungarian",
-            "cs": "Czech",
-            "sk": "Slovak",
-            "ca": "Catalan",
-            "id": "Indonesian",
-            "ms": "Malay",
-            "th": "Thai",
-            "fa": "Persian",
-            "he": "Hebrew"
-        }
+        # Step 3: Zip scores with documents
+        scored_docs = list(zip(scores, documents))
 
-        lang = detect(state['user_query'])
-        if lang != 'en':
-            prompt = """
-            You are a highly competent legal assistant. Your task is to accurately translate the following legal query into English while preserving its original meaning, legal terminology, and nuance.
+        # Step 4: Sort by score descending (like reranker does internally)
+        scored_docs.sort(reverse=True, key=lambda x: x[0])
+
+        # Step 5: Select top_n
+        top_n = 10
+        reranked_docs = scored_docs[:top_n]
+
+        return [[node.page_content,node.metadata,float(score)] for score, node in reranked_docs]
 
-            Text to translate:
-            {query}
+    @staticmethod
+    def _cohere_documents(retrieved_nodes:List[List[langchainDocument]]):
+        documents_texts = []
+        documents = []
+        for index_nodes in retrieved_nodes:
+            for node in index_nodes:
+                documents_texts.append(node.page_content)
+                documents.append([node.page_content,node.metadata])
+        return documents, documents_texts
 
-            Provide only the translated version. Do not explain, rephrase, or annotate.
-            """
+    @staticmethod
+    def _cohere_results(documents:List[List],response):
+        # Each result carries the index of the reranked document and its own relevance score
+        return [[documents[item.index][0],documents[item.index][1],item.relevance_score] for item in response.results]
 
-            prompt = PromptTemplate(input_variables=['query'],template=prompt)
-            model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,   temperature=0.7 )
-            agent_chain = prompt | model
+    def translation_agent(self,state):
+        lang = detect(state['user_query'])
+        if lang != 'en':
+            prompt = self.prompts['translation']
+            model = self.llm.chat
 
-            response = agent_chain.invoke({
+            response_content = self.completion_cache.invoke('translation_agent',prompt,model,{
                 "query":state['user_query']
             })
 
-            response_content = str(response.content).strip()
-
             state['user_query'] = response_content
 
-        state['language'] = dict_lang[lang]
+        state['language'] = LANGUAGES[lang]
 
         return state
-    
-    def query_rewriting(self,state):
-        prompt = """
-        Rewrite the following user query into 2 semantically similar but linguistically diverse variations.
 
-        Original query:
-        "{query}"
+    async def atranslation_agent(self,state):
+        lang = detect(state['user_query'])
+        if lang != 'en':
+            prompt = self.prompts['translation']
+            model = self.llm.chat
+
+            state['user_query'] = await self.completion_cache.ainvoke('translation_agent',prompt,model,{
+                "query":state['user_query']
+            })
 
-        Instructions:
-        - Maintain the original intent.
-        - Vary the vocabulary and phrasing.
-        - Keep the rewrites concise and clear.
-        - Avoid repeating phrases from the original query verbatim.
+        state['language'] = LANGUAGES[lang]
 
-        Return your response as a list formatted like:
-        Output: ["First variation", "Second variation"]
-        """
-        prompt = PromptTemplate(input_variables=['query'],template=prompt)
+        return {'user_query':state['user_query'],'language':state['language']}
 
-        model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,   temperature=0.7 )
-        agent_chain = prompt | model
+    def query_rewriting(self,state):
+        prompt = self.prompts['query_rewriting']
+        model = self.llm.chat
 
         retries = 3
         for _ in range(retries):
             try:
-                response = agent_chain.invoke({
+                res = self.completion_cache.invoke('query_rewriting',prompt,model,{
                     "query":state['user_query']
-                })
+                },parse=parse_rewrites)
 
-                response_content = str(response.content).strip()
-                res = response_content.split("Output:")
-                res = ast.literal_eval(res[1])
                 questions = {0:state['user_query'],1:res[0],2:res[1]}
 
                 state['questions'] = questions
                 return {'questions':questions}
-            
+
             except OpenAIError:
                 raise RuntimeError("Exceeded current quota, please contact the administrator.")  # ✅ Fixed
-            
+
             except Exception as e:
-                continue  
-        
+                continue
+
+        raise RuntimeError("❌ Failed to rewrite query after multiple attempts.")
+
+    async def aquery_rewriting(self,state):
+        prompt = self.prompts['query_rewriting']
+        model = self.llm.chat
+
+        retries = 3
+        for _ in range(retries):
+            try:
+                res = await self.completion_cache.ainvoke('query_rewriting',prompt,model,{
+                    "query":state['user_query']
+                },parse=parse_rewrites)
+
+                questions = {0:state['user_query'],1:res[0],2:res[1]}
+
+                state['questions'] = questions
+                return {'questions':questions}
+
+            except OpenAIError:
+                raise RuntimeError("Exceeded current quota, please contact the administrator.")
+
+            except Exception as e:
+                continue
+
         raise RuntimeError("❌ Failed to rewrite query after multiple attempts.")
 
+    def _apply_translated_rewrites(self,state,response:TranslatedRewrites):
+        lang = response.language.strip().lower()
+        if lang not in LANGUAGES:
+            lang = detect(state['user_query'])
+
+        user_query = response.english_query.strip()
+        questions = {0:user_query,1:response.variations[0],2:response.variations[1]}
+
+        state['user_query'] = user_query
+        state['language'] = LANGUAGES.get(lang,'English')
+        state['questions'] = questions
+        return {'user_query':user_query,'language':state['language'],'questions':questions}
+
+    def translate_and_rewrite(self,state):
+        # Language detection, translation and query rewriting in a single structured call
+        prompt = self.prompts['translate_and_rewrite']
+        model = self.llm.chat
+
+        retries = 3
+        for _ in range(retries):
+            try:
+                response = self.completion_cache.invoke('translate_and_rewrite',prompt,model,{
+                    "query":state['user_query']
+                },schema=TranslatedRewrites,parse=parse_translated_rewrites)
+                return self._apply_translated_rewrites(state,response)
+
+            except OpenAIError:
+                raise RuntimeError("Exceeded current quota, please contact the administrator.")
+
+            except Exception as e:
+                continue
+
+        raise RuntimeError("❌ Failed to translate and rewrite query after multiple attempts.")
+
+    async def atranslate_and_rewrite(self,state):
+        prompt = self.prompts['translate_and_rewrite']
+        model = self.llm.chat
+
+        retries = 3
+        for _ in range(retries):
+            try:
+                response = await self.completion_cache.ainvoke('translate_and_rewrite',prompt,model,{
+                    "query":state['user_query']
+                },schema=TranslatedRewrites,parse=parse_translated_rewrites)
+                return self._apply_translated_rewrites(state,response)
+
+            except OpenAIError:
+                raise RuntimeError("Exceeded current quota, please contact the administrator.")
+
+            except Exception as e:
+                continue
+
+        raise RuntimeError("❌ Failed to translate and rewrite query after multiple attempts.")
+
     def run_classifications_parallel(self,state):
         levels = [0,1,2]
         results = {}
@@ -559,89 +926,133 @@ class LLM_Pipeline():
                 result = self.query_classification(state, level)
                 return level, result
             except Exception as e:
+                logger.warning(f"Classification of level {level} failed: {e}")
                 return level, {}
-        
+
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = {executor.submit(classify, level): level for level in levels}
             for future in as_completed(futures):
                 level, result = future.result()
                 results[level] = result
-        
+
         combined = {}
         for i in range(3):
-            combined[i] = results[i]['query_classification'][i]
+            # A failed level is left unclassified instead of failing the whole request
+            combined[i] = results[i].get('query_classification',{}).get(i) or [state['questions'][i],None]
         state['query_classification'] = combined
         return {'query_classification': state['query_classification']}
 
-    def query_classification(self,state,level:int):
-        prompt ="""  
-            You are a legal assistant. Your task is to classify a user's query into one or more of the following legal categories:
+    async def arun_classifications_parallel(self,state):
+        levels = [0,1,2]
+        results = await asyncio.gather(*[self.aquery_classification(state,level) for level in levels])
 
-            1) Phishing Scenarios  
-            2) Specific Legal Cases  
-            3) GDPR  
-            4) Greek Penal Code
+        combined = {}
+        for level, result in zip(levels,results):
+            combined[level] = result.get('query_classification',{}).get(level) or [state['questions'][level],None]
+        state['query_classification'] = combined
+        return {'query_classification': state['query_classification']}
 
-            Classify the query based on its subject and context. Always return your output as a list of relevant categories.
+    def _apply_multi_level_classification(self,state,response:MultiLevelClassification):
+        combined = {}
+        for level, categories in enumerate(response.as_levels()):
+            combined[level] = [state['questions'][level],categories_to_indexes(categories) or None]
+        state['query_classification'] = combined
+        return {'query_classification': state['query_classification']}
 
-            Examples:
+    def run_classification_single_call(self,state):
+        # One structured-output request classifies the original query and both rewrites
+        prompt = self.prompts['multi_level_classification']
+        model = self.llm.chat
 
-            User Query: What is Phishing?  
-            Output: ["Phishing Scenarios"]
+        try:
+            response = self.completion_cache.invoke('query_classification_single_call',prompt,model,{
+                "query":state['questions'][0],
+                "first_variation":state['questions'][1],
+                "second_variation":state['questions'][2],
+            },schema=MultiLevelClassification)
+        except OpenAIError:
+            raise RuntimeError("Exceeded current quota, please contact the administrator.")
+        except Exception as e:
+            logger.warning(f"Single-call classification failed, falling back to per-level calls: {e}")
+            return self.run_classifications_parallel(state)
 
-            User Query: What is GDPR?  
-            Output: ["GDPR"]
+        return self._apply_multi_level_classification(state,response)
 
-            User Query: How can phishing be punished in Greek Legislation?  
-            Output: ["Greek Penal Code"]
+    async def arun_classification_single_call(self,state):
+        prompt = self.prompts['multi_level_classification']
+        model = self.llm.chat
 
-            User Query: What is Phishing and give me an example of such case  
-            Output: ["Phishing Scenarios", "Specific Legal Cases"]
+        try:
+            response = await self.completion_cache.ainvoke('query_classification_single_call',prompt,model,{
+                "query":state['questions'][0],
+                "first_variation":state['questions'][1],
+                "second_variation":state['questions'][2],
+            },schema=MultiLevelClassification)
+        except OpenAIError:
+            raise RuntimeError("Exceeded current quota, please contact the administrator.")
+        except Exception as e:
+            logger.warning(f"Single-call classification failed, falling back to per-level calls: {e}")
+            return await self.arun_classifications_parallel(state)
 
-            Now classify this query:  
-            "{query}"
+        return self._apply_multi_level_classification(state,response)
 
-        """
-        prompt = PromptTemplate(input_variables=['query'],template=prompt)
-        model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,   temperature=0.7 )
-        agent_chain = prompt | model
+    def run_classification_local(self,state):
+        # Embedding-centroid routing on an already-loaded model, no LLM call
+        if self.local_classifier is None:
+            self.local_classifier = LocalQueryClassifier(embedding_registry.get(E5_LARGE_MODEL))
 
-        response = agent_chain.invoke({
-            "query":state['questions'][level]
-        })
+        questions = [state['questions'][level] for level in range(3)]
+        combined = {}
+        for level, categories in enumerate(self.local_classifier.classify(questions)):
+            combined[level] = [questions[level],categories_to_indexes(categories) or None]
+        state['query_classification'] = combined
+        return {'query_classification': state['query_classification']}
 
-        response_content = str(response.content).strip()
+    def classification_node(self,mode:str,async_mode:bool = False):
+        nodes = {
+            'parallel': self.arun_classifications_parallel if async_mode else self.run_classifications_parallel,
+            'single': self.arun_classification_single_call if async_mode else self.run_classification_single_call,
+            # CPU-bound; LangGraph runs sync nodes in its executor under ainvoke
+            'local': self.run_classification_local,
+        }
+        if mode not in nodes:
+            raise ValueError(f"Unknown classification mode '{mode}', expected one of {list(nodes)}")
+        return nodes[mode]
+
+    def _classification_update(self,state,level:int,response_content:str):
+        categories = parse_categories(response_content)
+        indexes = categories_to_indexes(categories) if len(categories) > 0 else None
+        state['query_classification'] = {level:[state['questions'][level],indexes]}
+        return {'query_classification':state['query_classification']}
 
-        res = response_content.split("Output:")
-        if len(res) > 1:
-            res = res[1]
-        else:
-            res = res[0]
+    def query_classification(self,state,level:int):
+        prompt = self.prompts['classification']
+        model = self.llm.chat
 
-        if isinstance(res, list) and isinstance(res[0], str):
-            res = res[0]
-        
         try:
-            categories = ast.literal_eval(res)
-
-            if len(categories) > 0:
-                indexes = []
-                for category in categories:
-                    if category == 'GDPR':
-                        indexes += ["gdpr_index_recall_retriever","gdpr_index_precision_retriever"]
-                    if category == 'Greek Penal Code':
-                        indexes += ["gpc_index_recall_retriever","gpc_index_precision_retriever"]
-                    if category == 'Specific Legal Cases':
-                        indexes += ["law_cases_index_recall_retriever","law_cases_index_precision_retriever"]
-                    if category == 'Phishing Scenarios':
-                        indexes += ["phishing_retriever"]
-                state['query_classification'] = {level:[state['questions'][level],indexes]}
-            else: state['query_classification'] = {level:[state['questions'][level],None]}
+            response_content = self.completion_cache.invoke('query_classification',prompt,model,{
+                "query":state['questions'][level]
+            })
+        except Exception as e:
+            # The level is left unclassified, same as the async node
+            logger.warning(f"Classification of level {level} failed: {e}")
+            response_content = ""
+
+        return self._classification_update(state,level,response_content)
 
+    async def aquery_classification(self,state,level:int):
+        prompt = self.prompts['classification']
+        model = self.llm.chat
+
+        try:
+            response_content = await self.completion_cache.ainvoke('query_classification',prompt,model,{
+                "query":state['questions'][level]
+            })
         except Exception as e:
-            state['query_classification'] = {level:[state['questions'][level],None]}
+            logger.warning(f"Classification of level {level} failed: {e}")
+            response_content = ""
 
-        return {'query_classification':state['query_classification']}
+        return self._classification_update(state,level,response_content)
 
     def query_classification_1(self,state):
         return self.query_classification(state,0)
@@ -651,31 +1062,69 @@ class LLM_Pipeline():
 
     def query_classification_3(self,state):
         return self.query_classification(state,2)
-    
-    def run_retrievals_parallel(self,state):
-        levels = [0,1,2]
+
+    def _retrieval_groups(self,state):
+        # Levels that classify to the same indexes for the same query share one retrieval and rerank
         results = {}
+        groups = {}
+        for level in [0,1,2]:
+            indexes = state['query_classification'][level][1]
+            if not indexes:
+                results[level] = None
+                continue
+            key = (state['questions'][0],tuple(sorted(set(indexes))))
+            groups.setdefault(key,[]).append(level)
+        return results, groups
+
+    @staticmethod
+    def _retrieval_stats(groups):
+        return {
+            'retrieval_groups': len(groups),
+            'retrieval_deduplicated': sum(len(levels_in_group) - 1 for levels_in_group in groups.values()),
+        }
 
-        def retrieve(level):
-            return level, self.retrieve_docs(state, level)
-    
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {executor.submit(retrieve, level): level for level in levels}
-            for future in as_completed(futures):
-                level, result = future.result()
-                results[level] = result
+    def run_retrievals_parallel(self,state):
+        results, groups = self._retrieval_groups(state)
+
+        query_embeddings = self.embed_queries([(query,list(indexes)) for query, indexes in groups])
 
+        # The group key holds the deduplicated indexes, so a repeated category never runs its retriever twice
+        def retrieve(key,levels_in_group):
+            query, indexes = key
+            return levels_in_group, self.retrieving_docs(query,self.index_mapping,list(indexes),self.reranker_model,self.cohere_client,query_embeddings)
+
+        if groups:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                futures = [executor.submit(retrieve, key, levels_in_group) for key, levels_in_group in groups.items()]
+                for future in as_completed(futures):
+                    levels_in_group, result = future.result()
+                    for level in levels_in_group:
+                        results[level] = result
 
         state['retrieved_docs'] = results
-        return {'retrieved_docs': state['retrieved_docs']}
+        return {'retrieved_docs': state['retrieved_docs'], 'stats': self._retrieval_stats(groups)}
+
+    async def arun_retrievals_parallel(self,state):
+        results, groups = self._retrieval_groups(state)
+
+        # Query encoding is CPU-bound, keep it off the event loop
+        query_embeddings = await asyncio.to_thread(self.embed_queries,[(query,list(indexes)) for query, indexes in groups])
+
+        group_levels = list(groups.values())
+        group_results = await asyncio.gather(*[self.aretrieving_docs(query,list(indexes),query_embeddings) for query, indexes in groups])
+        for levels_in_group, result in zip(group_levels,group_results):
+            for level in levels_in_group:
+                results[level] = result
 
+        state['retrieved_docs'] = results
+        return {'retrieved_docs': state['retrieved_docs'], 'stats': self._retrieval_stats(groups)}
 
-    def retrieve_docs(self,state,level):
-        retrieved_documents = self.retrieving_docs(state['questions'][0],self.index_mapping,state['query_classification'][level][1],self.reranker_model,self.cohere_client) if state['query_classification'][level][1] else None
+    def retrieve_docs(self,state,level,query_embeddings:Dict[str,Dict[str,List[float]]]|None = None):
+        retrieved_documents = self.retrieving_docs(state['questions'][0],self.index_mapping,state['query_classification'][level][1],self.reranker_model,self.cohere_client,query_embeddings) if state['query_classification'][level][1] else None
         return retrieved_documents
         # state['retrieved_docs'][level] = retrieved_documents
         # return {level:state['retrieved_docs'][level]}
-    
+
     def retrieve_docs_1(self,state):
         return {'retrieved_docs': self.retrieve_docs(state,0)}
 
@@ -685,115 +1134,255 @@ class LLM_Pipeline():
     def retrieve_docs_3(self,state):
         return {'retrieved_docs': self.retrieve_docs(state,2)}
 
-    def get_context(self,state):
-        summarized_prompt = """
-            You are a highly competent legal assistant designed to provide accurate, well-reasoned, and context-aware answers to legal questions. Your responses should be clear, concise, and grounded in the provided legal context and conversation history.
-
-            I want you to summarize the following context based on the user query. Keep the most relevant information that can help you answer the user query. Keep also related metadata.
-            
-            Context:{summarized_context}
-
-            User Query:{query}
+    @staticmethod
+    def _level_contexts(state) -> Tuple[Dict[int,str],Dict[str,object]]:
         """
+        Map step input: one numbered context per level. A chunk retrieved for several levels is kept once, at the
+        first level that has it, with its best score. Each level is packed by score up to CONTEXT_LEVEL_TOKEN_BUDGET.
+        """
+        encoding = context_encoding()
+        chunks, duplicates = dedupe([content,metadata,score,level] for level in range(3) for content, metadata, score in (state['retrieved_docs'].get(level) or []))
+        by_level = {}
+        for content, metadata, score, level in chunks:
+            by_level.setdefault(level,[]).append([content,metadata,score])
+
+        contexts = {}
+        level_tokens = {}
+        for level, documents in by_level.items():
+            text, used = pack(documents,settings.CONTEXT_LEVEL_TOKEN_BUDGET,encoding)
+            if text:
+                contexts[level] = text
+                level_tokens[level] = used
+
+        return contexts, {'context_chunks': len(chunks), 'context_duplicates': duplicates, 'context_tokens': level_tokens}
+
+    def _context_variables(self,state,contexts:Dict[int,str]) -> List[Dict[str,str]]:
+        return [{"query":state['user_query'],"summarized_context":contexts[level]} for level in sorted(contexts)]
+
+    @staticmethod
+    def _context_update(summaries:List[str],stats:Dict[str,object],start:float):
+        # Reduce step: the level summaries in level order
+        seconds = time.perf_counter() - start
+        metrics.observe('pipeline.get_context_seconds',seconds)
+        stats['context_summary_seconds'] = round(seconds,3)
+        return {'summarized_context': "\n\n".join(summary for summary in summaries if summary), 'stats': stats}
+
+    @staticmethod
+    def _packed_context(state):
+        # Extractive mode: the reranked chunks of every level, deduplicated and packed by score, no LLM call
+        start = time.perf_counter()
+        chunks, duplicates = dedupe(doc for level in range(3) for doc in (state['retrieved_docs'].get(level) or []))
+        text, used = pack(chunks,settings.CONTEXT_PACK_TOKEN_BUDGET,context_encoding())
+        seconds = time.perf_counter() - start
+        metrics.observe('pipeline.get_context_seconds',seconds)
+        stats = {'context_chunks': len(chunks), 'context_duplicates': duplicates, 'context_tokens': used, 'context_summary_seconds': round(seconds,3)}
+        return {'summarized_context': text, 'stats': stats}
 
-        summarized_prompt = PromptTemplate(input_variables=['query','summarized_context'],template=summarized_prompt)
-        model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,   temperature=0.7 )
-        agent_chain = summarized_prompt | model
-
-        def summarize_level(level:int):
-            if not state['retrieved_docs'][level]:
-                return level, ""
-            retrieved_documents = state['retrieved_docs'][level]
-            if len(retrieved_documents) != 0:
-                return level, ""
-            
-            joined_context = '\n'.join(f'{i}) {retrieved_documents[i][0]} (score:{retrieved_documents[i][2]}) metadata:{retrieved_documents[i][1]}' for i in range(len(retrieved_documents)))
-
-            response = agent_chain.invoke({
-                "query":state['user_query'],
-                "summarized_context":joined_context
-            })
+    def get_context(self,state):
+        if settings.CONTEXT_MODE == 'extractive':
+            return self._packed_context(state)
+        start = time.perf_counter()
+        contexts, stats = self._level_contexts(state)
+        summaries = self.completion_cache.batch('get_context',self.prompts['context_summary'],self.llm.summary_chat,self._context_variables(state,contexts)) if contexts else []
+        return self._context_update(summaries,stats,start)
+
+    async def aget_context(self,state):
+        if settings.CONTEXT_MODE == 'extractive':
+            return self._packed_context(state)
+        start = time.perf_counter()
+        contexts, stats = self._level_contexts(state)
+        summaries = await self.completion_cache.abatch('get_context',self.prompts['context_summary'],self.llm.summary_chat,self._context_variables(state,contexts)) if contexts else []
+        return self._context_update(summaries,stats,start)
+
+    @staticmethod
+    def _search_context(results:List[Dict]) -> str:
+        return '\n'.join(f"{result['title']}) {result['content']} (score:{result['score']}) metadata:{result['url']}" for result in results)
 
-            return level, str(response.content).strip()
-        
-        summarized_by_level = {}
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {executor.submit(summarize_level, level): level for level in range(3)}
-            summarized_contexts = {}
-            for future in as_completed(futures):
-                level, summary = future.result()
-                summarized_contexts[level] = summary
+    def get_search_results(self,state):
+        return {'search_results': self.search_and_summarize(state['user_query'])}
 
-        full_summary = "\n\n".join(
-            summarized_by_level[i] for i in range(3) if i in summarized_by_level
-        )
+    async def aget_search_results(self,state):
+        return {'search_results': await self.asearch_and_summarize(state['user_query'])}
 
-        return {'summarized_context': full_summary}
-    
-    def get_search_results(self,state):
-        search_tool = TavilySearch(
-            max_results=5,
-            include_answer=True,
-            include_raw_content=True,
-            include_images=False,
-            tavily_api_key=settings.TAVILY_API_KEY,
-        )
+    @staticmethod
+    def _packed_search(results:List[Dict]) -> str:
+        chunks, _ = dedupe(search_chunks(results))
+        return pack(chunks,settings.SEARCH_PACK_TOKEN_BUDGET,context_encoding())[0]
 
-        search_response = search_tool.invoke({"query": state['user_query']})
-        
+    def search_and_summarize(self,query:str) -> str:
+        results = self.search_backend.search(query)
+        if not results:
+            return ""
+        if settings.CONTEXT_MODE == 'extractive':
+            return self._packed_search(results)
 
-        summarized_prompt = """
-            You are a highly competent legal assistant designed to provide accurate, well-reasoned, and context-aware answers to legal questions. Your responses should be clear, concise, and grounded in the provided legal context and conversation history.
+        summarized_prompt = self.prompts['search_summary']
+        model = self.llm.chat
 
-            I want you to summarize the following context based on the user query. Keep the most relevant information that can help you answer the user query. Keep also related metadata in the summarized response.
-            
-            Context:{summarized_context}
+        return self.completion_cache.invoke('get_search_results',summarized_prompt,model,{
+            "query":query,
+            "summarized_context":self._search_context(results),
+        })
 
-            User Query:{query}
-        """
+    async def asearch_and_summarize(self,query:str) -> str:
+        results = await self.search_backend.asearch(query)
+        if not results:
+            return ""
+        if settings.CONTEXT_MODE == 'extractive':
+            return self._packed_search(results)
 
-        summarized_prompt = PromptTemplate(input_variables=['query','summarized_context'],template=summarized_prompt)
-        model = ChatOpenAI(model=settings.OPEN_AI_MODEL,api_key=settings.API_KEY,   temperature=0.7 )
-        agent_chain = summarized_prompt | model
+        summarized_prompt = self.prompts['search_summary']
+        model = self.llm.chat
 
-        response = agent_chain.invoke({
-            "query":state['user_query'],
-            "summarized_context":'\n'.join(f"{result['title']}) {result['content']} (score:{result['score']}) metadata:{result['url']}" for result in search_response['results']),
+        return await self.completion_cache.ainvoke('get_search_results',summarized_prompt,model,{
+            "query":query,
+            "summarized_context":self._search_context(results),
         })
 
-        summarized_context = str(response.content).strip()
-        
-        return {'search_results': summarized_context}
-
-    def initialize_workflow(self):
+    @staticmethod
+    def _search_mode(state) -> str:
+        return state.get('search_mode') or settings.SEARCH_MODE
+
+    @staticmethod
+    def _rag_is_weak(state) -> bool:
+        scores = [doc[2] for level_docs in (state.get('retrieved_docs') or {}).values() for doc in level_docs or []]
+        return not scores or max(scores) < settings.SEARCH_WEAK_RAG_SCORE
+
+    @staticmethod
+    def _search_update(outcome:str,search_results:str,started:float|None,rag_context:str = ""):
+        metrics.inc('search.requests')
+        metrics.inc(f'search.{outcome}')
+        stats = {'search_outcome': outcome}
+        if outcome == 'used':
+            # The web results reached the answer prompt; they only changed it if they say something the RAG context did not
+            stats['search_novelty'] = round(novel_share(search_results,rag_context),3)
+            if stats['search_novelty'] >= settings.SEARCH_CHANGED_MIN_NOVELTY:
+                metrics.inc('search.changed_context')
+        if started is not None:
+            metrics.observe('search.latency_seconds',time.perf_counter() - started)
+        return {'search_results': search_results, 'stats': stats}
+
+    def start_search(self,state):
+        # Parallel mode starts the search next to the whole RAG branch, collect_search picks it up at the end
+        if self._search_mode(state) == 'parallel':
+            self._search_tasks[state['request_id']] = (time.perf_counter(),self.search_executor.submit(self.search_and_summarize,state['user_query']))
+        return {}
+
+    async def astart_search(self,state):
+        if self._search_mode(state) == 'parallel':
+            self._search_tasks[state['request_id']] = (time.perf_counter(),asyncio.create_task(self.asearch_and_summarize(state['user_query'])))
+        return {}
+
+    def collect_search(self,state):
+        mode = self._search_mode(state)
+        entry = self._search_tasks.pop(state['request_id'],None)
+        if mode == 'off':
+            return self._search_update('off',"",None)
+        if mode == 'fallback':
+            if not self._rag_is_weak(state):
+                return self._search_update('skipped',"",None)
+            entry = (time.perf_counter(),self.search_executor.submit(self.search_and_summarize,state['user_query']))
+        if entry is None:
+            return self._search_update('skipped',"",None)
+
+        # The budget counts from the moment the search started, whatever the RAG branch took
+        started, future = entry
+        remaining = settings.SEARCH_TIMEOUT_SECONDS - (time.perf_counter() - started)
+        try:
+            search_results = future.result(timeout=max(remaining,0))
+        except FutureTimeoutError:
+            future.cancel()
+            return self._search_update('timeout',"",started)
+        except Exception as e:
+            logger.warning(f"Web search failed: {e}")
+            return self._search_update('error',"",started)
+        return self._search_update('used' if search_results else 'empty',search_results,started,state.get('summarized_context') or "")
+
+    async def acollect_search(self,state):
+        mode = self._search_mode(state)
+        entry = self._search_tasks.pop(state['request_id'],None)
+        if mode == 'off':
+            return self._search_update('off',"",None)
+        if mode == 'fallback':
+            if not self._rag_is_weak(state):
+                return self._search_update('skipped',"",None)
+            entry = (time.perf_counter(),asyncio.create_task(self.asearch_and_summarize(state['user_query'])))
+        if entry is None:
+            return self._search_update('skipped',"",None)
+
+        started, task = entry
+        remaining = settings.SEARCH_TIMEOUT_SECONDS - (time.perf_counter() - started)
+        try:
+            search_results = await asyncio.wait_for(task,timeout=max(remaining,0))
+        except asyncio.TimeoutError:
+            return self._search_update('timeout',"",started)
+        except Exception as e:
+            logger.warning(f"Web search failed: {e}")
+            return self._search_update('error',"",started)
+        return self._search_update('used' if search_results else 'empty',search_results,started,state.get('summarized_context') or "")
+
+    def _discard_search(self,request_id:str):
+        entry = self._search_tasks.pop(request_id,None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def shutdown(self):
+        for request_id in list(self._search_tasks):
+            self._discard_search(request_id)
+        self.search_executor.shutdown(wait=False,cancel_futures=True)
+        if isinstance(self.reranker_model,LocalReranker):
+            self.reranker_model.close()
+        self.llm.close()
+        self.search_backend.close()
+
+    async def aclose(self):
+        # The async HTTP pools belong to the event loop, so they are closed from it
+        await self.llm.aclose()
+        await self.search_backend.aclose()
+
+    def initialize_workflow(self,classification_mode:str|None = None,fused_rewriting:bool|None = None,async_mode:bool|None = None):
+        fused_rewriting = settings.FUSED_REWRITING if fused_rewriting is None else fused_rewriting
+        self.async_mode = settings.ASYNC_PIPELINE if async_mode is None else async_mode
         workflow = StateGraph(AgentState)
 
-        ## Query translation
-        workflow.add_node("translation",self.translation_agent)
-        ## Query re-writing
-        workflow.add_node('query_rewriting',self.query_rewriting)
+        def node(sync_node, async_node):
+            return async_node if self.async_mode else sync_node
+
+        if fused_rewriting:
+            ## Query translation and re-writing in one call
+            workflow.add_node("translation",node(self.translate_and_rewrite,self.atranslate_and_rewrite))
+        else:
+            ## Query translation
+            workflow.add_node("translation",node(self.translation_agent,self.atranslation_agent))
+            ## Query re-writing
+            workflow.add_node('query_rewriting',node(self.query_rewriting,self.aquery_rewriting))
 
         ## Query Categorization of query and variants
-        workflow.add_node('parallel_classification',self.run_classifications_parallel)
+        workflow.add_node('parallel_classification',self.classification_node(classification_mode or settings.CLASSIFICATION_MODE,self.async_mode))
 
         # workflow.add_node("query_categorization_1",self.query_classification_1)
         # workflow.add_node("query_categorization_2",self.query_classification_2)
         # workflow.add_node("query_categorization_3",self.query_classification_3)
         ## Document Retrieval
-        workflow.add_node('parallel_retrieval',self.run_retrievals_parallel)
+        workflow.add_node('parallel_retrieval',node(self.run_retrievals_parallel,self.arun_retrievals_parallel))
         # workflow.add_node("retrieve_documents_1",self.retrieve_docs_1)
         # workflow.add_node("retrieve_documents_2",self.retrieve_docs_2)
         # workflow.add_node("retrieve_documents_3",self.retrieve_docs_3)
         ## Document Aggregation and Response
-        workflow.add_node("get_context",self.get_context)
+        workflow.add_node("get_context",node(self.get_context,self.aget_context))
         ## Search Flow
-        workflow.add_node("get_search_results",self.get_search_results)
+        workflow.add_node("start_search",node(self.start_search,self.astart_search))
+        workflow.add_node("collect_search",node(self.collect_search,self.acollect_search))
 
-        ## Query translation -> Query re-writing
-        workflow.add_edge("translation","query_rewriting")
-        workflow.add_edge("translation","get_search_results")
-        ## Query re-writing -> Query Categorization
-        workflow.add_edge("query_rewriting","parallel_classification")
+        workflow.add_edge("translation","start_search")
+        if fused_rewriting:
+            ## Query translation and re-writing -> Query Categorization
+            workflow.add_edge("translation","parallel_classification")
+        else:
+            ## Query translation -> Query re-writing
+            workflow.add_edge("translation","query_rewriting")
+            ## Query re-writing -> Query Categorization
+            workflow.add_edge("query_rewriting","parallel_classification")
         # workflow.add_edge("query_rewriting","query_categorization_1")
         # workflow.add_edge("query_rewriting","query_categorization_2")
         # workflow.add_edge("query_rewriting","query_categorization_3")
@@ -804,35 +1393,120 @@ class LLM_Pipeline():
         # workflow.add_edge("query_categorization_3","retrieve_documents_3")
         # ## Retrieval Documents -> Document Aggregation and Response
         workflow.add_edge("parallel_retrieval","get_context")
+        ## Document Aggregation -> Web search results, within the search latency budget
+        workflow.add_edge("get_context","collect_search")
         # workflow.add_edge("retrieve_documents_1","get_context")
         # workflow.add_edge("retrieve_documents_2","get_context")
         # workflow.add_edge("retrieve_documents_3","get_context")
-        
+
 
         workflow.set_entry_point("translation")
         checkpointer = MemorySaver()
         app = workflow.compile(checkpointer = checkpointer)
 
         return app
-    
-    def get_context_from_graph(self,app:CompiledStateGraph,user_query:str):
-        config = {"configurable": {"thread_id": f"{uuid4()}"}}
-        result = app.invoke({
+
+    @staticmethod
+    def _initial_state(request_id:str,user_query:str,search_mode:str|None = None):
+        if search_mode is not None and search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
+        return {
+            "request_id":request_id,
+            "search_mode":search_mode or settings.SEARCH_MODE,
             "language":'',
             "user_query":user_query,
             "questions": [],  # <-- ADD THIS
             "query_classification": {},  # <-- FIXED
             "retrieved_docs": {},  # <-- ADD THIS
             "context": {},  # <-- ALREADY GOOD
-        }, config)
+            "stats": {},
+        }
+
+    @staticmethod
+    def _llm_params(user_query:str,result):
+        logger.info(f"📈 Request stats: {result.get('stats',{})}")
 
         return {"query":user_query,
             'summarized_context':result['summarized_context'],
             'search_results':result['search_results'],
-            "language":result['language']
+            "language":result['language'],
+            # A web search that timed out or failed left the context incomplete, so it must not be cached
+            "degraded":result.get('stats',{}).get('search_outcome') in ('timeout','error'),
             }
-        
-    
 
+    def answer_cache_scope(self,search_mode:str|None = None) -> str:
+        # Cached contexts are only valid for the same search mode, context mode and set of served indexes
+        return f"{search_mode or settings.SEARCH_MODE}|{settings.CONTEXT_MODE}|{','.join(sorted(self.index_mapping))}"
 
-    
+    def get_context_from_graph(self,app:CompiledStateGraph,user_query:str,search_mode:str|None = None):
+        request_id = f"{uuid4()}"
+        config = {"configurable": {"thread_id": request_id}}
+        try:
+            result = app.invoke(self._initial_state(request_id,user_query,search_mode), config)
+        finally:
+            self._discard_search(request_id)
+        return self._llm_params(user_query,result)
+
+    async def aget_context_from_graph(self,app:CompiledStateGraph,user_query:str,search_mode:str|None = None):
+        request_id = f"{uuid4()}"
+        config = {"configurable": {"thread_id": request_id}}
+        try:
+            result = await app.ainvoke(self._initial_state(request_id,user_query,search_mode), config)
+        finally:
+            self._discard_search(request_id)
+        return self._llm_params(user_query,result)
+
+    async def astream_context_from_graph(self,app:CompiledStateGraph,user_query:str,search_mode:str|None = None) -> AsyncIterator[Tuple[str,Dict]]:
+        # Yields ('progress', event) as each node finishes, then ('result', llm_params) once the graph is done
+        request_id = f"{uuid4()}"
+        config = {"configurable": {"thread_id": request_id}}
+        result = {}
+        try:
+            async for mode, chunk in app.astream(self._initial_state(request_id,user_query,search_mode), config, stream_mode=["updates","values"]):
+                if mode == "values":
+                    result = chunk
+                    continue
+                for node, update in chunk.items():
+                    for event in node_progress(node,update):
+                        yield 'progress', event
+        finally:
+            self._discard_search(request_id)
+        yield 'result', self._llm_params(user_query,result)
+
+    def stream_context_from_graph(self,app:CompiledStateGraph,user_query:str,search_mode:str|None = None) -> Iterator[Tuple[str,Dict]]:
+        # Same events as astream_context_from_graph for the sync graph
+        request_id = f"{uuid4()}"
+        config = {"configurable": {"thread_id": request_id}}
+        result = {}
+        try:
+            for mode, chunk in app.stream(self._initial_state(request_id,user_query,search_mode), config, stream_mode=["updates","values"]):
+                if mode == "values":
+                    result = chunk
+                    continue
+                for node, update in chunk.items():
+                    for event in node_progress(node,update):
+                        yield 'progress', event
+        finally:
+            self._discard_search(request_id)
+        yield 'result', self._llm_params(user_query,result)
+
+    async def astream_context_in_thread(self,app:CompiledStateGraph,user_query:str,search_mode:str|None = None) -> AsyncIterator[Tuple[str,Dict]]:
+        # The sync graph blocks, so it runs on a worker thread and hands its events to the event loop through a queue
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def run():
+            try:
+                for item in self.stream_context_from_graph(app,user_query,search_mode):
+                    loop.call_soon_threadsafe(events.put_nowait,item)
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait,('error',e))
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait,None)
+
+        worker = loop.run_in_executor(None,run)
+        while (item := await events.get()) is not None:
+            if item[0] == 'error':
+                raise item[1]
+            yield item
+        await worker
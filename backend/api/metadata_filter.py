@@ -0,0 +1,102 @@
+"""
+Metadata pre-filtering for the dense / mmap indexes.
+
+Article and law references are normalised into keys such as "article:386a" and "law:4411", both from the
+structured fields parse_* stores on each chunk and from the user query. Each index keeps one packed bitmap per
+key (rows x keys bits), so a query that cites "Article 386A" or "Law 4411/2016" is scored only against the rows
+carrying that reference.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Set
+import numpy as np
+from backend.api.lexical_index import HOMOGLYPHS
+
+ARTICLE_PATTERN = re.compile(r"\b(?:article|art|άρθρο|άρθρου|αρθρο|αρθρου)\.?\s*(\d+)([a-zα-ω])?(?![a-zα-ω\d])")
+LAW_PATTERN = re.compile(r"\b(?:law|n|ν|νόμου|νόμος|νομου|νομος)\.?\s*(\d{3,4})(?:\s*[/-]\s*\d{2,4})?\b")
+# Greek article suffixes are transliterated by position in English texts (370Γ -> 370C)
+ARTICLE_SUFFIXES = str.maketrans('αβγδεζ','abcdef')
+
+
+def _normalise(text:str) -> str:
+    return text.translate(HOMOGLYPHS).lower()
+
+
+def extract_references(text:str) -> Set[str]:
+    """
+    Article / law keys cited in a piece of text, e.g. "Article 370Γ of Law 4411/2016" -> {"article:370c", "law:4411"}.
+    """
+    text = _normalise(text)
+    keys = {f"article:{number}{(suffix or '').translate(ARTICLE_SUFFIXES)}" for number, suffix in ARTICLE_PATTERN.findall(text)}
+    keys |= {f"law:{number}" for number in LAW_PATTERN.findall(text)}
+    return keys
+
+
+def metadata_keys(metadata:Dict) -> Set[str]:
+    title = metadata.get('title','')
+    keys = extract_references(title)
+    keys |= extract_references(' '.join(metadata.get('relevant_laws') or []))
+    law = metadata.get('law')
+    if law and law != 'unknown':
+        keys |= {f"law:{number}" for number in re.findall(r"\d{3,4}",law)}
+    article = metadata.get('article_number')
+    # parse_cybercrime falls back to the chunk counter, so only article numbers that the title confirms are used
+    if article and re.search(rf"\b{re.escape(article)}(?![\dA-Za-z\u0370-\u03FF])",title):
+        keys |= extract_references(f"Article {article}")
+    if metadata.get('case_id'):
+        keys.add(f"case:{_normalise(str(metadata['case_id'])).strip()}")
+    if metadata.get('civil_or_criminal') and metadata['civil_or_criminal'] != 'unknown':
+        keys.add(f"court:{metadata['civil_or_criminal']}")
+    return keys
+
+
+class MetadataBitmaps:
+    def __init__(self, keys:Dict[str,int], bits:np.ndarray, rows:int):
+        self.keys = keys
+        self.bits = bits
+        self.rows = rows
+
+    @classmethod
+    def build(cls, metadata:Iterable[Dict]) -> 'MetadataBitmaps':
+        row_keys = [metadata_keys(meta) for meta in metadata]
+        keys = {key: i for i, key in enumerate(sorted(set().union(*row_keys)))}
+        dense = np.zeros((len(keys),len(row_keys)),dtype=bool)
+        for row, row_key_set in enumerate(row_keys):
+            for key in row_key_set:
+                dense[keys[key],row] = True
+        return cls(keys,np.packbits(dense,axis=1),len(row_keys))
+
+    def save(self, directory:str):
+        os.makedirs(directory,exist_ok=True)
+        np.save(os.path.join(directory,'bits.npy'),self.bits)
+        with open(os.path.join(directory,'keys.json'),'w',encoding='utf-8') as f:
+            json.dump({'rows': self.rows, 'keys': self.keys},f,ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory:str) -> 'MetadataBitmaps':
+        with open(os.path.join(directory,'keys.json'),'r',encoding='utf-8') as f:
+            info = json.load(f)
+        return cls(info['keys'],np.load(os.path.join(directory,'bits.npy'),mmap_mode='r'),info['rows'])
+
+    def _union(self, keys:List[str]) -> np.ndarray|None:
+        known = [self.keys[key] for key in keys if key in self.keys]
+        if not known:
+            return None
+        return np.bitwise_or.reduce(np.asarray(self.bits[known]),axis=0)
+
+    def mask(self, query_keys:Set[str]) -> np.ndarray|None:
+        """
+        Rows matching the query references: any of the cited articles AND any of the cited laws.
+        Falls back to either side alone, and to None (no filtering) when nothing in this index matches.
+        """
+        kinds = {}
+        for key in query_keys:
+            kinds.setdefault(key.split(':',1)[0],[]).append(key)
+        unions = [union for union in (self._union(keys) for keys in kinds.values()) if union is not None]
+        if not unions:
+            return None
+        combined = np.bitwise_and.reduce(unions,axis=0)
+        if not combined.any():
+            combined = np.bitwise_or.reduce(unions,axis=0)
+        return np.unpackbits(combined,count=self.rows).astype(bool)
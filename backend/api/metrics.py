@@ -0,0 +1,64 @@
+import bisect
+import threading
+from typing import Dict, List
+
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class Histogram:
+    def __init__(self, buckets:List[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets,value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"le_{bucket}" for bucket in self.buckets] + ["le_inf"]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count,4) if self.count else 0.0,
+            'buckets': dict(zip(labels,self.counts)),
+        }
+
+
+class Metrics:
+    """
+    In-process counters and histograms, one set per worker.
+    """
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name:str, value:float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name,0) + value
+
+    def observe(self, name:str, value:float, buckets:List[float]|None = None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(buckets or DEFAULT_BUCKETS)
+            histogram.observe(value)
+
+    def get(self, name:str) -> float:
+        return self._counters.get(name,0)
+
+    def ratio(self, hits:str, misses:str) -> float:
+        total = self.get(hits) + self.get(misses)
+        return round(self.get(hits) / total,4) if total else 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {name:histogram.snapshot() for name, histogram in self._histograms.items()},
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,227 @@
+"""
+On-disk vector index that workers open with mmap instead of parsing the llama_index JSON stores.
+
+Layout of one index directory:
+
+    index.json          {"format_version", "model", "dims", "shards": ["shard-0000", ...]}
+    shard-0000/
+        shard.json      {"count", "dims", "dtype", "ann", "ann_dims"}
+        vectors.npy     L2-normalised vectors, float32 or int8 (with scales.npy holding one scale per row)
+        ann.faiss       optional FAISS HNSW / IVF index over the first ann_dims dimensions
+        lexical/        BM25 inverted index over the node texts (see backend/api/lexical_index.py)
+        filters/        article / law / case bitmaps over the node metadata (see backend/api/metadata_filter.py)
+        docs.jsonl      one {"id", "text", "metadata"} object per node
+        offsets.npy     byte offset of every docs.jsonl line (count + 1 entries)
+
+Everything is opened read-only with mmap, so uvicorn workers share the pages through the OS page cache
+and only the rows and documents a query touches are ever read.
+"""
+import json
+import mmap
+import os
+import time
+from typing import Dict, List, Tuple
+import faiss
+import numpy as np
+from backend.api.lexical_index import BM25Index
+from backend.api.metadata_filter import MetadataBitmaps
+
+FORMAT_VERSION = 1
+ANN_TYPES = ['hnsw', 'ivf', 'flat']
+
+
+def _normalize(matrix:np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix,axis=-1,keepdims=True)
+    return matrix / np.where(norms == 0,1,norms)
+
+
+def _build_ann(vectors:np.ndarray, ann:str, hnsw_m:int, ef_construction:int):
+    dims = vectors.shape[1]
+    if ann == 'hnsw':
+        index = faiss.IndexHNSWFlat(dims,hnsw_m,faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        nlist = max(1,int(np.sqrt(len(vectors))))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dims),dims,nlist,faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def write_shard(shard_dir:str, ids:List[str], texts:List[str], metadata:List[Dict], vectors:np.ndarray, dtype:str = 'float32', ann:str = 'hnsw', ann_dims:int|None = None, hnsw_m:int = 32, ef_construction:int = 200, lexical:bool = True):
+    if ann not in ANN_TYPES:
+        raise ValueError(f"Unknown ann type '{ann}', expected one of {ANN_TYPES}")
+    os.makedirs(shard_dir,exist_ok=True)
+    vectors = _normalize(np.asarray(vectors,dtype=np.float32))
+    dims = vectors.shape[1]
+    ann_dims = ann_dims if ann_dims and ann_dims < dims else dims
+
+    if dtype == 'int8':
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        np.save(os.path.join(shard_dir,'vectors.npy'),np.round(vectors / scales[:,None]).astype(np.int8))
+        np.save(os.path.join(shard_dir,'scales.npy'),scales.astype(np.float32))
+    else:
+        np.save(os.path.join(shard_dir,'vectors.npy'),vectors)
+
+    offsets = [0]
+    with open(os.path.join(shard_dir,'docs.jsonl'),'wb') as f:
+        for node_id, text, meta in zip(ids,texts,metadata):
+            line = (json.dumps({'id': node_id, 'text': text, 'metadata': meta},ensure_ascii=False) + '\n').encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(shard_dir,'offsets.npy'),np.asarray(offsets,dtype=np.int64))
+    if lexical:
+        BM25Index.build(texts).save(os.path.join(shard_dir,'lexical'))
+    MetadataBitmaps.build(metadata).save(os.path.join(shard_dir,'filters'))
+
+    # Tiny shards are cheaper to scan than to search through a graph
+    if ann != 'flat' and len(ids) > 1000:
+        faiss.write_index(_build_ann(np.ascontiguousarray(_normalize(vectors[:,:ann_dims])),ann,hnsw_m,ef_construction),os.path.join(shard_dir,'ann.faiss'))
+    else:
+        ann = 'flat'
+
+    with open(os.path.join(shard_dir,'shard.json'),'w',encoding='utf-8') as f:
+        json.dump({'count': len(ids), 'dims': dims, 'dtype': dtype, 'ann': ann, 'ann_dims': ann_dims},f)
+
+
+def write_index_manifest(index_dir:str, model:str, dims:int, shards:List[str]):
+    with open(os.path.join(index_dir,'index.json'),'w',encoding='utf-8') as f:
+        json.dump({'format_version': FORMAT_VERSION, 'model': model, 'dims': dims, 'shards': shards},f,indent=2)
+
+
+class MmapShard:
+    def __init__(self, shard_dir:str, ef_search:int = 64, nprobe:int = 16):
+        with open(os.path.join(shard_dir,'shard.json'),'r',encoding='utf-8') as f:
+            info = json.load(f)
+        self.count = info['count']
+        self.dims = info['dims']
+        self.ann_dims = info['ann_dims']
+        self.ann_type = info['ann']
+        self.vectors = np.load(os.path.join(shard_dir,'vectors.npy'),mmap_mode='r')
+        self.scales = np.load(os.path.join(shard_dir,'scales.npy'),mmap_mode='r') if info['dtype'] == 'int8' else None
+        self.offsets = np.load(os.path.join(shard_dir,'offsets.npy'),mmap_mode='r')
+        self._docs_file = open(os.path.join(shard_dir,'docs.jsonl'),'rb')
+        self._docs = mmap.mmap(self._docs_file.fileno(),0,access=mmap.ACCESS_READ) if self.count else b''
+
+        lexical_dir = os.path.join(shard_dir,'lexical')
+        self.lexical = BM25Index.load(lexical_dir) if os.path.exists(lexical_dir) else None
+        filters_dir = os.path.join(shard_dir,'filters')
+        self.filters = MetadataBitmaps.load(filters_dir) if os.path.exists(filters_dir) else None
+
+        self.ann = None
+        ann_path = os.path.join(shard_dir,'ann.faiss')
+        if os.path.exists(ann_path):
+            try:
+                self.ann = faiss.read_index(ann_path,faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Older faiss builds cannot mmap every index type
+                self.ann = faiss.read_index(ann_path)
+            if self.ann_type == 'hnsw':
+                self.ann.hnsw.efSearch = ef_search
+            else:
+                self.ann.nprobe = nprobe
+
+    def rows(self, positions:np.ndarray) -> np.ndarray:
+        rows = np.asarray(self.vectors[positions],dtype=np.float32)
+        if self.scales is not None:
+            rows *= np.asarray(self.scales[positions])[:,None]
+        return rows
+
+    def search(self, query:np.ndarray, top_k:int, shortlist:int, mask:np.ndarray|None = None) -> List[Tuple[int,float]]:
+        if not self.count:
+            return []
+        if mask is not None:
+            # Pre-filtered rows skip the ANN graph and are scored exactly
+            candidates = np.flatnonzero(mask)
+        elif self.ann is not None:
+            coarse = _normalize(query[:self.ann_dims]).astype(np.float32)
+            _, candidates = self.ann.search(coarse[None,:],min(max(shortlist,top_k),self.count))
+            candidates = np.sort(candidates[0][candidates[0] >= 0])
+        else:
+            candidates = np.arange(self.count)
+        scores = self.rows(candidates) @ _normalize(query[:self.dims])
+        best = np.argsort(-scores)[:top_k]
+        return [(int(candidates[i]),float(scores[i])) for i in best]
+
+    def node(self, position:int) -> Tuple[str,str,Dict]:
+        doc = json.loads(self._docs[int(self.offsets[position]):int(self.offsets[position + 1])])
+        return doc['id'], doc['text'], doc['metadata']
+
+    def close(self):
+        if self.count:
+            self._docs.close()
+        self._docs_file.close()
+
+
+class MmapIndex:
+    """
+    Searches every shard of an index directory and merges their top_k. Exposes the same search / node / report
+    interface as DenseIndex, with (shard, position) tuples as keys.
+    """
+    def __init__(self, index_dir:str, ef_search:int = 64, nprobe:int = 16, shortlist_factor:int = 4):
+        with open(os.path.join(index_dir,'index.json'),'r',encoding='utf-8') as f:
+            info = json.load(f)
+        if info['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"{index_dir} has index format {info['format_version']}, expected {FORMAT_VERSION}")
+        self.index_dir = index_dir
+        self.model = info['model']
+        self.dims = info['dims']
+        self.shortlist_factor = shortlist_factor
+        self.shards = [MmapShard(os.path.join(index_dir,shard),ef_search,nprobe) for shard in info['shards']]
+
+    def __len__(self) -> int:
+        return sum(shard.count for shard in self.shards)
+
+    def filter_mask(self, query_keys:set) -> List[np.ndarray]|None:
+        """
+        One row mask per shard. Shards without a match are excluded as long as some shard matched;
+        None means no shard knows the references and the search runs unfiltered.
+        """
+        if not query_keys:
+            return None
+        masks = [shard.filters.mask(query_keys) if shard.filters is not None else None for shard in self.shards]
+        if all(mask is None for mask in masks):
+            return None
+        return [mask if mask is not None else np.zeros(shard.count,dtype=bool) for mask, shard in zip(masks,self.shards)]
+
+    def search(self, query_vector:List[float], top_k:int, masks:List[np.ndarray]|None = None) -> List[Tuple[Tuple[int,int],float]]:
+        query = np.asarray(query_vector,dtype=np.float32)
+        results = []
+        for shard_no, shard in enumerate(self.shards):
+            mask = masks[shard_no] if masks is not None else None
+            results += [((shard_no,position),score) for position, score in shard.search(query,top_k,top_k * self.shortlist_factor,mask)]
+        results.sort(key=lambda result: result[1],reverse=True)
+        return results[:top_k]
+
+    def lexical_search(self, query:str, top_k:int, masks:List[np.ndarray]|None = None) -> List[Tuple[Tuple[int,int],float]]:
+        # BM25 statistics are per shard, which is close enough for fusion by rank
+        results = []
+        for shard_no, shard in enumerate(self.shards):
+            if shard.lexical is not None:
+                mask = masks[shard_no] if masks is not None else None
+                results += [((shard_no,position),score) for position, score in shard.lexical.search(query,top_k,mask)]
+        results.sort(key=lambda result: result[1],reverse=True)
+        return results[:top_k]
+
+    def node(self, key:Tuple[int,int]) -> Tuple[str,str,Dict]:
+        return self.shards[key[0]].node(key[1])
+
+    def report(self, probes:int = 20, top_k:int = 10) -> Dict[str, object]:
+        shard = next((shard for shard in self.shards if shard.count),None)
+        sample = shard.rows(np.arange(min(probes,shard.count))) if shard else []
+        start = time.perf_counter()
+        for vector in sample:
+            self.search(vector,top_k)
+        return {
+            'nodes': len(self),
+            'dims': self.dims,
+            'search_dims': shard.ann_dims if shard else self.dims,
+            'two_stage': any(s.ann is not None for s in self.shards),
+            'vectors_mb': round(sum(s.vectors.nbytes for s in self.shards) / (1024 * 1024),1),
+            'search_ms': round((time.perf_counter() - start) / max(len(sample),1) * 1000,3),
+        }
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
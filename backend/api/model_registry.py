@@ -0,0 +1,170 @@
+import os
+import resource
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from backend.api.batching import MicroBatcher
+from backend.database.config.config import settings
+
+
+# backend and file name passed to SentenceTransformer for every variant cache_models.py can produce
+EMBEDDING_VARIANTS = {
+    'fp32': None,
+    'onnx': ('onnx', 'onnx/model.onnx'),
+    'onnx-int8': ('onnx', 'onnx/model_qint8_avx2.onnx'),
+    'openvino': ('openvino', 'openvino/openvino_model.xml'),
+}
+
+
+def variant_model_kwargs(model_path:str, variant:str) -> Dict[str, object]:
+    """
+    SentenceTransformer kwargs that load the given variant of a cached model, or {} for the full-precision checkpoint.
+    Falls back to fp32 when the exported file is missing so a partially cached model still loads.
+    """
+    if variant not in EMBEDDING_VARIANTS:
+        raise ValueError(f"Unknown embedding variant '{variant}', expected one of {list(EMBEDDING_VARIANTS)}")
+    if EMBEDDING_VARIANTS[variant] is None:
+        return {}
+    backend, file_name = EMBEDDING_VARIANTS[variant]
+    if not os.path.exists(os.path.join(model_path,file_name)):
+        print(f"⚠️ {file_name} not found in {model_path}, loading the fp32 checkpoint instead")
+        return {}
+    return {'backend': backend, 'model_kwargs': {'file_name': file_name}}
+
+
+def current_rss_mb() -> float:
+    """
+    Resident memory of the current process in MB.
+    """
+    try:
+        with open('/proc/self/statm','r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Not on Linux, fall back to the peak RSS (KB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Thread-safe wrapper around a single HuggingFaceEmbeddings instance.
+    The fast tokenizers are not safe to call from several threads at once, so encoding is serialized per model.
+    With a MicroBatcher, texts from concurrent callers are collected for a few ms and encoded as one padded batch.
+    """
+    def __init__(self, model_path:str, embeddings:HuggingFaceEmbeddings, max_batch_size:int|None = None, max_wait_ms:float = 3.0, variant:str = 'fp32'):
+        self.model_path = model_path
+        self.variant = variant
+        self.embeddings = embeddings
+        self._lock = threading.Lock()
+        self.batcher = None
+        if max_batch_size:
+            self.batcher = MicroBatcher(self._encode_batch,max_batch_size=max_batch_size,max_wait_ms=max_wait_ms,name=f"embedding.{os.path.basename(model_path)}" + ('' if variant == 'fp32' else f".{variant}"))
+
+    def _encode_batch(self, texts:List[str]) -> List[List[float]]:
+        # The registry builds the embeddings without query-specific encode kwargs, so queries and documents encode the same way
+        with self._lock:
+            return self.embeddings.embed_documents(texts)
+
+    def embed_documents(self, texts:List[str]) -> List[List[float]]:
+        if self.batcher is None:
+            return self._encode_batch(texts)
+        return [future.result() for future in self.batcher.submit_many(texts)]
+
+    def embed_query(self, text:str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+class EmbeddingModelRegistry:
+    """
+    Hands out one shared encoder per model path, so indexes that use the same model share its weights.
+    """
+    def __init__(self, max_batch_size:int|None = None, max_wait_ms:float = 3.0, variant:str = 'fp32'):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.variant = variant
+        self._models: Dict[Tuple[str, str], SharedEmbeddings] = {}
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.load_stats: Dict[str, Dict[str, float]] = {}
+        self._loads_started = 0
+        self._loads_in_flight = 0
+        self._remote_factory: Callable[[str], Embeddings]|None = None
+
+    def use_remote(self, factory:Callable[[str], Embeddings]):
+        """
+        Hand out factory(model_path) instead of loading models in this process (INFERENCE_MODE=sidecar).
+        """
+        self._remote_factory = factory
+
+    def get(self, model_path:str, variant:str|None = None) -> SharedEmbeddings:
+        key = (model_path, variant or self.variant)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        if self._remote_factory is not None:
+            with self._lock:
+                return self._models.setdefault(key, self._remote_factory(model_path))
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # One lock per model so two different models can load at the same time
+        with load_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            name = model_path if key[1] == 'fp32' else f"{model_path} ({key[1]})"
+            with self._lock:
+                started_before = self._loads_started
+                in_flight = self._loads_in_flight
+                self._loads_started += 1
+                self._loads_in_flight += 1
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            try:
+                embeddings = HuggingFaceEmbeddings(model_name=model_path,model_kwargs=variant_model_kwargs(model_path,key[1]))
+                model = SharedEmbeddings(model_path, embeddings, self.max_batch_size, self.max_wait_ms, key[1])
+            finally:
+                with self._lock:
+                    self._loads_in_flight -= 1
+                    # Other model loads that ran during this one, their memory is in the delta too
+                    overlapping = in_flight + self._loads_started - started_before - 1
+            # Whole-process RSS: it also counts indexes loading in parallel on the startup pool, so it is only
+            # the model's own footprint when nothing else was loading (STARTUP_MODE=lazy or overlapping_loads 0)
+            self.load_stats[name] = {
+                'load_time_s': round(time.perf_counter() - start, 3),
+                'process_rss_delta_mb': round(current_rss_mb() - rss_before, 1),
+                'overlapping_loads': overlapping,
+            }
+            self._models[key] = model
+            print(f"📦 Loaded embedding model {name} in {self.load_stats[name]['load_time_s']}s (process RSS +{self.load_stats[name]['process_rss_delta_mb']} MB, {overlapping} other model loads overlapping)")
+            return model
+
+    def loaded_models(self) -> List[str]:
+        return list(self.load_stats.keys())
+
+    def report(self) -> Dict[str, object]:
+        return {
+            'models': dict(self.load_stats),
+            'total_load_time_s': round(sum(s['load_time_s'] for s in self.load_stats.values()), 3),
+            'rss_mb': round(current_rss_mb(), 1),
+        }
+
+    def close(self):
+        for model in self._models.values():
+            model.close()
+
+
+# Batching is off when EMBEDDING_BATCHING is False, every call then encodes on its own under the model lock
+embedding_registry = EmbeddingModelRegistry(
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE if settings.EMBEDDING_BATCHING else None,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    variant=settings.EMBEDDING_VARIANT,
+)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 
 class UserCredentials(BaseModel):
     username:str
@@ -27,6 +27,7 @@ class UserOpenData(BaseModel):
 class Message(BaseModel):
     message:str
     conversation_history:List[dict]
+    search_mode:Literal['off','parallel','fallback'] | None = None
 
 class UserAuthentication(BaseModel):
     authenticated:bool
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import os
+from typing import List, Tuple
+from sentence_transformers import CrossEncoder
+from langchain_core.documents.base import Document as langchainDocument
+from backend.api.batching import MicroBatcher
+from backend.api.llm_cache import InMemoryLRUBackend
+from backend.api.metrics import metrics
+
+RERANKER_BACKENDS = ['onnx', 'torch']
+
+
+def _digest(text:str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class LocalReranker:
+    """
+    CPU cross-encoder reranker. (query, passage) pairs from concurrent requests are scored together by a MicroBatcher,
+    and scores are kept in an LRU keyed by (query hash, chunk hash) so repeated levels and follow-up questions skip the model.
+    """
+    def __init__(self, model_path:str, backend:str = 'onnx', onnx_file:str = 'onnx/model_qint8_avx2.onnx', max_batch_size:int = 32, max_wait_ms:float = 5.0, cache_size:int = 50000, top_n:int = 10):
+        if backend not in RERANKER_BACKENDS:
+            raise ValueError(f"Unknown reranker backend '{backend}', expected one of {RERANKER_BACKENDS}")
+        if backend == 'onnx' and not os.path.exists(os.path.join(model_path,onnx_file)):
+            # The quantised export is produced by cache_models.py; fall back to torch instead of failing startup
+            print(f"⚠️ {onnx_file} not found in {model_path}, loading the reranker with torch")
+            backend = 'torch'
+        model_kwargs = {'file_name': onnx_file} if backend == 'onnx' else None
+        self.model = CrossEncoder(model_path,backend=backend,model_kwargs=model_kwargs)
+        self.model_path = model_path
+        self.backend = backend
+        self.top_n = top_n
+        self.scores = InMemoryLRUBackend(cache_size)
+        self.batcher = MicroBatcher(self._predict,max_batch_size=max_batch_size,max_wait_ms=max_wait_ms,name='reranker')
+        print(f"✅ Local reranker loaded from {model_path} ({backend})")
+
+    def _predict(self, pairs:List[Tuple[str,str]]) -> List[float]:
+        return [float(score) for score in self.model.predict(pairs,batch_size=len(pairs),show_progress_bar=False)]
+
+    def _lookup(self, query:str, passages:List[str]):
+        query_key = _digest(query)
+        keys = [f"{query_key}:{_digest(passage)}" for passage in passages]
+        cached = [self.scores.get(key) for key in keys]
+        hits = sum(score is not None for score in cached)
+        metrics.inc('reranker.cache.hits',hits)
+        metrics.inc('reranker.cache.misses',len(keys) - hits)
+        return keys, cached
+
+    def _submit(self, query:str, passages:List[str], cached:List[float|None]):
+        return {i: self.batcher.submit((query,passage)) for i, (passage, score) in enumerate(zip(passages,cached)) if score is None}
+
+    def _merge(self, keys:List[str], cached:List[float|None], scored:dict) -> List[float]:
+        scores = list(cached)
+        for i, score in scored.items():
+            self.scores.set(keys[i],score)
+            scores[i] = score
+        return scores
+
+    def score(self, query:str, passages:List[str]) -> List[float]:
+        keys, cached = self._lookup(query,passages)
+        futures = self._submit(query,passages,cached)
+        return self._merge(keys,cached,{i: future.result() for i, future in futures.items()})
+
+    async def ascore(self, query:str, passages:List[str]) -> List[float]:
+        keys, cached = self._lookup(query,passages)
+        futures = self._submit(query,passages,cached)
+        results = await asyncio.gather(*[asyncio.wrap_future(future) for future in futures.values()])
+        return self._merge(keys,cached,dict(zip(futures.keys(),results)))
+
+    def _top(self, documents:List[langchainDocument], scores:List[float]) -> List[List]:
+        scored_docs = sorted(zip(scores,documents),reverse=True,key=lambda x: x[0])[:self.top_n]
+        return [[node.page_content,node.metadata,score] for score, node in scored_docs]
+
+    def rerank(self, query:str, retrieved_nodes:List[List[langchainDocument]]) -> List[List]:
+        documents = [node for index_nodes in retrieved_nodes for node in index_nodes]
+        return self._top(documents,self.score(query,[doc.page_content for doc in documents]))
+
+    async def arerank(self, query:str, retrieved_nodes:List[List[langchainDocument]]) -> List[List]:
+        documents = [node for index_nodes in retrieved_nodes for node in index_nodes]
+        return self._top(documents,await self.ascore(query,[doc.page_content for doc in documents]))
+
+    def close(self):
+        self.batcher.close()
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langdetect import detect
+from backend.api.metrics import metrics
+
+
+class SemanticAnswerCache:
+    """
+    On-disk cache of get_context_from_graph results, matched by cosine similarity of the query embedding.
+    Entries expire after ttl_seconds and the least recently used ones are evicted above max_entries.
+    Only entries stored under the same scope (search mode and served indexes) can match.
+    """
+    def __init__(self, embedding:Embeddings, path:str, threshold:float = 0.95, ttl_seconds:int = 86400, max_entries:int = 5000):
+        self.embedding = embedding
+        self.path = path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    scope TEXT NOT NULL DEFAULT '',
+                    embedding BLOB NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            # Caches created before scopes existed get the column, their entries only match the empty scope
+            if 'scope' not in [row[1] for row in conn.execute("PRAGMA table_info(answers)")]:
+                conn.execute("ALTER TABLE answers ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_lang_scope_created ON answers (lang, scope, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per call keeps this safe across threads and uvicorn workers
+        conn = sqlite3.connect(self.path,timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _language(query:str) -> str:
+        # Near-identical questions in different languages must not share an answer language
+        try:
+            return detect(query)
+        except Exception:
+            return 'unknown'
+
+    def embed(self, query:str) -> np.ndarray:
+        vector = np.asarray(self.embedding.embed_query(query),dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)),1e-12)
+
+    def lookup(self, query:str, embedding:np.ndarray|None = None, scope:str = '') -> Dict[str, str]|None:
+        embedding = self.embed(query) if embedding is None else embedding
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, embedding, payload FROM answers WHERE lang = ? AND scope = ? AND created_at >= ?",
+                (self._language(query),scope,now - self.ttl_seconds),
+            ).fetchall()
+            if not rows:
+                metrics.inc('answer_cache.misses')
+                return None
+
+            matrix = np.stack([np.frombuffer(row[1],dtype=np.float32) for row in rows])
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            if float(similarities[best]) < self.threshold:
+                metrics.inc('answer_cache.misses')
+                return None
+
+            conn.execute("UPDATE answers SET last_access = ? WHERE id = ?",(now,rows[best][0]))
+
+        metrics.inc('answer_cache.hits')
+        return json.loads(rows[best][2])
+
+    def store(self, query:str, payload:Dict[str, str], embedding:np.ndarray|None = None, scope:str = ''):
+        embedding = self.embed(query) if embedding is None else embedding
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO answers (query, lang, scope, embedding, payload, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (query,self._language(query),scope,embedding.astype(np.float32).tobytes(),json.dumps(payload),now,now),
+            )
+            expired = conn.execute("DELETE FROM answers WHERE created_at < ?",(now - self.ttl_seconds,)).rowcount
+            evicted = conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        metrics.inc('answer_cache.stores')
+        metrics.inc('answer_cache.expired',expired)
+        metrics.inc('answer_cache.evictions',evicted)
+
+    def stats(self) -> Dict[str, object]:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            'entries': entries,
+            'hits': metrics.get('answer_cache.hits'),
+            'misses': metrics.get('answer_cache.misses'),
+            'hit_ratio': metrics.ratio('answer_cache.hits','answer_cache.misses'),
+        }
@@ -0,0 +1,137 @@
+"""
+Startup bookkeeping: every index, the reranker and the sidecar connection is a LazyComponent that loads on its own,
+retries on its own and reports its state to /health/ready. StartupTracker loads components on a thread pool.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+STATES = ['pending', 'loading', 'ready', 'failed']
+
+
+class LazyComponent:
+    """
+    Loads loader() on the first get(), retrying up to `retries` times with exponential backoff.
+    A failed component is tried again on the next get(), so one bad index never forces a reload of the others.
+    required=False components (lazily loaded indexes) do not hold back readiness while pending.
+    """
+    def __init__(self, name:str, loader:Callable[[], object], retries:int = 3, backoff_s:float = 2.0, required:bool = True):
+        self.name = name
+        self.loader = loader
+        self.retries = max(retries,1)
+        self.backoff_s = backoff_s
+        self.required = required
+        self.state = 'pending'
+        self.seconds: float|None = None
+        self.attempts = 0
+        self.error: str|None = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def get(self):
+        if self.state == 'ready':
+            return self._value
+        with self._lock:
+            if self.state != 'ready':
+                self._load()
+            return self._value
+
+    def _load(self):
+        self.state = 'loading'
+        start = time.perf_counter()
+        for attempt in range(self.retries):
+            self.attempts += 1
+            try:
+                self._value = self.loader()
+                self.seconds = round(time.perf_counter() - start,2)
+                self.error = None
+                self.state = 'ready'
+                print(f"✅ {self.name} loaded in {self.seconds}s")
+                return
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Loading {self.name} failed (attempt {attempt + 1}/{self.retries}): {self.error}")
+                if attempt + 1 < self.retries:
+                    time.sleep(self.backoff_s * 2 ** attempt)
+        self.seconds = round(time.perf_counter() - start,2)
+        self.state = 'failed'
+        raise RuntimeError(f"{self.name} failed to load: {self.error}")
+
+    def status(self) -> Dict[str, object]:
+        return {'state': self.state, 'seconds': self.seconds, 'attempts': self.attempts, 'error': self.error, 'required': self.required}
+
+
+class LazyRetriever(LazyComponent):
+    """
+    Stands in for an index retriever in LLM_Pipeline.index_mapping and loads the index on its first query.
+    """
+    def retrieve(self, query):
+        return self.get().retrieve(query)
+
+    async def aretrieve(self, query):
+        retriever = self._value if self.ready else await asyncio.to_thread(self.get)
+        return await retriever.aretrieve(query)
+
+
+class StartupTracker:
+    def __init__(self, workers:int = 4):
+        self.components: Dict[str, LazyComponent] = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers,thread_name_prefix='startup')
+        self._futures: List[Future] = []
+        self._stopped = threading.Event()
+        self.started = time.perf_counter()
+
+    def add(self, component:LazyComponent) -> LazyComponent:
+        self.components[component.name] = component
+        return component
+
+    def load(self, components:List[LazyComponent]):
+        """
+        Starts loading the components in parallel without waiting for them.
+        """
+        self._futures += [self.executor.submit(component.get) for component in components]
+
+    def resolve(self, component:LazyComponent, max_backoff_s:float = 60.0):
+        """
+        get() until the component loads, for the ones the pipeline cannot be built without (reranker, sidecar).
+        Between rounds of retries it waits up to max_backoff_s, and gives up only on shutdown.
+        """
+        delay = component.backoff_s
+        while True:
+            try:
+                return component.get()
+            except RuntimeError:
+                print(f"🔁 {component.name} still unavailable, retrying in {delay}s")
+                if self._stopped.wait(delay):
+                    raise
+                delay = min(delay * 2,max_backoff_s)
+
+    def wait(self):
+        errors = []
+        for future in self._futures:
+            try:
+                future.result()
+            except RuntimeError as e:
+                errors.append(str(e))
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+    def ready(self) -> bool:
+        return all(component.ready for component in self.components.values() if component.required)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            'ready': self.ready(),
+            'uptime_s': round(time.perf_counter() - self.started,1),
+            'components': {name: component.status() for name, component in self.components.items()},
+        }
+
+    def shutdown(self):
+        self._stopped.set()
+        self.executor.shutdown(wait=False,cancel_futures=True)
@@ -0,0 +1,91 @@
+"""
+Server-sent events emitted by the /request endpoint.
+
+Every event is one `data: <json>\\n\\n` line. The JSON object always has an `event` and a `status` field:
+
+    {"event": "progress", "stage": "classified", "message": "classified: GDPR, Greek Penal Code", "data": {...}, "status": 200}
+    {"event": "token", "response": "<answer chunk>", "status": 200}
+    {"event": "done", "status": 200}
+    {"event": "error", "detail": "<reason>", "status": 500}
+
+Progress events arrive while the pipeline runs, in graph order, for both the async graph and the
+sync one (ASYNC_PIPELINE=False streams from a worker thread). Their stages are
+cache_hit, translated, rewritten, classified, retrieved, context_ready and search_done.
+With FUSED_REWRITING the single translation node reports translated and rewritten back to back.
+Token events follow with the streamed answer. `response` is kept on token events so older
+clients that only read `response` keep working. The frontend mirrors these in `StreamEvent`
+(frontend/src/models/Types.ts).
+"""
+import json
+from typing import Dict, List
+from backend.api.classification import indexes_to_categories
+
+
+def sse(payload:Dict[str, object]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def progress_event(stage:str, message:str, data:Dict[str, object]|None = None) -> Dict[str, object]:
+    return {'event': 'progress', 'stage': stage, 'message': message, 'data': data or {}, 'status': 200}
+
+
+def token_event(content:str) -> Dict[str, object]:
+    return {'event': 'token', 'response': content, 'status': 200}
+
+
+def done_event() -> Dict[str, object]:
+    return {'event': 'done', 'status': 200}
+
+
+def error_event(detail:str, status:int = 500) -> Dict[str, object]:
+    return {'event': 'error', 'detail': detail, 'status': status}
+
+
+def _classified(update:Dict) -> Dict[str, object]:
+    categories = []
+    for _, indexes in (update.get('query_classification') or {}).values():
+        for category in indexes_to_categories(indexes):
+            if category not in categories:
+                categories.append(category)
+    message = f"classified: {', '.join(categories)}" if categories else "classified: no matching category"
+    return progress_event('classified',message,{'categories': categories})
+
+
+def _retrieved(update:Dict) -> Dict[str, object]:
+    documents = set()
+    for level_docs in (update.get('retrieved_docs') or {}).values():
+        for doc in level_docs or []:
+            documents.add(doc[0])
+    return progress_event('retrieved',f"retrieved {len(documents)} docs",{'documents': len(documents), 'stats': update.get('stats') or {}})
+
+
+def _rewritten(update:Dict) -> Dict[str, object]:
+    questions = update.get('questions') or {}
+    return progress_event('rewritten',f"rewritten into {max(len(questions) - 1,0)} variations")
+
+
+def node_progress(node:str, update:Dict|None) -> List[Dict[str, object]]:
+    """
+    Maps a LangGraph `updates` stream chunk of one node to its progress events, none for nodes the client does not need to see.
+    """
+    update = update or {}
+    if node == 'translation':
+        language = update.get('language') or ''
+        events = [progress_event('translated',f"translated ({language})" if language else "translated",{'language': language})]
+        # The fused translate-and-rewrite node also returns the rewritten questions
+        if update.get('questions'):
+            events.append(_rewritten(update))
+        return events
+    if node == 'query_rewriting':
+        return [_rewritten(update)]
+    if node == 'parallel_classification':
+        return [_classified(update)]
+    if node == 'parallel_retrieval':
+        return [_retrieved(update)]
+    if node == 'get_context':
+        stats = update.get('stats') or {}
+        return [progress_event('context_ready',"context ready",{'seconds': stats.get('context_summary_seconds'), 'duplicates': stats.get('context_duplicates')})]
+    if node == 'collect_search':
+        outcome = (update.get('stats') or {}).get('search_outcome','')
+        return [progress_event('search_done',f"search done ({outcome})" if outcome else "search done",{'outcome': outcome})]
+    return []
@@ -0,0 +1,88 @@
+import json
+import os
+import re
+from typing import Dict, List
+import httpx
+
+
+class TavilySearchBackend:
+    """
+    Calls the Tavily search API over pooled keep-alive clients (the langchain TavilySearch tool opens a new
+    connection for every request).
+    """
+    API_URL = 'https://api.tavily.com/search'
+
+    def __init__(self, api_key:str, max_results:int = 5, max_connections:int = 10, timeout_s:float = 10.0):
+        self.options = {
+            'max_results': max_results,
+            'include_answer': True,
+            'include_raw_content': True,
+            'include_images': False,
+        }
+        client_options = {
+            'headers': {'Authorization': f'Bearer {api_key}'},
+            'limits': httpx.Limits(max_connections=max_connections,max_keepalive_connections=max_connections),
+            'timeout': timeout_s,
+        }
+        self.client = httpx.Client(**client_options)
+        self.async_client = httpx.AsyncClient(**client_options)
+
+    def search(self, query:str) -> List[Dict]:
+        response = self.client.post(self.API_URL,json={'query': query,**self.options})
+        response.raise_for_status()
+        return response.json().get('results',[])
+
+    async def asearch(self, query:str) -> List[Dict]:
+        response = await self.async_client.post(self.API_URL,json={'query': query,**self.options})
+        response.raise_for_status()
+        return response.json().get('results',[])
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        await self.async_client.aclose()
+
+
+class StubSearchBackend:
+    """
+    Offline search over a local JSON list of {"title", "content", "url"} results, ranked by word overlap with the query.
+    """
+    def __init__(self, path:str|None = None, max_results:int = 5):
+        self.max_results = max_results
+        self.results = []
+        if path and os.path.exists(path):
+            with open(path,'r',encoding='utf-8') as f:
+                self.results = json.load(f)
+
+    @staticmethod
+    def _words(text:str) -> set:
+        # Short words are mostly stop words and only add noise to the overlap
+        return {word for word in re.findall(r"\w+",text.lower()) if len(word) > 2}
+
+    def search(self, query:str) -> List[Dict]:
+        query_words = self._words(query)
+        scored = []
+        for result in self.results:
+            overlap = len(query_words & self._words(result['title'] + ' ' + result['content']))
+            if overlap:
+                scored.append({**result,'score': round(overlap / max(len(query_words),1),3)})
+        scored.sort(key=lambda result: result['score'],reverse=True)
+        return scored[:self.max_results]
+
+    async def asearch(self, query:str) -> List[Dict]:
+        return self.search(query)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+def build_search_backend(backend:str, api_key:str, stub_path:str|None = None, max_connections:int = 10, timeout_s:float = 10.0) -> TavilySearchBackend|StubSearchBackend:
+    if backend == 'tavily':
+        return TavilySearchBackend(api_key,max_connections=max_connections,timeout_s=timeout_s)
+    if backend == 'stub':
+        return StubSearchBackend(stub_path)
+    raise ValueError(f"Unknown search backend '{backend}', expected one of ['tavily', 'stub']")
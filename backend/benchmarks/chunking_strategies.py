@@ -0,0 +1,135 @@
+"""
+Chunking-strategy comparison built on chunking_evaluation.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.chunking_strategies --corpus-dir backend/files/en \
+        --questions backend/benchmarks/data/chunking_questions.csv --output chunking_report.json
+
+For every chunker spec (name:chunk_size:overlap, names as in build_indexes --chunker) the corpus is chunked in a
+fresh process to get throughput and peak RSS. chunking_evaluation then embeds the chunks of the referenced
+documents into a temporary Chroma collection with --embedding-model and scores the top --retrieve chunks
+against the reference excerpts (token-level recall, precision and IoU). The questions CSV uses the
+chunking_evaluation format: question, references (JSON list of {content, start_index, end_index}), corpus_id
+(path relative to --corpus-dir).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+from chunking_evaluation import BaseEvaluation
+from backend.build_indexes import build_chunker
+from backend.api.llm_pipeline import MODERNBERT_MODEL
+
+DEFAULT_CHUNKERS = [
+    'sentence:5:0',
+    'character:1000:200',
+    'token:256:50',
+    'recursive:1000:200',
+    'restoken:256:50',
+    'engine-token:256:50',
+    'engine-sentence:5:0',
+]
+
+
+def corpus_files(corpus_dir:str) -> Dict[str,str]:
+    files = {}
+    for root, _, names in os.walk(corpus_dir):
+        for name in sorted(names):
+            if name.endswith('.txt'):
+                path = os.path.join(root,name)
+                files[os.path.relpath(path,corpus_dir)] = path
+    return files
+
+
+def parse_spec(spec:str):
+    name, chunk_size, overlap = spec.split(':')
+    return build_chunker(name,int(chunk_size),int(overlap))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def throughput(spec:str, paths:List[str]) -> Dict[str, float]:
+    """
+    Runs in its own process so peak RSS belongs to this chunker alone.
+    """
+    chunker = parse_spec(spec)
+    chunks = 0
+    characters = 0
+    start = time.perf_counter()
+    for path in paths:
+        with open(path,'r',encoding='utf-8') as f:
+            text = f.read()
+        characters += len(text)
+        chunks += len(chunker.split_text(text))
+    seconds = time.perf_counter() - start
+    return {
+        'chunks': chunks,
+        'avg_chunk_chars': round(characters / chunks,1) if chunks else 0,
+        'seconds': round(seconds,3),
+        'chunks_per_s': round(chunks / seconds,1) if seconds else 0,
+        'peak_rss_mb': round(_peak_rss_mb(),1),
+    }
+
+
+def evaluate(spec:str, evaluation:BaseEvaluation, embedding_function, referenced:List[str], retrieve:int) -> Dict[str, float]:
+    chunker = parse_spec(spec)
+    vectors = 0
+    for path in referenced:
+        with open(path,'r',encoding='utf-8') as f:
+            vectors += len(chunker.split_text(f.read()))
+    start = time.perf_counter()
+    scores = evaluation.run(chunker,embedding_function,retrieve=retrieve)
+    return {
+        'vectors': vectors,
+        'index_seconds': round(time.perf_counter() - start,2),
+        **{metric: round(float(value),4) for metric, value in scores.items()},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare chunking strategies on speed, memory, index size and retrieval quality")
+    parser.add_argument('--corpus-dir',default='backend/files/en')
+    parser.add_argument('--questions',default='backend/benchmarks/data/chunking_questions.csv')
+    parser.add_argument('--chunkers',nargs='+',default=DEFAULT_CHUNKERS,help="name:chunk_size:overlap")
+    parser.add_argument('--embedding-model',default=MODERNBERT_MODEL)
+    parser.add_argument('--retrieve',type=int,default=5)
+    parser.add_argument('--output',default=None,help="Path for the JSON report, printed to stdout when omitted")
+    args = parser.parse_args()
+
+    files = corpus_files(args.corpus_dir)
+    evaluation = BaseEvaluation(args.questions,corpora_id_paths=files)
+    referenced = [files[corpus_id] for corpus_id in evaluation.corpus_list]
+    embedding_function = SentenceTransformerEmbeddingFunction(model_name=args.embedding_model)
+
+    report = {
+        'corpus_dir': args.corpus_dir,
+        'documents': len(files),
+        'questions': args.questions,
+        'embedding_model': args.embedding_model,
+        'retrieve': args.retrieve,
+        'results': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    for spec in args.chunkers:
+        with ProcessPoolExecutor(max_workers=1,mp_context=context) as pool:
+            speed = pool.submit(throughput,spec,list(files.values())).result()
+        quality = evaluate(spec,evaluation,embedding_function,referenced,args.retrieve)
+        report['results'].append({'chunker': spec, **speed, **quality})
+        print(f"{spec:<22} {speed['chunks_per_s']:>10} chunks/s {speed['peak_rss_mb']:>8} MB peak, {quality['vectors']:>6} vectors, "
+              f"recall {quality.get('recall_mean')}, precision {quality.get('precision_mean')}, iou {quality.get('iou_mean')}",file=sys.stderr)
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
+    else:
+        print(json.dumps(report,indent=2))
@@ -0,0 +1,91 @@
+"""
+Throughput of the ChunkingEngine against the existing BaseChunker classes on a synthetic legal corpus.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.chunking_throughput --documents 2000 --workers 4
+
+The corpus is generated on the fly (statute-like articles and court-decision paragraphs) so runs are
+reproducible without shipping data. Every configuration chunks the same documents; the report lists
+documents/s, chunks/s and MB/s.
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, Iterator, List, Tuple
+import tiktoken
+from backend.api.chunking import ChunkingEngine
+from backend.api.llm_pipeline import CharacterChunker, SentenceChunker, TokenChunker
+
+SENTENCES = [
+    "Whoever, without right, accesses all or part of an information system shall be punished with imprisonment of up to three years.",
+    "The controller shall notify the personal data breach to the supervisory authority without undue delay.",
+    "The court held that the defendant acted with intent to obtain an unlawful financial benefit under Article 386A of the Penal Code.",
+    "Pursuant to Law 4411/2016, the attack against critical infrastructure constitutes an aggravating circumstance.",
+    "The appeal is dismissed as unfounded and the costs are borne by the appellant.",
+    "Processing shall be lawful only if the data subject has given consent to the processing for one or more specific purposes.",
+    "The accused sent e-mails impersonating the bank and collected the credentials of at least forty customers.",
+    "Member States shall ensure that the interception of non-public transmissions of computer data is punishable as a criminal offence.",
+]
+
+
+def synthetic_corpus(documents:int, paragraphs:int, seed:int = 0) -> Iterator[Tuple[str,str]]:
+    rng = random.Random(seed)
+    for i in range(documents):
+        body = []
+        for p in range(paragraphs):
+            body.append(f"Article {rng.randint(1,450)}{rng.choice(['','A','B'])}. " + ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(4,12))))
+        yield f"doc_{i}", '\n\n'.join(body)
+
+
+def measure(name:str, chunk:callable, corpus:List[Tuple[str,str]]) -> Dict:
+    characters = sum(len(text) for _, text in corpus)
+    start = time.perf_counter()
+    chunks = chunk(corpus)
+    seconds = time.perf_counter() - start
+    return {
+        'chunker': name,
+        'documents': len(corpus),
+        'chunks': chunks,
+        'seconds': round(seconds,3),
+        'docs_per_s': round(len(corpus) / seconds,1),
+        'chunks_per_s': round(chunks / seconds,1),
+        'mb_per_s': round(characters / seconds / 1e6,2),
+    }
+
+
+def legacy(chunker) -> callable:
+    return lambda corpus: sum(len(chunker.split_text(text)) for _, text in corpus)
+
+
+def engine(chunker:ChunkingEngine) -> callable:
+    return lambda corpus: sum(1 for _ in chunker.iter_chunks(iter(corpus)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Chunking throughput: ChunkingEngine vs the BaseChunker classes")
+    parser.add_argument('--documents',type=int,default=2000)
+    parser.add_argument('--paragraphs',type=int,default=20)
+    parser.add_argument('--workers',type=int,default=4)
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    corpus = list(synthetic_corpus(args.documents,args.paragraphs))
+    encoding = tiktoken.get_encoding('cl100k_base')
+    runs = [
+        ('SentenceChunker(5)', legacy(SentenceChunker(5,encoding))),
+        ('engine sentence(5)', engine(ChunkingEngine('sentence',5))),
+        (f'engine sentence(5) x{args.workers}', engine(ChunkingEngine('sentence',5,workers=args.workers))),
+        ('TokenChunker(256, 50)', legacy(TokenChunker(256,50))),
+        ('engine token(256, 50)', engine(ChunkingEngine('token',256,50))),
+        (f'engine token(256, 50) x{args.workers}', engine(ChunkingEngine('token',256,50,workers=args.workers))),
+        ('CharacterChunker(1000, 200)', legacy(CharacterChunker(1000,200))),
+        ('engine character(1000, 200)', engine(ChunkingEngine('character',1000,200))),
+    ]
+    report = [measure(name,chunk,corpus) for name, chunk in runs]
+    for result in report:
+        print(f"{result['chunker']:<32} {result['chunks']:>8} chunks {result['docs_per_s']:>9} docs/s {result['chunks_per_s']:>10} chunks/s {result['mb_per_s']:>7} MB/s")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
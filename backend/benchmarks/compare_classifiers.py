@@ -0,0 +1,87 @@
+"""
+Latency and accuracy comparison of the query classification modes.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.compare_classifiers --dataset backend/benchmarks/data/classification_queries.jsonl
+
+Each dataset line is a JSON object with "query", the gold "categories" and optionally the two
+"rewrites". When rewrites are missing the original query is used for all three levels.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+import numpy as np
+from backend.api.classification import indexes_to_categories
+from backend.api.llm_pipeline import LLM_Pipeline
+
+
+def load_dataset(path:str) -> List[Dict]:
+    with open(path,'r',encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def score(predicted:List[List[str]], gold:List[List[str]]) -> Dict[str,float]:
+    exact = sum(set(p) == set(g) for p, g in zip(predicted,gold))
+    true_positives = sum(len(set(p) & set(g)) for p, g in zip(predicted,gold))
+    predicted_total = sum(len(set(p)) for p in predicted)
+    gold_total = sum(len(set(g)) for g in gold)
+    precision = true_positives / predicted_total if predicted_total else 0.0
+    recall = true_positives / gold_total if gold_total else 0.0
+    return {
+        'exact_match': round(exact / len(gold),3),
+        'precision': round(precision,3),
+        'recall': round(recall,3),
+        'f1': round(2 * precision * recall / (precision + recall),3) if precision + recall else 0.0,
+    }
+
+
+def run_mode(pipeline:LLM_Pipeline, mode:str, dataset:List[Dict]) -> Dict:
+    node = pipeline.classification_node(mode)
+    latencies = []
+    predicted = []
+    level_agreement = 0
+    for example in dataset:
+        rewrites = example.get('rewrites') or [example['query'],example['query']]
+        state = {'questions':{0:example['query'],1:rewrites[0],2:rewrites[1]},'query_classification':{}}
+
+        start = time.perf_counter()
+        result = node(state)['query_classification']
+        latencies.append(time.perf_counter() - start)
+
+        levels = [indexes_to_categories(result[level][1]) for level in range(3)]
+        predicted.append(levels[0])
+        level_agreement += all(set(levels[level]) == set(levels[0]) for level in range(3))
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'mode': mode,
+        'queries': len(dataset),
+        'latency_ms': {
+            'mean': round(float(latencies.mean()),1),
+            'p50': round(float(np.percentile(latencies,50)),1),
+            'p95': round(float(np.percentile(latencies,95)),1),
+        },
+        'accuracy': score(predicted,[example['categories'] for example in dataset]),
+        'level_agreement': round(level_agreement / len(dataset),3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare query classification modes")
+    parser.add_argument('--dataset',default='backend/benchmarks/data/classification_queries.jsonl')
+    parser.add_argument('--modes',nargs='+',default=['parallel','single','local'])
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    # Classification does not touch the indexes or the reranker
+    pipeline = LLM_Pipeline({},None,None)
+
+    report = [run_mode(pipeline,mode,dataset) for mode in args.modes]
+    for result in report:
+        print(f"{result['mode']:>8}: p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, exact {result['accuracy']['exact_match']}, f1 {result['accuracy']['f1']}")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
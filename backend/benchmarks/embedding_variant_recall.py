@@ -0,0 +1,85 @@
+"""
+Recall@k regression check of the quantised / ONNX embedding variants against the fp32 models.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.embedding_variant_recall --variants onnx onnx-int8 --k 10 --min-recall 0.9
+
+The existing vector indexes were built with the fp32 models, so only the query side changes. For every
+index the queries are encoded with each variant and the top-k node ids are compared with the fp32 top-k.
+The script exits with status 1 when any index falls below --min-recall.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+import numpy as np
+from llama_index.core.schema import QueryBundle
+from backend.api.llm_pipeline import INDEX_CONFIGS, load_vector_index
+from backend.api.model_registry import embedding_registry, EMBEDDING_VARIANTS
+
+
+def load_queries(path:str) -> List[str]:
+    with open(path,'r',encoding='utf-8') as f:
+        return [json.loads(line)['query'] for line in f if line.strip()]
+
+
+def encode(model_path:str, variant:str, queries:List[str]) -> tuple[List[List[float]],float]:
+    embedding = embedding_registry.get(model_path,variant)
+    embedding.embed_documents(queries[:1])  # warm-up, the first ONNX call allocates the session buffers
+    start = time.perf_counter()
+    vectors = [embedding.embed_query(query) for query in queries]
+    return vectors, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def top_ids(retriever, queries:List[str], vectors:List[List[float]]) -> List[List[str]]:
+    return [[node.node_id for node in retriever.retrieve(QueryBundle(query_str=query,embedding=vector))] for query, vector in zip(queries,vectors)]
+
+
+def check_index(name:str, config:Dict, variants:List[str], queries:List[str], k:int) -> Dict:
+    retriever = load_vector_index(k,config['persist_dir'],embedding_registry.get(config['model'],'fp32'))
+    retriever.similarity_top_k = k
+
+    reference_vectors, reference_ms = encode(config['model'],'fp32',queries)
+    reference = top_ids(retriever,queries,reference_vectors)
+
+    result = {'index': name, 'model': config['model'], 'fp32_query_ms': round(reference_ms,2), 'variants': {}}
+    for variant in variants:
+        vectors, query_ms = encode(config['model'],variant,queries)
+        candidates = top_ids(retriever,queries,vectors)
+        recalls = [len(set(ref) & set(cand)) / len(ref) if ref else 1.0 for ref, cand in zip(reference,candidates)]
+        result['variants'][variant] = {
+            f'recall@{k}': round(float(np.mean(recalls)),3),
+            'min_recall': round(float(np.min(recalls)),3),
+            'query_ms': round(query_ms,2),
+            'speedup': round(reference_ms / query_ms,2) if query_ms else None,
+        }
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recall@k of embedding variants against the fp32 models")
+    parser.add_argument('--queries',default='backend/benchmarks/data/classification_queries.jsonl')
+    parser.add_argument('--variants',nargs='+',default=['onnx','onnx-int8'],choices=[v for v in EMBEDDING_VARIANTS if v != 'fp32'])
+    parser.add_argument('--indexes',nargs='+',default=list(INDEX_CONFIGS),choices=list(INDEX_CONFIGS))
+    parser.add_argument('--k',type=int,default=10)
+    parser.add_argument('--min-recall',type=float,default=0.9)
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    report = [check_index(name,INDEX_CONFIGS[name],args.variants,queries,args.k) for name in args.indexes]
+
+    failed = False
+    for result in report:
+        for variant, stats in result['variants'].items():
+            ok = stats[f'recall@{args.k}'] >= args.min_recall
+            failed = failed or not ok
+            print(f"{'✅' if ok else '❌'} {result['index']:<38} {variant:<10} recall@{args.k} {stats[f'recall@{args.k}']} (min {stats['min_recall']}), "
+                  f"{stats['query_ms']} ms/query vs {result['fp32_query_ms']} ms fp32 (x{stats['speedup']})")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,96 @@
+"""
+Latency and recall of dense-only, BM25-only and hybrid (RRF) retrieval, each with and without the metadata pre-filter.
+
+Usage (from the repository root):
+    VECTOR_BACKEND=mmap python -m backend.benchmarks.hybrid_retrieval --k 10
+
+Each dataset line has a "query", the "index" to search and the gold document "titles". Recall@k is the share of
+gold titles found among the top-k node titles. Query vectors are computed once and reused by every mode, so the
+latencies compare the search itself; the encoder time is reported separately. The "+filter" modes narrow the rows
+to the article / law references found in the query (backend/api/metadata_filter.py) before scoring.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+import numpy as np
+from llama_index.core.schema import QueryBundle
+from backend.api.llm_pipeline import INDEX_CONFIGS, load_dense_retriever, load_mmap_retriever
+from backend.api.metadata_filter import extract_references
+from backend.database.config.config import settings
+
+MODES = ['dense', 'bm25', 'hybrid', 'dense+filter', 'bm25+filter', 'hybrid+filter']
+
+
+def load_dataset(path:str) -> List[Dict]:
+    with open(path,'r',encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_retriever(name:str, k:int):
+    if settings.VECTOR_BACKEND == 'mmap':
+        return load_mmap_retriever(k,name,INDEX_CONFIGS[name])
+    retriever = load_dense_retriever(k,INDEX_CONFIGS[name])
+    if retriever.index.lexical is None:
+        retriever.index.build_lexical()
+    if retriever.index.filters is None:
+        retriever.index.build_filters()
+    return retriever
+
+
+def run_mode(retriever, mode:str, bundle:QueryBundle, k:int) -> List[str]:
+    mode, _, filtered = mode.partition('+')
+    if mode == 'bm25':
+        mask = retriever.index.filter_mask(extract_references(bundle.query_str)) if filtered else None
+        keys = [key for key, _ in retriever.index.lexical_search(bundle.query_str,k,mask)]
+    else:
+        retriever.hybrid = mode == 'hybrid'
+        retriever.metadata_filter = bool(filtered)
+        keys = [key for key, _ in retriever.search(bundle)]
+    return [retriever.index.node(key)[2].get('title','') for key in keys]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dense vs BM25 vs hybrid retrieval")
+    parser.add_argument('--dataset',default='backend/benchmarks/data/hybrid_queries.jsonl')
+    parser.add_argument('--k',type=int,default=10)
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    retrievers = {name: load_retriever(name,args.k) for name in {example['index'] for example in dataset}}
+
+    latencies = {mode: [] for mode in MODES}
+    recalls = {mode: [] for mode in MODES}
+    encode_ms = []
+    for example in dataset:
+        retriever = retrievers[example['index']]
+        start = time.perf_counter()
+        bundle = QueryBundle(query_str=example['query'],embedding=retriever.embedding.embed_query(example['query']))
+        encode_ms.append((time.perf_counter() - start) * 1000)
+        for mode in MODES:
+            start = time.perf_counter()
+            titles = run_mode(retriever,mode,bundle,args.k)
+            latencies[mode].append((time.perf_counter() - start) * 1000)
+            recalls[mode].append(len(set(example['titles']) & set(titles)) / len(example['titles']))
+
+    report = {
+        'backend': settings.VECTOR_BACKEND,
+        'queries': len(dataset),
+        'encode_ms_p50': round(float(np.percentile(encode_ms,50)),2),
+        'modes': {
+            mode: {
+                f'recall@{args.k}': round(float(np.mean(recalls[mode])),3),
+                'latency_ms_p50': round(float(np.percentile(latencies[mode],50)),3),
+                'latency_ms_p95': round(float(np.percentile(latencies[mode],95)),3),
+            }
+            for mode in MODES
+        },
+    }
+    for mode, stats in report['modes'].items():
+        print(f"{mode:>13}: recall@{args.k} {stats[f'recall@{args.k}']}, p50 {stats['latency_ms_p50']} ms, p95 {stats['latency_ms_p95']} ms")
+    print(f"query encoding p50 {report['encode_ms_p50']} ms")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
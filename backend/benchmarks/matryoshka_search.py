@@ -0,0 +1,54 @@
+"""
+Memory / latency / recall of Matryoshka-truncated search for the persisted indexes.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.matryoshka_search --dims 512 256 128 --probes 200
+
+Stored node vectors are used as probe queries, so no embedding model is needed. Recall@k is measured
+against the full-width search of the same index.
+"""
+import argparse
+import json
+from typing import Dict, List
+import numpy as np
+from backend.api.dense_index import DenseIndex
+from backend.api.llm_pipeline import INDEX_CONFIGS
+
+
+def recall(reference:List[List[int]], candidates:List[List[int]]) -> float:
+    return float(np.mean([len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference,candidates)]))
+
+
+def run_index(name:str, persist_dir:str, dims:List[int], probes:int, k:int) -> List[Dict]:
+    full = DenseIndex.from_llama_index(persist_dir)
+    queries = full.full[np.random.default_rng(0).choice(len(full.ids),min(probes,len(full.ids)),replace=False)]
+    reference = [[i for i, _ in full.search(query,k)] for query in queries]
+
+    rows = [{'index': name, 'search_dims': full.dims, 'two_stage': False, f'recall@{k}': 1.0, **full.report(probes,k)}]
+    for dim in dims:
+        for two_stage in (False,True):
+            index = DenseIndex(full.ids,full.texts,full.metadata,full.full,truncate_dim=dim,two_stage=two_stage)
+            candidates = [[i for i, _ in index.search(query,k)] for query in queries]
+            rows.append({'index': name, f'recall@{k}': round(recall(reference,candidates),3), **index.report(probes,k)})
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Matryoshka truncation report per index")
+    parser.add_argument('--dims',nargs='+',type=int,default=[512,256,128])
+    parser.add_argument('--indexes',nargs='+',default=list(INDEX_CONFIGS),choices=list(INDEX_CONFIGS))
+    parser.add_argument('--probes',type=int,default=200)
+    parser.add_argument('--k',type=int,default=10)
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    report = []
+    for name in args.indexes:
+        report += run_index(name,INDEX_CONFIGS[name]['persist_dir'],args.dims,args.probes,args.k)
+    for row in report:
+        print(f"{row['index']:<38} {row['search_dims']:>5}/{row['dims']} dims {'two-stage' if row['two_stage'] else 'single   '} "
+              f"recall@{args.k} {row[f'recall@{args.k}']:<5} {row['vectors_mb']:>8} MB {row['search_ms']:>8} ms")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
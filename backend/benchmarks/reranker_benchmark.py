@@ -0,0 +1,122 @@
+"""
+Latency and NDCG@10 comparison of the local cross-encoder reranker against the Cohere fine-tuned rerank.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.reranker_benchmark --dataset backend/benchmarks/data/rerank_queries.jsonl --rerankers local cohere
+
+Each dataset line is a JSON object with a "query" and its candidate "passages", every passage being
+{"text": ..., "relevance": 0-3}. The concurrency run fires all queries at once from a thread pool so the
+local reranker's micro-batching is exercised the same way as under concurrent /request traffic.
+Repeated queries in that run hit the local score cache; pass --cache-size 0 to measure cold batches only.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+import numpy as np
+from backend.api.llm_pipeline import load_reranker_model, load_local_reranker
+from backend.api.metrics import metrics
+from backend.database.config.config import settings
+
+
+def load_dataset(path:str) -> List[Dict]:
+    with open(path,'r',encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ndcg_at_k(ranked_relevance:List[float], all_relevance:List[float], k:int = 10) -> float:
+    def dcg(relevance):
+        return sum((2 ** rel - 1) / np.log2(rank + 2) for rank, rel in enumerate(relevance[:k]))
+    ideal = dcg(sorted(all_relevance,reverse=True))
+    return dcg(ranked_relevance) / ideal if ideal else 0.0
+
+
+def build_local() -> Callable[[str,List[str]],List[int]]:
+    reranker = load_local_reranker()
+    def rerank(query:str, passages:List[str]) -> List[int]:
+        scores = reranker.score(query,passages)
+        return sorted(range(len(passages)),key=lambda i: scores[i],reverse=True)
+    return rerank
+
+
+def build_cohere() -> Callable[[str,List[str]],List[int]]:
+    client, model = load_reranker_model()
+    if model is None:
+        raise RuntimeError("Cohere fine-tuned reranker is not available")
+    def rerank(query:str, passages:List[str]) -> List[int]:
+        response = client.rerank(query=query,documents=passages,model=model.finetuned_model.id + "-ft")
+        return [item.index for item in response.results]
+    return rerank
+
+
+RERANKERS = {'local': build_local, 'cohere': build_cohere}
+
+
+def evaluate(rerank:Callable[[str,List[str]],List[int]], example:Dict) -> tuple[float,float]:
+    passages = [passage['text'] for passage in example['passages']]
+    relevance = [passage['relevance'] for passage in example['passages']]
+    start = time.perf_counter()
+    order = rerank(example['query'],passages)
+    latency = time.perf_counter() - start
+    return latency, ndcg_at_k([relevance[i] for i in order],relevance)
+
+
+def summary(latencies:List[float]) -> Dict[str,float]:
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'mean': round(float(latencies.mean()),1),
+        'p50': round(float(np.percentile(latencies,50)),1),
+        'p95': round(float(np.percentile(latencies,95)),1),
+    }
+
+
+def run_reranker(name:str, dataset:List[Dict], concurrency:int) -> Dict:
+    rerank = RERANKERS[name]()
+
+    sequential = [evaluate(rerank,example) for example in dataset]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        concurrent = list(executor.map(lambda example: evaluate(rerank,example),dataset * concurrency))
+    wall = time.perf_counter() - started
+
+    return {
+        'reranker': name,
+        'queries': len(dataset),
+        'ndcg@10': round(float(np.mean([ndcg for _, ndcg in sequential])),3),
+        'latency_ms': summary([latency for latency, _ in sequential]),
+        'concurrent': {
+            'workers': concurrency,
+            'requests': len(concurrent),
+            'latency_ms': summary([latency for latency, _ in concurrent]),
+            'throughput_qps': round(len(concurrent) / wall,1),
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the local and Cohere rerankers")
+    parser.add_argument('--dataset',default='backend/benchmarks/data/rerank_queries.jsonl')
+    parser.add_argument('--rerankers',nargs='+',default=['local','cohere'],choices=list(RERANKERS))
+    parser.add_argument('--concurrency',type=int,default=8)
+    parser.add_argument('--cache-size',type=int,default=None,help="Override RERANKER_CACHE_SIZE for the local reranker")
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    if args.cache_size is not None:
+        settings.RERANKER_CACHE_SIZE = args.cache_size
+
+    dataset = load_dataset(args.dataset)
+    report = [run_reranker(name,dataset,args.concurrency) for name in args.rerankers]
+    for result in report:
+        print(f"{result['reranker']:>7}: ndcg@10 {result['ndcg@10']}, p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+              f"concurrent p95 {result['concurrent']['latency_ms']['p95']} ms, {result['concurrent']['throughput_qps']} q/s")
+
+    histograms = metrics.snapshot()['histograms']
+    if 'reranker.batch_size' in histograms:
+        print(f"local batch size: mean {histograms['reranker.batch_size']['mean']:.1f} over {histograms['reranker.batch_size']['count']} batches")
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
@@ -0,0 +1,138 @@
+"""
+Load test of in-process models (INFERENCE_MODE=local) against the shared inference sidecar, for several worker counts.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.sidecar_load --workers 1 2 4 --requests 200 --threads 4 --output sidecar_load.json
+
+Every worker is a fresh spawned process that loads what a uvicorn worker would load in that mode (all indexes and
+embedding models locally, or just a sidecar client), waits for the others, then runs --requests queries from
+--threads threads: embed the query, search its index and, with --rerank, score the hits with the local reranker.
+The sidecar is started once per run as `python -m backend.sidecar` on a temporary socket. Throughput is measured
+from the common start to the last worker finishing; memory is the summed RSS of the workers plus the sidecar.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import numpy as np
+from llama_index.core.schema import QueryBundle
+from backend.api.inference_sidecar import RemoteReranker, SidecarClient
+from backend.api.llm_pipeline import INDEX_CONFIGS, initialize_indexes, load_local_reranker, load_sidecar
+from backend.api.model_registry import current_rss_mb, embedding_registry
+from backend.database.config.config import settings
+
+MODES = ['local', 'sidecar']
+
+
+def load_dataset(path:str) -> List[Dict]:
+    with open(path,'r',encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def process_rss_mb(pid:int) -> float:
+    with open(f'/proc/{pid}/statm','r') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _worker(mode:str, socket_path:str, dataset:List[Dict], requests:int, threads:int, rerank:bool, barrier, results):
+    start = time.perf_counter()
+    if mode == 'sidecar':
+        settings.INFERENCE_SOCKET = socket_path
+        client, retrievers = load_sidecar()
+        reranker = RemoteReranker(client) if rerank else None
+    else:
+        retrievers = initialize_indexes(top_k=10)
+        reranker = load_local_reranker() if rerank else None
+    load_s = time.perf_counter() - start
+    barrier.wait()
+
+    def one(i:int) -> float:
+        example = dataset[i % len(dataset)]
+        begin = time.perf_counter()
+        vector = embedding_registry.get(INDEX_CONFIGS[example['index']]['model']).embed_query(example['query'])
+        nodes = retrievers[example['index']].retrieve(QueryBundle(query_str=example['query'],embedding=vector))
+        if reranker is not None:
+            reranker.score(example['query'],[node.node.get_content() for node in nodes])
+        return time.perf_counter() - begin
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(one,range(requests)))
+    results.put({'latencies': latencies, 'end': time.monotonic(), 'load_s': load_s, 'rss_mb': current_rss_mb()})
+
+    if reranker is not None:
+        reranker.close()
+    embedding_registry.close()
+
+
+def run(mode:str, workers:int, socket_path:str, dataset:List[Dict], args, sidecar_pid:int|None) -> Dict[str, object]:
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_worker,args=(mode,socket_path,dataset,args.requests,args.threads,args.rerank,barrier,results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.monotonic()
+    # Results are drained before join so a full queue pipe cannot block the workers
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = np.asarray([latency for outcome in outcomes for latency in outcome['latencies']]) * 1000
+    wall = max(outcome['end'] for outcome in outcomes) - start
+    sidecar_rss = process_rss_mb(sidecar_pid) if sidecar_pid else 0.0
+    return {
+        'mode': mode,
+        'workers': workers,
+        'requests': len(latencies),
+        'throughput_qps': round(len(latencies) / wall,1),
+        'latency_ms_p50': round(float(np.percentile(latencies,50)),1),
+        'latency_ms_p95': round(float(np.percentile(latencies,95)),1),
+        'worker_load_s': round(float(np.mean([outcome['load_s'] for outcome in outcomes])),2),
+        'worker_rss_mb': round(float(np.mean([outcome['rss_mb'] for outcome in outcomes])),1),
+        'total_rss_mb': round(sum(outcome['rss_mb'] for outcome in outcomes) + sidecar_rss,1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput against worker count, local models vs inference sidecar")
+    parser.add_argument('--dataset',default='backend/benchmarks/data/hybrid_queries.jsonl')
+    parser.add_argument('--modes',nargs='+',default=MODES,choices=MODES)
+    parser.add_argument('--workers',nargs='+',type=int,default=[1,2,4])
+    parser.add_argument('--requests',type=int,default=200,help="Requests per worker")
+    parser.add_argument('--threads',type=int,default=4,help="Concurrent requests per worker")
+    parser.add_argument('--rerank',action='store_true',help="Score the hits with the local reranker")
+    parser.add_argument('--output',default=None,help="Optional path for the JSON report")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    socket_path = os.path.join(tempfile.mkdtemp(),'inference.sock')
+    report = []
+    for mode in args.modes:
+        sidecar = None
+        if mode == 'sidecar':
+            env = {**os.environ, 'INFERENCE_SOCKET': socket_path, 'RERANKER_MODE': 'local' if args.rerank else settings.RERANKER_MODE}
+            sidecar = subprocess.Popen([sys.executable,'-m','backend.sidecar'],env=env)
+            probe = SidecarClient(socket_path,pool_size=1)
+            probe.wait_ready(settings.INFERENCE_STARTUP_TIMEOUT_S)
+            probe.close()
+        try:
+            for workers in args.workers:
+                result = run(mode,workers,socket_path,dataset,args,sidecar.pid if sidecar else None)
+                report.append(result)
+                print(f"{mode:>7} x{workers}: {result['throughput_qps']} q/s, p50 {result['latency_ms_p50']} ms, p95 {result['latency_ms_p95']} ms, "
+                      f"{result['worker_rss_mb']} MB per worker, {result['total_rss_mb']} MB total, {result['worker_load_s']}s worker startup")
+        finally:
+            if sidecar is not None:
+                sidecar.terminate()
+                sidecar.wait()
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as f:
+            json.dump(report,f,indent=2)
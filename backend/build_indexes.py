@@ -0,0 +1,97 @@
+"""
+Builds (or incrementally updates) the mmap vector indexes straight from the corpus under backend/files.
+
+Usage (from the repository root):
+    python -m backend.build_indexes --chunker recursive --chunk-size 1000 --overlap 200 --workers 4
+    python -m backend.build_indexes --indexes gdpr_index_recall_retriever --dry-run
+
+Documents are streamed one file at a time, chunked with the existing chunkers and embedded in batches on a
+process pool. A content-hash manifest per index means a rerun only embeds new or changed documents, so adding
+a court decision or a law article touches one shard instead of the whole index.
+"""
+import argparse
+import tiktoken
+from backend.api.chunking import ChunkingEngine
+from backend.api.index_builder import IndexBuilder
+from backend.api.llm_pipeline import (
+    INDEX_CONFIGS,
+    CharacterChunker, RecursiveCharacterChunker, ResTokenChunker, SentenceChunker, TokenChunker,
+    cybercrime_chunks, gdpr_chunks, law_case_chunks, phishing_chunks,
+)
+from backend.api.mmap_index import ANN_TYPES
+from backend.api.model_registry import EMBEDDING_VARIANTS
+from backend.database.config.config import settings
+
+# corpus: (directory under --files-dir, chunk function, node id prefix)
+CORPORA = {
+    'phishing': ('Phishing Scenarios', phishing_chunks, 'phishing'),
+    'gdpr': ('General Data Protection Regulation', gdpr_chunks, 'gdpr'),
+    'law_cases': ('Law Cases', law_case_chunks, 'case'),
+    'cybercrime': ('Greek Cybercrime Legislation', cybercrime_chunks, 'cybercrime'),
+}
+
+INDEX_CORPORA = {
+    "phishing_retriever": 'phishing',
+    "law_cases_index_recall_retriever": 'law_cases',
+    "law_cases_index_precision_retriever": 'law_cases',
+    "gpc_index_recall_retriever": 'cybercrime',
+    "gpc_index_precision_retriever": 'cybercrime',
+    "gdpr_index_recall_retriever": 'gdpr',
+    "gdpr_index_precision_retriever": 'gdpr',
+}
+
+
+def build_chunker(name:str, chunk_size:int, overlap:int):
+    if name.startswith('engine-'):
+        return ChunkingEngine(name.split('-',1)[1],chunk_size,overlap)
+    if name == 'sentence':
+        return SentenceChunker(chunk_size,tiktoken.get_encoding('cl100k_base'))
+    if name == 'character':
+        return CharacterChunker(chunk_size,overlap)
+    if name == 'token':
+        return TokenChunker(chunk_size,overlap)
+    if name == 'restoken':
+        return ResTokenChunker(chunk_size,overlap)
+    return RecursiveCharacterChunker(chunk_size,overlap)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incrementally build the mmap vector indexes from backend/files")
+    parser.add_argument('--indexes',nargs='+',default=list(INDEX_CORPORA),choices=list(INDEX_CORPORA))
+    parser.add_argument('--files-dir',default='backend/files/en')
+    parser.add_argument('--out',default=settings.VECTOR_MMAP_DIR)
+    parser.add_argument('--chunker',default='recursive',choices=['recursive','character','token','restoken','sentence','engine-token','engine-sentence','engine-character'])
+    parser.add_argument('--chunk-size',type=int,default=1000,help="Characters, tokens or sentences per chunk depending on --chunker")
+    parser.add_argument('--overlap',type=int,default=200)
+    parser.add_argument('--workers',type=int,default=2,help="Embedding processes, each loads its own copy of the model")
+    parser.add_argument('--batch-size',type=int,default=64)
+    parser.add_argument('--shard-size',type=int,default=50000)
+    parser.add_argument('--dtype',default='float32',choices=['float32','int8'])
+    parser.add_argument('--ann',default='hnsw',choices=ANN_TYPES)
+    parser.add_argument('--variant',default=settings.EMBEDDING_VARIANT,choices=list(EMBEDDING_VARIANTS))
+    parser.add_argument('--dry-run',action='store_true',help="Only report which documents would be re-embedded")
+    args = parser.parse_args()
+
+    chunker = build_chunker(args.chunker,args.chunk_size,args.overlap)
+    chunker_config = {'name': args.chunker, 'chunk_size': args.chunk_size, 'overlap': args.overlap}
+    for name in args.indexes:
+        directory, chunk_fn, prefix = CORPORA[INDEX_CORPORA[name]]
+        config = INDEX_CONFIGS[name]
+        builder = IndexBuilder(
+            f"{args.out}/{name}",
+            prefix,
+            config["model"],
+            chunk_fn,
+            chunker,
+            chunker_config,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            shard_size=args.shard_size,
+            dtype=args.dtype,
+            ann=args.ann,
+            ann_dims=config.get("truncate_dim",settings.VECTOR_TRUNCATE_DIM),
+            variant=args.variant,
+        )
+        summary = builder.build(f"{args.files_dir}/{directory}",dry_run=args.dry_run)
+        print(f"{'📝' if args.dry_run else '✅'} {name}: {summary['changed']} new/changed, {summary['removed']} removed, "
+              f"{summary['chunks_embedded']} chunks embedded{' (full rebuild)' if summary['full_rebuild'] else ''}")
@@ -1,6 +1,7 @@
 from transformers import AutoTokenizer, AutoModel
 from sentence_transformers import CrossEncoder
 from sentence_transformers import SentenceTransformer
+from sentence_transformers import export_dynamic_quantized_onnx_model
 
 EMBEDDING_MODELS = [
     "IoannisKat1/multilingual-e5-large-legal-matryoshka",
@@ -19,8 +20,32 @@ for model_id in EMBEDDING_MODELS:
     model = SentenceTransformer(model_id, trust_remote_code=True)
     model.save(save_path)
 
+    # CPU variants selected with EMBEDDING_VARIANT (onnx | onnx-int8 | openvino)
+    try:
+        print(f"⚙️ Exporting ONNX + int8 variants: {model_id}")
+        onnx_model = SentenceTransformer(save_path, backend="onnx", trust_remote_code=True)
+        onnx_model.save_pretrained(save_path)
+        export_dynamic_quantized_onnx_model(onnx_model, "avx2", save_path)
+    except Exception as e:
+        print(f"⚠️ ONNX export failed for {model_id}: {e}")
+
+    try:
+        print(f"⚙️ Exporting OpenVINO variant: {model_id}")
+        SentenceTransformer(save_path, backend="openvino", trust_remote_code=True).save_pretrained(save_path)
+    except Exception as e:
+        print(f"⚠️ OpenVINO export failed for {model_id}: {e}")
+
 # Cache CrossEncoder models
 for model_id in RERANKER_MODELS:
     print(f"🔁 Caching reranker: {model_id}")
+    save_path = f"./backend/cached_reranker_models/{model_id.replace('/', '__')}"
     reranker = CrossEncoder(model_id)
-    reranker.save(f"./backend/cached_reranker_models/{model_id.replace('/', '__')}")
\ No newline at end of file
+    reranker.save(save_path)
+
+    # int8 ONNX copy for RERANKER_MODE=local (saved as onnx/model_qint8_avx2.onnx)
+    try:
+        print(f"⚙️ Exporting quantized ONNX reranker: {model_id}")
+        onnx_reranker = CrossEncoder(save_path, backend="onnx")
+        export_dynamic_quantized_onnx_model(onnx_reranker, "avx2", save_path)
+    except Exception as e:
+        print(f"⚠️ ONNX export failed for reranker {model_id}: {e}")
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Converts the persisted llama_index vector indexes into the mmap index format (see backend/api/mmap_index.py).
+
+Usage (from the repository root):
+    python -m backend.convert_indexes --dtype float32 --ann hnsw --ann-dims 256
+
+Afterwards set VECTOR_BACKEND=mmap so initialize_indexes opens the converted indexes from VECTOR_MMAP_DIR.
+"""
+import argparse
+import os
+import shutil
+import time
+import numpy as np
+from backend.api.dense_index import DenseIndex
+from backend.api.llm_pipeline import INDEX_CONFIGS
+from backend.api.mmap_index import MmapIndex, write_shard, write_index_manifest, ANN_TYPES
+from backend.database.config.config import settings
+
+
+def convert(name:str, config:dict, out_dir:str, dtype:str, ann:str, ann_dims:int|None, shard_size:int, verify:int):
+    start = time.perf_counter()
+    source = DenseIndex.from_llama_index(config["persist_dir"])
+    index_dir = os.path.join(out_dir,name)
+    # Rewrite from scratch so shards of an older, bigger conversion do not linger
+    shutil.rmtree(index_dir,ignore_errors=True)
+    os.makedirs(index_dir)
+
+    shards = []
+    for shard_no, begin in enumerate(range(0,max(len(source.ids),1),shard_size)):
+        end = begin + shard_size
+        shard = f"shard-{shard_no:04d}"
+        write_shard(
+            os.path.join(index_dir,shard),
+            source.ids[begin:end],
+            source.texts[begin:end],
+            source.metadata[begin:end],
+            source.full[begin:end],
+            dtype=dtype,
+            ann=ann,
+            ann_dims=ann_dims,
+        )
+        shards.append(shard)
+    write_index_manifest(index_dir,config["model"],source.dims,shards)
+    print(f"✅ {name}: {len(source.ids)} nodes in {len(shards)} shards ({time.perf_counter() - start:.1f}s)")
+
+    if verify:
+        # Agreement of the converted top 10 with the exact search over the original vectors
+        converted = MmapIndex(index_dir)
+        probes = source.full[np.random.default_rng(0).choice(len(source.ids),min(verify,len(source.ids)),replace=False)]
+        overlap = []
+        for probe in probes:
+            expected = {source.ids[i] for i, _ in source.search(probe,10)}
+            found = {converted.node(key)[0] for key, _ in converted.search(probe,10)}
+            overlap.append(len(expected & found) / len(expected))
+        converted.close()
+        print(f"   recall@10 vs original: {np.mean(overlap):.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert llama_index vector stores into mmap indexes")
+    parser.add_argument('--indexes',nargs='+',default=list(INDEX_CONFIGS),choices=list(INDEX_CONFIGS))
+    parser.add_argument('--out',default=settings.VECTOR_MMAP_DIR)
+    parser.add_argument('--dtype',default='float32',choices=['float32','int8'])
+    parser.add_argument('--ann',default='hnsw',choices=ANN_TYPES)
+    parser.add_argument('--ann-dims',type=int,default=None,help="Matryoshka dims indexed by the ANN structure, defaults to the retriever's truncate_dim")
+    parser.add_argument('--shard-size',type=int,default=100000)
+    parser.add_argument('--verify',type=int,default=50,help="Number of probe queries for the recall check, 0 to skip")
+    args = parser.parse_args()
+
+    for name in args.indexes:
+        config = INDEX_CONFIGS[name]
+        ann_dims = args.ann_dims or config.get("truncate_dim",settings.VECTOR_TRUNCATE_DIM)
+        convert(name,config,args.out,args.dtype,args.ann,ann_dims,args.shard_size,args.verify)
@@ -20,6 +20,68 @@ class Settings(BaseSettings):
     INIT_MODE: str
     OPEN_AI_MODEL:str
     TAVILY_API_KEY: str
+    CLASSIFICATION_MODE: str = 'parallel'   # parallel | single | local
+    FUSED_REWRITING: bool = False
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_PATH: str = './backend/cache/answer_cache.sqlite3'
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: int = 86400
+    ANSWER_CACHE_MAX_ENTRIES: int = 5000
+    # Completions are sampled at temperature > 0, so caching them is opt-in
+    LLM_CACHE_BACKEND: str = 'off'   # off | memory | sqlite
+    LLM_CACHE_PATH: str = './backend/cache/llm_cache.sqlite3'
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    ASYNC_PIPELINE: bool = True
+    SEARCH_MODE: str = 'parallel'   # off | parallel | fallback
+    SEARCH_BACKEND: str = 'tavily'   # tavily | stub
+    SEARCH_STUB_PATH: str = './backend/benchmarks/data/search_stub.json'
+    SEARCH_TIMEOUT_SECONDS: float = 4.0
+    SEARCH_MAX_CONNECTIONS: int = 10   # pooled keep-alive connections to Tavily
+    SEARCH_HTTP_TIMEOUT_S: float = 10.0
+    SEARCH_WEAK_RAG_SCORE: float = 0.3
+    SEARCH_CHANGED_MIN_NOVELTY: float = 0.2   # share of search result trigrams missing from the RAG context to count as a context change
+    EMBEDDING_VARIANT: str = 'fp32'   # fp32 | onnx | onnx-int8 | openvino
+    EMBEDDING_BATCHING: bool = True
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 3.0
+    VECTOR_BACKEND: str = 'llama_index'   # llama_index | dense | mmap
+    VECTOR_TRUNCATE_DIM: int | None = None   # e.g. 256 or 128 for the matryoshka models
+    VECTOR_TWO_STAGE: bool = True
+    VECTOR_SHORTLIST_FACTOR: int = 4
+    VECTOR_MMAP_DIR: str = './backend/vector_indexes_mmap'
+    VECTOR_EF_SEARCH: int = 64
+    VECTOR_HYBRID: bool = False   # BM25 + dense with reciprocal rank fusion (dense / mmap backends)
+    VECTOR_HYBRID_CANDIDATES: int = 20
+    VECTOR_RRF_K: int = 60
+    VECTOR_METADATA_FILTER: bool = False   # narrow rows by article / law references in the query
+    CONTEXT_MODE: str = 'summary'   # summary | extractive (pack reranked chunks and search results, no summariser calls)
+    CONTEXT_PACK_TOKEN_BUDGET: int = 4000   # extractive: RAG context tokens in the answer prompt
+    SEARCH_PACK_TOKEN_BUDGET: int = 1500   # extractive: search result tokens in the answer prompt
+    CONTEXT_LEVEL_TOKEN_BUDGET: int = 3000   # tokens of deduplicated chunks sent to the summariser per level
+    CONTEXT_SUMMARY_MAX_TOKENS: int = 600   # completion cap of each level summary
+    LLM_MAX_CONNECTIONS: int = 20   # pooled connections shared by every OpenAI call of a worker
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_TIMEOUT_S: float = 60.0
+    LLM_CONNECT_TIMEOUT_S: float = 5.0
+    LLM_MAX_RETRIES: int = 2
+    STARTUP_MODE: str = 'eager'   # eager | background | lazy (indexes load on first use)
+    STARTUP_WORKERS: int = 4   # threads loading indexes / models in parallel
+    STARTUP_RETRIES: int = 3   # attempts per component before it is reported as failed
+    STARTUP_RETRY_BACKOFF_S: float = 2.0
+    STARTUP_RETRY_MAX_BACKOFF_S: float = 60.0   # reranker / sidecar keep retrying at most this far apart until they load
+    INFERENCE_MODE: str = 'local'   # local | sidecar (models and indexes live in `python -m backend.sidecar`)
+    INFERENCE_SOCKET: str = '/tmp/aila-inference.sock'
+    INFERENCE_SHM_MB: int = 8   # shared memory block per sidecar connection
+    INFERENCE_POOL_SIZE: int = 8   # sidecar connections per API worker
+    INFERENCE_TIMEOUT_S: float = 30.0
+    INFERENCE_STARTUP_TIMEOUT_S: float = 300.0
+    RERANKER_MODE: str = 'cohere'   # cohere | local
+    RERANKER_MODEL_PATH: str = './backend/cached_reranker_models/BAAI__bge-reranker-base'
+    RERANKER_BACKEND: str = 'onnx'   # onnx | torch
+    RERANKER_ONNX_FILE: str = 'onnx/model_qint8_avx2.onnx'
+    RERANKER_MAX_BATCH_SIZE: int = 32
+    RERANKER_MAX_WAIT_MS: float = 5.0
+    RERANKER_CACHE_SIZE: int = 50000
     class Config:
         env_file = ".env"
 
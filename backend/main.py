@@ -6,25 +6,86 @@ from backend.database.config.config import settings
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from backend.api.llm_pipeline import initialize_indexes,load_reranker_model,LLM_Pipeline
+from backend.api.llm_pipeline import index_components,load_reranker_model,load_local_reranker,load_sidecar,LLM_Pipeline,E5_LARGE_MODEL
+from backend.api.startup import LazyComponent, StartupTracker
+from backend.api.inference_sidecar import RemoteReranker
+from backend.api.model_registry import embedding_registry
+from backend.api.semantic_cache import SemanticAnswerCache
+
+def load_cohere_reranker():
+    cohere_client,cohere_reranker = load_reranker_model()
+    if cohere_reranker is None:
+        raise RuntimeError(f"Cohere fine-tuned model {settings.COHERE_MODEL_ID} not found")
+    return cohere_client,cohere_reranker
+
+def start_pipeline(app:FastAPI):
+    # Each component retries on its own, so a failed Cohere lookup no longer reloads every index
+    startup = app.state.startup
+    retry = {'retries': settings.STARTUP_RETRIES, 'backoff_s': settings.STARTUP_RETRY_BACKOFF_S}
+    lazy = settings.STARTUP_MODE == 'lazy'
+    max_backoff_s = settings.STARTUP_RETRY_MAX_BACKOFF_S
+    if settings.INFERENCE_MODE == 'sidecar':
+        app.state.sidecar, indexes = startup.resolve(startup.add(LazyComponent('sidecar',load_sidecar,**retry)),max_backoff_s)
+    else:
+        indexes = index_components(top_k=10,lazy=lazy)
+        for component in indexes.values():
+            startup.add(component)
+        if not lazy:
+            startup.load(list(indexes.values()))
+
+    # The reranker loads on this thread while the indexes load on the startup pool. The pipeline cannot be built
+    # without it, so a Cohere outage at boot is waited out instead of leaving the worker without a pipeline
+    cohere_client = None
+    if settings.RERANKER_MODE == 'local':
+        loader = (lambda: RemoteReranker(app.state.sidecar)) if app.state.sidecar else load_local_reranker
+        cohere_reranker = startup.resolve(startup.add(LazyComponent('reranker',loader,**retry)),max_backoff_s)
+    else:
+        cohere_client,cohere_reranker = startup.resolve(startup.add(LazyComponent('reranker',load_cohere_reranker,**retry)),max_backoff_s)
+
+    pipeline = LLM_Pipeline(indexes,cohere_reranker,cohere_client)
+    app.state.app = pipeline.initialize_workflow()
+    app.state.answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        app.state.answer_cache = SemanticAnswerCache(
+            embedding_registry.get(E5_LARGE_MODEL),
+            settings.ANSWER_CACHE_PATH,
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        )
+    app.state.pipeline = pipeline
+    startup.wait()
+    print(f"Vector index loaded ({settings.STARTUP_MODE} startup, {startup.status()['uptime_s']}s)")
+
+async def start_in_background(app:FastAPI):
+    try:
+        await asyncio.to_thread(start_pipeline,app)
+    except Exception as e:
+        # The app keeps serving; /health/ready reports which component failed
+        print(f"❌ Background startup failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
     print("Loading vector index")
+    app.state.pipeline = None
+    app.state.sidecar = None
+    app.state.startup = StartupTracker(workers=settings.STARTUP_WORKERS)
     if settings.INIT_MODE == 'runtime':
-        indexes = None
-        cohere_client = None
-        cohere_reranker = None
-        while cohere_reranker==None:
-            indexes = initialize_indexes(top_k=10)
-            cohere_client,cohere_reranker = load_reranker_model()
-        app.state.pipeline = LLM_Pipeline(indexes,cohere_reranker,cohere_client)
-        app.state.app = app.state.pipeline.initialize_workflow()
-        print("Vector index loaded")
+        if settings.STARTUP_MODE == 'eager':
+            await asyncio.to_thread(start_pipeline,app)
+        else:
+            app.state.startup_task = asyncio.create_task(start_in_background(app))
     yield
-    app.state.pipeline.shutdown()
+    if app.state.pipeline:
+        app.state.pipeline.shutdown()
+        await app.state.pipeline.aclose()
+    app.state.startup.shutdown()
+    embedding_registry.close()
+    if app.state.sidecar:
+        app.state.sidecar.close()
     print("🛑 App shutting down...")
 
 app = FastAPI(lifespan=lifespan)
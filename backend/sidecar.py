@@ -0,0 +1,34 @@
+"""
+Runs the inference sidecar: loads every index, the embedding models and (with RERANKER_MODE=local) the local reranker
+once, and serves them to the API workers over INFERENCE_SOCKET (see backend/api/inference_sidecar.py).
+
+Usage (from the repository root):
+    python -m backend.sidecar
+    INFERENCE_MODE=sidecar uvicorn backend.main:app --workers 4
+"""
+import signal
+import threading
+from backend.api.inference_sidecar import InferenceSidecar
+from backend.api.llm_pipeline import initialize_indexes, load_local_reranker, E5_LARGE_MODEL
+from backend.api.model_registry import embedding_registry
+from backend.database.config.config import settings
+
+
+if __name__ == '__main__':
+    retrievers = initialize_indexes(top_k=10)
+    # The classifier and the answer cache embed with E5 in the API workers
+    embedding_registry.get(E5_LARGE_MODEL)
+    reranker = load_local_reranker() if settings.RERANKER_MODE == 'local' else None
+
+    sidecar = InferenceSidecar(settings.INFERENCE_SOCKET,retrievers,reranker,embedding_registry,buffer_mb=settings.INFERENCE_SHM_MB)
+    # serve_forever blocks, so the signal handler stops it from another thread
+    signal.signal(signal.SIGTERM,lambda *_: threading.Thread(target=sidecar.shutdown).start())
+    try:
+        sidecar.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if reranker is not None:
+            reranker.close()
+        embedding_registry.close()
+        print("🛑 Inference sidecar stopped")
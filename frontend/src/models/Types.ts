@@ -23,4 +23,12 @@ export type Conversations = {
 
 export type ErrorMessage = {
    error_message: string;
-}
\ No newline at end of file
+}
+// Server-sent events of POST /request, see backend/api/stream_events.py
+export type StreamProgressStage = 'cache_hit' | 'translated' | 'rewritten' | 'classified' | 'retrieved' | 'context_ready' | 'search_done';
+
+export type StreamEvent =
+    | { event: 'progress'; stage: StreamProgressStage; message: string; data: Record<string, unknown>; status: number }
+    | { event: 'token'; response: string; status: number }
+    | { event: 'done'; status: number }
+    | { event: 'error'; detail: string; status: number };
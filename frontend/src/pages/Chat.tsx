@@ -3,6 +3,7 @@ import { useAuth } from '../context/AuthContext';
 import { v4 as uuidv4 } from 'uuid';
 import { useNavigate } from 'react-router-dom';
 import api from '../api/axios';
+import { parseStreamEvents } from '../services/AuthService';
 import type { Message, Conversations } from '../models/Types';
 import { Menu, X, User, Bot } from 'lucide-react'; // install `lucide-react` or use your preferred icon library
 import { motion } from "framer-motion";
@@ -12,6 +13,7 @@ const Chat = () => {
     const [messages, setMessages] = useState<Message[]>([]);
     const [userQuery, setUserQuery] = useState('');
     const [botResponse, setBotResponse] = useState('');
+    const [progress, setProgress] = useState('');
     const [currentConversation, setCurrentConversation] = useState<Conversations>({
         conversation_name: '',
         conversation_id: ''
@@ -84,31 +86,43 @@ const Chat = () => {
             const reader = res.body.getReader();
             const decoder = new TextDecoder('utf-8');
             let fullBotResponse = '';
+            let buffer = '';
+            let streamFailed = false;
 
             while (true) {
                 const { value, done } = await reader.read();
-                const chunk = decoder.decode(value);
-                const lines = chunk.split('\n\n').filter(line => line.startsWith('data: '));
-
-                for (const line of lines) {
-                    try {
-                        const jsonStr = line.replace("data: ", "");
-                        const parsed = JSON.parse(jsonStr);
-                        fullBotResponse += parsed.response;
-
-                        setMessages(prev => {
-                            const updated = [...prev];
-                            const lastIndex = updated.length - 1;
-                            updated[lastIndex].message = fullBotResponse;
-                            updated[lastIndex].timestamp = new Date().toISOString();
-                            return updated;
-                        });
-                    } catch (err) {
-                        console.error("Invalid chunk", err);
+                buffer += decoder.decode(value, { stream: !done });
+                const { events, rest } = parseStreamEvents(buffer);
+                buffer = rest;
+
+                for (const parsed of events) {
+                    if (parsed.event === 'progress') {
+                        setProgress(parsed.message);
+                        continue;
                     }
+                    if (parsed.event === 'error') {
+                        streamFailed = true;
+                        setBotResponse(parsed.detail);
+                        continue;
+                    }
+                    if (parsed.event !== 'token') continue;
+
+                    setProgress('');
+                    fullBotResponse += parsed.response;
+
+                    setMessages(prev => {
+                        const updated = [...prev];
+                        const lastIndex = updated.length - 1;
+                        updated[lastIndex].message = fullBotResponse;
+                        updated[lastIndex].timestamp = new Date().toISOString();
+                        return updated;
+                    });
                 }
 
                 if (done) {
+                    setProgress('');
+                    // A failed answer is partial or empty, so the exchange is not saved to the conversation
+                    if (streamFailed) break;
                     await createMessage(currentConversation.conversation_id, userMessage, 'user', newMessages[0].id, newMessages[0].feedback);
                     await createMessage(currentConversation.conversation_id, fullBotResponse, 'assistant', newMessages[1].id, newMessages[1].feedback);
                     await fetchUserMessages(currentConversation.conversation_id);
@@ -406,6 +420,10 @@ const Chat = () => {
                     </div>
                 </div>
 
+                {/* Pipeline Progress */}
+                {progress && (
+                    <div className="mb-2 text-gray-500 italic px-4">{progress}…</div>
+                )}
                 {/* Error Message */}
                 {botResponse && (
                     <div className="mb-2 text-red-500 px-4">{botResponse}</div>
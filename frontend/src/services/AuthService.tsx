@@ -1,6 +1,6 @@
 import axios from 'axios';
 import api from '../api/axios';
-import type { LoginAPIOutput, UserProfile, Message, Conversations, ErrorMessage } from '../models/Types';
+import type { LoginAPIOutput, UserProfile, Message, Conversations, ErrorMessage, StreamEvent } from '../models/Types';
 
 const loginAPI = async (username: string, password: string): Promise<LoginAPIOutput | ErrorMessage> => {
     try {
@@ -168,6 +168,22 @@ const requestAPI = async (userQuery: string): Promise<boolean | void> => {
     }
 }
 
+// Splits buffered SSE text from /request into complete events; the incomplete tail is returned to be buffered again
+const parseStreamEvents = (buffer: string): { events: StreamEvent[], rest: string } => {
+    const parts = buffer.split('\n\n');
+    const rest = parts.pop() ?? '';
+    const events: StreamEvent[] = [];
+    for (const part of parts) {
+        if (!part.startsWith('data: ')) continue;
+        try {
+            events.push(JSON.parse(part.replace('data: ', '')));
+        } catch (err) {
+            console.error("Invalid chunk", err);
+        }
+    }
+    return { events, rest };
+}
+
 const logoutAPI = async (): Promise<boolean | undefined> => {
     try {
         const response = await api.post('/logout')
@@ -182,5 +198,5 @@ const logoutAPI = async (): Promise<boolean | undefined> => {
 
 }
 
-export { loginAPI, getUserMessagesAPI, userFeedbackAPI, resendCodeAPI, verifyAPI, renameConversationAPI , logoutAPI, registerAPI, requestAPI, verifyUser, createConversationAPI, createMessageAPI, getConversationsAPI };
+export { loginAPI, getUserMessagesAPI, userFeedbackAPI, resendCodeAPI, verifyAPI, renameConversationAPI , logoutAPI, registerAPI, requestAPI, parseStreamEvents, verifyUser, createConversationAPI, createMessageAPI, getConversationsAPI };
 